@@ -0,0 +1,106 @@
+"""Micro-benchmark of article rendering on very large articles.
+
+Compares the old display path (walking live section objects and building the
+HTML on the GUI thread) with the snapshot path (summary and category HTML
+built by the worker, sections shown through the lazy outline model). Runs
+without a network and without a display:
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_render.py --sections 400
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication, QTextBrowser, QTreeView
+
+from wiki_query import parse_extract
+from wiki_snapshot import ArticleSnapshot
+from wiki_section_model import SectionTreeModel
+
+
+# Build a wiki-formatted extract with the given number of sections, nested
+# up to three levels deep, and parse it the same way fetched articles are
+def make_article(section_count, paragraph_chars=1500, category_count=60):
+    parts = ["Synthetic summary paragraph. " * 20]
+    for i in range(section_count):
+        marker = "=" * (2 + i % 3)
+        parts.append(f"\n\n{marker} Section {i} {marker}\n" + ("Lorem ipsum dolor sit amet. " * (paragraph_chars // 28)))
+    summary, sections = parse_extract("".join(parts))
+    categories = {f"Category:Synthetic {i}": {} for i in range(category_count)}
+    return {"title": "Synthetic article", "summary": summary, "sections": sections, "categories": categories}
+
+
+# The display_article body before snapshots: runs entirely on the GUI thread
+def legacy_render(article, summary_text, sections_text, categories_text):
+    summary_text.setText(article["summary"])
+    sections_content = []
+
+    def build_sections_html(secs, level=0):
+        for s in secs:
+            indent = "&nbsp;" * level * 4
+            sections_content.append(f"<h{min(level + 2, 6)}>{indent}{s.title}</h{min(level + 2, 6)}>")
+            sections_content.append(f"<p>{indent}{s.text[:500]}...</p>")
+            if s.sections:
+                build_sections_html(s.sections, level + 1)
+
+    build_sections_html(article["sections"])
+    sections_text.setHtml("\n".join(sections_content))
+    categories = ""
+    for category_title in sorted(article["categories"].keys()):
+        categories += f"- {category_title}\n"
+    categories_text.setText(categories)
+
+
+def snapshot_render(snapshot, summary_text, section_model, sections_tree, categories_text):
+    summary_text.setHtml(snapshot.summary_html)
+    section_model.set_sections(snapshot.sections)
+    sections_tree.doItemsLayout()
+    categories_text.setHtml(snapshot.categories_html)
+
+
+def timed(function, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def describe(name, samples):
+    print(f"{name:<34} median {statistics.median(samples):8.2f} ms   max {max(samples):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, default=400, help="number of sections in the article")
+    parser.add_argument("--repeat", type=int, default=20, help="measurements per variant")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    widgets = [QTextBrowser() for _ in range(3)]
+    article = make_article(args.sections)
+    print(f"Article with {args.sections} sections, {len(article['categories'])} categories")
+
+    describe("GUI thread, old display path", timed(lambda: legacy_render(article, *widgets), args.repeat))
+    snapshots = []
+    describe("worker, build snapshot + HTML", timed(
+        lambda: snapshots.append(ArticleSnapshot.from_article("en", article)), args.repeat
+    ))
+    section_model = SectionTreeModel()
+    sections_tree = QTreeView()
+    sections_tree.setUniformRowHeights(True)
+    sections_tree.setModel(section_model)
+    describe("GUI thread, snapshot + outline", timed(
+        lambda: snapshot_render(snapshots[-1], widgets[0], section_model, sections_tree, widgets[2]),
+        args.repeat
+    ))
+    app.processEvents()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark of theme-switch latency with a large article loaded.
+
+Compares the old toggle (handing Qt a fresh stylesheet string and resetting
+palettes on every switch) with ThemeManager (stylesheets compiled once,
+switch by window property). Runs without a network and without a display:
+
+    QT_QPA_PLATFORM=offscreen python benchmarks/bench_theme.py --sections 400
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtWidgets import QApplication
+
+import wiki_gui_tool
+from wiki_snapshot import ArticleSnapshot
+from wiki_themes import DARK_STYLESHEET, LIGHT_STYLESHEET
+from bench_render import make_article
+
+
+# A window that never touches the network (no startup fetch, no restored
+# article), showing the given article
+def make_window(snapshot):
+    window = wiki_gui_tool.WikiReflectionTool(prefetch_depth=0, startup_fetch=False)
+    window.show()
+    window.display_article(snapshot)
+    window.sections_tree.expandAll()
+    QApplication.processEvents()
+    return window
+
+
+# The toggle_theme body before the theme engine
+def legacy_toggle(window, dark):
+    if dark:
+        window.setStyleSheet(DARK_STYLESHEET)
+        window.update()
+    else:
+        window.setStyleSheet(LIGHT_STYLESHEET)
+        default_palette = QApplication.instance().palette()
+        window.language_combo.setPalette(default_palette)
+        window.gui_language_combo.setPalette(default_palette)
+        window.language_combo.setStyleSheet("")
+        window.gui_language_combo.setStyleSheet("")
+
+
+def measure(switch, repeat):
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        switch(i % 2 == 0)
+        QApplication.processEvents()  # include the repaint
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def describe(name, samples):
+    print(f"{name:<28} median {statistics.median(samples):8.2f} ms   max {max(samples):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, default=400, help="number of sections in the loaded article")
+    parser.add_argument("--repeat", type=int, default=20, help="theme switches per variant")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    snapshot = ArticleSnapshot.from_article("en", make_article(args.sections))
+    print(f"Article with {args.sections} sections loaded, sections expanded")
+
+    legacy_window = make_window(snapshot)
+    describe("old toggle (setStyleSheet)", measure(lambda dark: legacy_toggle(legacy_window, dark), args.repeat))
+    legacy_window.close()
+
+    window = make_window(snapshot)
+    describe("ThemeManager.apply", measure(
+        lambda dark: window.apply_theme("dark" if dark else "light"), args.repeat
+    ))
+    window.close()
+    app.processEvents()
+
+
+if __name__ == "__main__":
+    main()
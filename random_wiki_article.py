@@ -1,24 +1,412 @@
-import wikipediaapi
+import os
+import sys
+import json
+import time
+import atexit
+import argparse
+import threading
 import requests
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
 
-# Function to get a random Wikipedia article title using MediaWiki API
-def get_random_article_title(language='en'):
-    url = f"https://{language}.wikipedia.org/w/api.php"
+from wiki_http import get_client, get_transport, configure_transport, POOL_MAXSIZE, HEDGE_PERCENTILE
+from wiki_breaker import CircuitOpenError
+from wiki_cache import get_cache
+from wiki_dump import get_dump, open_dump
+from wiki_stats import LatencyReservoir
+from wiki_titles import get_title_index, build_title_index, NoMatchingTitleError
+from wiki_seen import get_seen, seen_stats
+from wiki_search import get_search_index
+from wiki_snapshot import sections_to_data
+from wiki_backends import get_selector, ARTICLE, RANDOM_ARTICLE, INTRO, RANDOM_INTRO, ALL_LANGUAGES
+from wiki_query import fetch_revisions, fetch_rest_revision, REVALIDATE_BATCH
+from wiki_metrics import (
+    get_metrics, phase, TITLE, CACHE, REVALIDATE, EXTRACT, CATEGORIES,
+    ARTICLE as ARTICLE_PHASE, INTRO as INTRO_PHASE,
+)
+
+# (connect, read) timeout for random picks; a slower network is treated as
+# down and the pick is served from the local cache instead
+SLOW_NETWORK_TIMEOUT = (3.05, 5)
+# Seconds to keep serving from the cache after a network failure before retrying
+OFFLINE_COOLDOWN = 30
+# Smallest rnlimit batch requested for random titles; unused titles are kept
+# as spares, so later picks and collisions with seen titles need no request
+TITLE_BATCH = 20
+# Batches drawn before giving up on finding enough unseen titles
+MAX_TITLE_BATCHES = 5
+
+# Offline mode: either switched on explicitly or entered after a failure
+_offline = {"forced": False, "until": 0.0}
+# Article fetches running right now, keyed by (language, title). Concurrent
+# callers asking for the same article wait for that one upstream fetch.
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+_coalesced = {"count": 0}
+
+def coalesced_fetches():
+    """Number of fetch_article() calls answered by another caller's fetch"""
+    return _coalesced["count"]
+
+# Filters for titles drawn from a local title index
+_title_filter = {"min_length": 0, "namespaces": (0,)}
+# Skip articles already handed out in this or earlier sessions
+_seen_filter = {"enabled": True}
+# Add every fetched article to the full-text search index
+_search_indexing = {"enabled": True}
+# Unused random titles from earlier API batches, per language
+_spare_titles = {}
+_spare_titles_lock = threading.Lock()
+
+def set_title_filter(min_length=0, namespaces=(0,)):
+    _title_filter.update(min_length=max(0, int(min_length)), namespaces=tuple(namespaces))
+
+def set_seen_filter(enabled):
+    _seen_filter["enabled"] = bool(enabled)
+
+def drop_spare_titles(language=None):
+    """Forget the unused titles of earlier batches, so the next pick makes a request"""
+    with _spare_titles_lock:
+        if language is None:
+            _spare_titles.clear()
+        else:
+            _spare_titles.pop(language, None)
+
+def is_seen(language, title):
+    return _seen_filter["enabled"] and title in get_seen(language)
+
+# Record an article as seen once it is shown or written out. Titles that are
+# only picked (prefetched, or fetched unsuccessfully) stay unseen.
+def mark_seen(language, title):
+    if _seen_filter["enabled"] and title:
+        get_seen(language).add(title)
+
+def set_search_indexing(enabled):
+    _search_indexing["enabled"] = bool(enabled)
+
+def index_for_search(language, article):
+    if article and _search_indexing["enabled"]:
+        get_search_index().add(language, article)
+
+def set_offline_mode(enabled):
+    _offline["forced"] = bool(enabled)
+
+def is_offline():
+    return _offline["forced"] or time.monotonic() < _offline["until"]
+
+def mark_network_down():
+    _offline["until"] = time.monotonic() + OFFLINE_COOLDOWN
+
+# A degraded language edition (open circuit breaker) is served from the cache
+# like offline mode, but only for that language
+def use_cache_only(language):
+    return is_offline() or get_transport().is_degraded(language)
+
+def note_network_error(error):
+    # Only an unreachable or timed out server means the network is down; error
+    # statuses, bad answers and a failing-fast circuit do not
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        mark_network_down()
+
+# Function to get a batch of random, not yet seen Wikipedia article titles.
+# The API allows up to 500 titles per call (rnlimit), which lets callers such
+# as the prefetch pool refill several articles for a single round trip.
+# Titles seen before are dropped and replaced from the spare titles of an
+# earlier batch, so collisions do not cost a request each. With a local
+# dump or title index no request is made at all. Returned titles are not
+# marked as seen; see mark_seen().
+def get_random_article_titles(language='en', limit=1):
+    limit = max(1, min(int(limit), 500))
+    titles = []
+    with _spare_titles_lock:
+        spares = _spare_titles.setdefault(language, deque())
+        while spares and len(titles) < limit:
+            title = spares.popleft()
+            if title not in titles and not is_seen(language, title):
+                titles.append(title)
+    for _ in range(MAX_TITLE_BATCHES):
+        if len(titles) >= limit:
+            break
+        batch, spare = draw_titles(language, limit - len(titles))
+        if not batch:
+            break
+        for i, title in enumerate(batch):
+            if len(titles) >= limit:
+                if spare:
+                    with _spare_titles_lock:
+                        _spare_titles[language].extend(batch[i:])
+                break
+            if title not in titles and not is_seen(language, title):
+                titles.append(title)
+    return titles
+
+# Function to draw `count` random titles from the best source for the
+# language. Returns (titles, spare): API batches hold at least TITLE_BATCH
+# titles and their leftovers may be kept; local draws are exact.
+def draw_titles(language, count):
+    with phase(TITLE, language):
+        return _draw_titles(language, count)
+
+def _draw_titles(language, count):
+    dump = get_dump(language)
+    if dump:
+        return dump.random_titles(count), False
+    index = get_title_index(language)
+    if index:
+        titles = index.random_titles(count, **_title_filter)
+        if not titles:
+            # The API's random generator would silently ignore the filters
+            raise NoMatchingTitleError(
+                f"No title of the {language} title index is at least {_title_filter['min_length']} bytes long "
+                f"in namespaces {', '.join(map(str, _title_filter['namespaces']))}"
+            )
+        return titles, False
+    if use_cache_only(language):
+        return [], False
     params = {
         "action": "query",
         "list": "random",
         "rnnamespace": 0, # Only get articles (namespace 0)
-        "rnlimit": 1,
+        "rnlimit": max(TITLE_BATCH, min(count, 500)),
         "format": "json"
     }
     try:
-        response = requests.get(url, params=params)
-        response.raise_for_status() # Raise an exception for bad status codes
-        data = response.json()
-        title = data['query']['random'][0]['title']
-        return title
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching random article title: {e}")
+        # Shared keep-alive session; raises for bad status codes
+        data = get_client(language).query(params)
+        return [item['title'] for item in data['query']['random']], True
+    except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+        print(f"Error fetching random article titles: {e}", file=sys.stderr)
+        note_network_error(e)
+        return [], False
+
+# A random unseen title of the title index to fetch by name, or None when
+# the one-request random generator is used instead. The seen filter alone
+# does not need a title first: the generator's answer carries its title and
+# is checked after the fact (see random_unseen()).
+def draw_title(language):
+    if not get_title_index(language):
+        return None
+    titles = get_random_article_titles(language, limit=1)
+    return titles[0] if titles else None
+
+# Run a random fetch through the backends: by_title with a title of the
+# title index, else at_random, drawn again while it answers with an article
+# shown before. Seen titles are a tiny share of an edition, so this almost
+# always takes the single generator=random round trip.
+def random_unseen(user_agent, language, by_title, at_random, phase_name, fetched=None):
+    title = draw_title(language)
+    operation = by_title if title else at_random
+    result = None
+    for _ in range(1 if title else MAX_TITLE_BATCHES):
+        with phase(phase_name, language, operation):
+            result = get_selector().call(operation, user_agent, language, title=title, timeout=SLOW_NETWORK_TIMEOUT)
+        if result and fetched:
+            fetched(result)
+        if not result or not is_seen(language, result["title"]):
+            break
+    return result
+
+# Function to get a random Wikipedia article title using MediaWiki API
+def get_random_article_title(language='en'):
+    titles = get_random_article_titles(language, limit=1)
+    return titles[0] if titles else None
+
+# Function to fetch a whole article (summary, sections and categories) with
+# wikipediaapi. Every lazy property is resolved here so the result can be
+# handed to another thread without triggering further network calls.
+def fetch_article_wikipediaapi(title, user_agent, language='en'):
+    # One cached client per language instead of a new one per fetch
+    wiki_wiki = get_client(language).wikipediaapi(user_agent)
+    with phase(EXTRACT, language, "wikipediaapi"):
+        page = wiki_wiki.page(title)
+        if not page.exists():
+            return None
+        article = {"title": page.title, "summary": page.summary, "sections": page.sections}
+    # A separate request of its own
+    with phase(CATEGORIES, language, "wikipediaapi"):
+        article["categories"] = page.categories
+    return article
+
+# Function to fetch a whole article. Fresh cache entries are returned without
+# touching the network; otherwise the best backend for the language is used
+# (usually a single combined MediaWiki query), falling back to the slower
+# wikipediaapi path and then to a stale cache entry.
+# While the language is degraded the stale cache entry is used right away.
+# A local dump for the language is tried before the network, and an expired
+# cache entry is revalidated instead of downloaded again when unchanged.
+# Concurrent calls for the same title share one fetch.
+def fetch_article(title, user_agent, language='en'):
+    key = (language, " ".join(title.replace("_", " ").split()))
+    with _in_flight_lock:
+        future = _in_flight.get(key)
+        owner = future is None
+        if owner:
+            future = _in_flight[key] = Future()
+        else:
+            _coalesced["count"] += 1
+    if not owner:
+        return future.result()
+    try:
+        article = _fetch_article(title, user_agent, language)
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    else:
+        future.set_result(article)
+        index_for_search(language, article)
+        return article
+    finally:
+        with _in_flight_lock:
+            del _in_flight[key]
+
+def _fetch_article(title, user_agent, language):
+    cache = get_cache()
+    with phase(CACHE, language):
+        article = cache.get(language, title)
+    if article:
+        return article
+    dump = get_dump(language)
+    if dump:
+        with phase(ARTICLE_PHASE, language, "dump"):
+            article = dump.article(title)
+        if article:
+            return article
+    if use_cache_only(language):
+        return cache.get(language, title, allow_stale=True)
+    with phase(REVALIDATE, language):
+        article = revalidate_article(title, user_agent, language)
+    if article:
+        return article
+    try:
+        with phase(ARTICLE_PHASE, language, ARTICLE):
+            article = get_selector().call(ARTICLE, user_agent, language, title=title)
+    except CircuitOpenError:
+        return cache.get(language, title, allow_stale=True)
+    except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+        print(f"Article query failed, falling back to wikipediaapi: {e}", file=sys.stderr)
+        try:
+            article = fetch_article_wikipediaapi(title, user_agent, language)
+        except Exception as e:
+            print(f"Error fetching article: {e}", file=sys.stderr)
+            note_network_error(e)
+            return cache.get(language, title, allow_stale=True)
+    if article:
+        cache.put(language, article, article.pop("etag", None))
+    return article
+
+# Function to check an expired cached article against the server without
+# downloading it: a conditional REST request (If-None-Match with the stored
+# ETag, answered by an empty 304 while unchanged), or a prop=info revision
+# lookup when REST is unavailable. Returns the renewed cached article, or
+# None when there is none or it changed.
+def revalidate_article(title, user_agent, language='en'):
+    cache = get_cache()
+    validator = cache.validator(language, title)
+    if validator is None:
+        return None
+    revid, etag, _ = validator
+    try:
+        modified, current, etag = fetch_rest_revision(title, user_agent, language, etag, timeout=SLOW_NETWORK_TIMEOUT)
+    except (requests.exceptions.RequestException, KeyError, ValueError):
+        try:
+            modified, etag = True, None
+            current = fetch_revisions([title], user_agent, language, timeout=SLOW_NETWORK_TIMEOUT)[title]
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            print(f"Error revalidating cached article: {e}", file=sys.stderr)
+            note_network_error(e)
+            return None
+    if modified and current != revid:
+        return None
+    cache.renew(language, title, revid, etag)
+    return cache.get(language, title)
+
+# Function to revalidate expired cache entries of a language in batches of
+# REVALIDATE_BATCH titles per prop=info query. Unchanged articles are renewed
+# without transferring them; only changed ones are fetched again.
+def revalidate_cache(user_agent, language='en', limit=None):
+    cache = get_cache()
+    summary = {"checked": 0, "unchanged": 0, "refetched": 0, "gone": 0}
+    seen = set()
+    while not use_cache_only(language) and (limit is None or summary["checked"] < limit):
+        # Entries that could not be renewed stay expired; do not pick them again
+        entries = [e for e in cache.expired_entries(language, REVALIDATE_BATCH + len(seen)) if e[0] not in seen]
+        entries = entries[:REVALIDATE_BATCH]
+        if not entries:
+            break
+        titles = [title for title, _, _ in entries]
+        seen.update(titles)
+        try:
+            current = fetch_revisions(titles, user_agent, language)
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            print(f"Error revalidating cached articles: {e}", file=sys.stderr)
+            note_network_error(e)
+            break
+        for title, revid, etag in entries:
+            summary["checked"] += 1
+            if current.get(title) is None:
+                summary["gone"] += 1
+            elif current[title] == revid:
+                cache.renew(language, title, revid)
+                summary["unchanged"] += 1
+            else:
+                try:
+                    article = get_selector().call(ARTICLE, user_agent, language, title=title)
+                except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+                    print(f"Error refetching changed article: {e}", file=sys.stderr)
+                    continue
+                if article:
+                    cache.put(language, article, article.pop("etag", None))
+                    summary["refetched"] += 1
+    return summary
+
+# Function to fetch a random article in one round trip (no separate title
+# lookup; with a title index the title is drawn locally). When the network is
+# down or too slow, or the language is degraded, a cached article is served.
+# Pass store=False to keep bulk sampling runs out of the local cache and the
+# search index. A local dump for the language replaces the network.
+def fetch_random_article(user_agent, language='en', store=True):
+    article = _fetch_random_article(user_agent, language, store)
+    if store:
+        index_for_search(language, article)
+    return article
+
+def _fetch_random_article(user_agent, language, store):
+    dump = get_dump(language)
+    if dump:
+        with phase(ARTICLE_PHASE, language, "dump"):
+            return random_dump_article(dump, language)
+    cache = get_cache()
+    if not use_cache_only(language):
+        try:
+            store_article = (lambda article: cache.put(language, article, article.pop("etag", None))) if store else None
+            return random_unseen(user_agent, language, ARTICLE, RANDOM_ARTICLE, ARTICLE_PHASE, store_article)
+        except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+            print(f"Error fetching random article, using the offline cache: {e}", file=sys.stderr)
+            note_network_error(e)
+    with phase(CACHE, language, "random"):
+        return cache.random_article(language)
+
+# A random article of a local dump that was not shown before
+def random_dump_article(dump, language):
+    for _ in range(MAX_TITLE_BATCHES):
+        article = dump.random_article()
+        if article is None or not is_seen(language, article["title"]):
+            return article
+    return None
+
+# Function to fetch just the title and summary of a random article, so it
+# can be shown while the rest is fetched with fetch_article(). Returns None
+# when offline or degraded, or when a local dump makes fetch_random_article()
+# just as fast; callers then fall back to it.
+def fetch_random_intro(user_agent, language='en'):
+    if use_cache_only(language) or get_dump(language):
+        return None
+    try:
+        # The summary pane is filled by whichever backend answers intros fastest
+        return random_unseen(user_agent, language, INTRO, RANDOM_INTRO, INTRO_PHASE)
+    except (requests.exceptions.RequestException, KeyError, ValueError) as e:
+        print(f"Error fetching random article summary: {e}", file=sys.stderr)
+        note_network_error(e)
         return None
 
 # Helper function to print sections recursively
@@ -35,56 +423,295 @@ def print_sections(sections, level=0):
         if s.sections:
             print_sections(s.sections, level + 1)
 
+# One JSONL record per fetched article
+def article_to_json(language, article, elapsed_ms):
+    return {
+        "language": language,
+        "title": article["title"],
+        "pageid": article.get("pageid"),
+        "lastrevid": article.get("lastrevid"),
+        "summary": article["summary"],
+        "sections": sections_to_data(article["sections"]),
+        "categories": sorted(article["categories"].keys()),
+        "elapsed_ms": round(elapsed_ms, 1),
+    }
+
+def timed_random_article(user_agent, language, store):
+    start = time.perf_counter()
+    try:
+        with get_metrics().trace(language):
+            article = fetch_random_article(user_agent, language, store=store)
+    except Exception as e:
+        print(f"Error fetching random article: {e}", file=sys.stderr)
+        article = None
+    return language, article, (time.perf_counter() - start) * 1000
+
+# Fetch `count` random articles across the given languages with at most
+# `concurrency` requests in flight, writing each one as a JSONL line as soon
+# as it completes. Only in-flight work is held in memory, so memory use does
+# not grow with count. Returns a throughput and latency summary.
+def run_batch(count, languages, user_agent, concurrency, output, store=False):
+    latencies = LatencyReservoir()
+    per_language = {language: 0 for language in languages}
+    failed = 0
+    start = time.perf_counter()
+
+    def write(future):
+        nonlocal failed
+        language, article, elapsed_ms = future.result()
+        if article is None:
+            failed += 1
+            return
+        latencies.add(elapsed_ms)
+        per_language[language] += 1
+        output.write(json.dumps(article_to_json(language, article, elapsed_ms), ensure_ascii=False) + "\n")
+        output.flush()
+        mark_seen(language, article["title"])
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = set()
+        for i in range(count):
+            # Keep a bounded window of submitted jobs instead of queueing all of them
+            while len(pending) >= concurrency * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    write(future)
+            language = languages[i % len(languages)]
+            pending.add(executor.submit(timed_random_article, user_agent, language, store))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                write(future)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "requested": count,
+        "fetched": latencies.count,
+        "failed": failed,
+        "elapsed_s": elapsed,
+        "articles_per_s": latencies.count / elapsed if elapsed else 0.0,
+        "latency_ms": latencies.summary(),
+        "per_language": per_language,
+        "connections": get_transport().connection_stats(),
+        "rates": get_transport().rate_stats(),
+        "languages": get_transport().language_stats(),
+        "backends": get_selector().stats(),
+        "seen": seen_stats(),
+        "phases": get_metrics().to_json(),
+    }
+
+def print_batch_summary(summary, stream=sys.stderr):
+    latency = summary["latency_ms"]
+    connections = summary["connections"]
+    print(
+        f"Fetched {summary['fetched']}/{summary['requested']} articles "
+        f"({summary['failed']} failed) in {summary['elapsed_s']:.1f} s: "
+        f"{summary['articles_per_s']:.1f} articles/s",
+        file=stream
+    )
+    print(
+        f"Latency ms: mean {latency['mean']:.0f}, p50 {latency['p50']:.0f}, "
+        f"p90 {latency['p90']:.0f}, p99 {latency['p99']:.0f}, max {latency['max']:.0f}",
+        file=stream
+    )
+    print(
+        f"Connections: {connections['connections']} opened for {connections['requests']} requests "
+        f"({connections['reuse_ratio']:.0%} reused)",
+        file=stream
+    )
+    print("Per language: " + ", ".join(f"{k}={v}" for k, v in summary["per_language"].items()), file=stream)
+    for host, rate in summary["rates"].items():
+        print(
+            f"Rate {host}: {rate['rate']:.1f} req/s allowed, window {rate['concurrency']:.1f}, "
+            f"{rate['throttled']} throttled, {rate['congested']} congested",
+            file=stream
+        )
+    for language, stats in summary["languages"].items():
+        print(
+            f"Tail {language}: p50 {stats['p50']:.0f}, p90 {stats['p90']:.0f}, p99 {stats['p99']:.0f} ms, "
+            f"{stats['hedges']} hedged ({stats['hedge_wins']} won), circuit {stats['circuit']['state']}",
+            file=stream
+        )
+    for language, seen in summary["seen"].items():
+        print(
+            f"Seen {language}: {seen['titles']} titles in {seen['bytes'] / 1024:.0f} KiB, "
+            f"~{seen['false_positive_rate']:.3%} false positives",
+            file=stream
+        )
+    for language, phases in summary["phases"].items():
+        print(
+            f"Phases {language} (p50/p90 ms): " + ", ".join(
+                f"{name} {p['p50_ms']:.0f}/{p['p90_ms']:.0f}" for name, p in phases.items()
+            ),
+            file=stream
+        )
+    for language, operations in summary["backends"].items():
+        for operation, backends in operations.items():
+            if operation == "override":
+                continue
+            print(
+                f"Backends {language} {operation}: " + ", ".join(
+                    f"{name} {b['latency_ms'] or 0:.0f} ms ({b['success']:.0%} ok, {b['calls']} calls)"
+                    for name, b in backends.items()
+                ),
+                file=stream
+            )
+
+def write_metrics(path):
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(get_metrics().prometheus_text())
+    except OSError as e:
+        print(f"Error writing metrics to {path}: {e}", file=sys.stderr)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch random Wikipedia articles.")
+    parser.add_argument("-l", "--language",
+                        help="Wikipedia language code, or a comma-separated list for batch mode (default: en)")
+    parser.add_argument("-n", "--batch", type=int, metavar="N",
+                        help="fetch N random articles concurrently and stream them as JSONL")
+    parser.add_argument("-c", "--concurrency", type=int, default=8,
+                        help="maximum number of requests in flight in batch mode (default: 8)")
+    parser.add_argument("-o", "--output", default="-",
+                        help="JSONL output file for batch mode (default: stdout)")
+    parser.add_argument("--store", action="store_true",
+                        help="also store batch results in the local article cache")
+    parser.add_argument("--offline", action="store_true",
+                        help="serve articles from the local cache only")
+    parser.add_argument("--dump", metavar="PATH",
+                        help="read articles of the (first) language from a local "
+                             "pages-articles-multistream.xml.bz2 dump instead of the network")
+    parser.add_argument("--dump-index", metavar="PATH",
+                        help="index file of --dump (default: found next to the dump)")
+    parser.add_argument("--allow-repeats", action="store_true",
+                        help="do not skip articles already shown or exported in earlier runs")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="check expired cached articles of each language against the server and exit")
+    parser.add_argument("--build-index", action="store_true",
+                        help="build (or refresh) the local title index of each language and exit")
+    parser.add_argument("--min-length", type=int, default=0, metavar="BYTES",
+                        help="only draw titles of pages at least this long from the title index")
+    parser.add_argument("--backend", default=os.environ.get("WIKI_BACKEND") or "auto",
+                        help="backend for all languages: action, rest, local (WIKI_LOCAL_URL), or auto "
+                             "to pick per language by measured latency and success rate (default: auto)")
+    parser.add_argument("--hedge", type=float, default=HEDGE_PERCENTILE, metavar="P",
+                        help="send a duplicate request when no answer came within this latency "
+                             f"percentile of the language, 0 disables (default: {HEDGE_PERCENTILE})")
+    parser.add_argument("-s", "--search", metavar="QUERY",
+                        help="search the articles fetched so far (titles, text and categories) and exit")
+    parser.add_argument("--reindex", action="store_true",
+                        help="add every article of the local cache to the search index and exit")
+    parser.add_argument("--metrics-log", default=os.environ.get("WIKI_METRICS_LOG"), metavar="PATH",
+                        help="append the phase timings of every fetch to PATH as JSON lines")
+    parser.add_argument("--metrics-out", metavar="PATH",
+                        help="write per-phase latency histograms to PATH in Prometheus text format on exit")
+    return parser.parse_args(argv)
+
 # Main part of the script
 if __name__ == "__main__":
+    args = parse_args()
     # Specify your project's user agent
     # Replace 'MyProjectName' and 'merlin@example.com' with your actual project name and contact
     user_agent = 'RandomWikiReflectionTool (YourProjectName <your_email@example.com>)'
-    language = 'en' # You can change the language here
+    languages = [code.strip() for code in (args.language or "en").split(",") if code.strip()]
+    language = languages[0] # The single-article mode uses the first language
+    set_offline_mode(args.offline)
+    if args.dump:
+        open_dump(language, args.dump, args.dump_index)
+    set_title_filter(min_length=args.min_length)
+    set_seen_filter(not args.allow_repeats)
+    get_selector().set_override(ALL_LANGUAGES, args.backend)
+    hedge_percentile = args.hedge if 0 < args.hedge < 1 else None
+    if hedge_percentile != HEDGE_PERCENTILE:
+        configure_transport(user_agent=user_agent, hedge_percentile=hedge_percentile)
+    get_metrics().set_log(args.metrics_log)
+    if args.metrics_out:
+        atexit.register(write_metrics, args.metrics_out)
 
-    random_title = get_random_article_title(language)
+    if args.search is not None:
+        # Every language unless one was asked for explicitly
+        search_language = language if args.language and len(languages) == 1 else None
+        results = get_search_index().search(args.search, search_language, marks=("[", "]"))
+        for result in results:
+            print(f"{result['language']}: {result['title']}")
+            print(f"    {result['snippet']}")
+        if not results:
+            print("No matching articles.", file=sys.stderr)
+        sys.exit(0 if results else 1)
 
-    if random_title:
-        print(f"Fetching article: {random_title}")
+    if args.reindex:
+        index = get_search_index()
+        count = 0
+        for code, article in get_cache().articles():
+            index.add(code, article)
+            count += 1
+        index.flush()
+        print(f"Indexed {count} cached articles ({index.stats()['articles']} in the search index)", file=sys.stderr)
+        sys.exit(0)
 
-        # Initialize Wikipedia API
-        wiki_wiki = wikipediaapi.Wikipedia(
-            user_agent=user_agent,
-            language=language,
-            extract_format=wikipediaapi.ExtractFormat.WIKI # Or ExtractFormat.HTML
-        )
+    if args.revalidate:
+        for code in languages:
+            result = revalidate_cache(user_agent, code)
+            print(
+                f"{code}: {result['checked']} checked, {result['unchanged']} unchanged, "
+                f"{result['refetched']} refetched, {result['gone']} gone",
+                file=sys.stderr
+            )
+        sys.exit(0)
+
+    if args.build_index:
+        for code in languages:
+            def progress(count, code=code):
+                print(f"\r{code}: {count} titles", end="", file=sys.stderr, flush=True)
+            path = build_title_index(code, progress=progress)
+            print(f"\n{code}: title index written to {path}", file=sys.stderr)
+        sys.exit(0)
 
-        page = wiki_wiki.page(random_title)
+    if args.batch:
+        concurrency = max(1, args.concurrency)
+        # Give every worker its own keep-alive connection per host, plus one for a hedge
+        configure_transport(user_agent=user_agent, pool_maxsize=max(POOL_MAXSIZE, concurrency * 2),
+                            hedge_percentile=hedge_percentile)
+        output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            summary = run_batch(args.batch, languages, user_agent, concurrency, output, store=args.store)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        print_batch_summary(summary)
+        sys.exit(0 if summary["fetched"] else 1)
 
-        if page.exists():
-            print("\n" + "=" * 50) # Top separator
-            print(f"Article: {page.title}")
-            print("=" * 50 + "\n") # Bottom separator for title
+    # Title, extract, sections and categories arrive in one round trip
+    with get_metrics().trace(language):
+        article = fetch_random_article(user_agent, language)
 
-            # Print Summary
-            print("Summary:")
+    if article:
+        print("\n" + "=" * 50) # Top separator
+        print(f"Article: {article['title']}")
+        print("=" * 50 + "\n") # Bottom separator for title
+
+        # Print Summary
+        print("Summary:")
+        print("-" * 10)
+        print(article["summary"])
+        print("\n") # Add a newline after summary
+
+        # Print Sections
+        if article["sections"]:
+            print("Sections:")
             print("-" * 10)
-            print(page.summary)
-            print("\n") # Add a newline after summary
-
-            # Print Sections
-            if page.sections:
-                print("Sections:")
-                print("-" * 10)
-                print_sections(page.sections)
-                print("\n") # Add a newline after sections
-
-            # Print Categories
-            if page.categories:
-                print("Categories:")
-                print("-" * 10)
-                # Categories are returned as a dictionary-like object
-                for category_title in sorted(page.categories.keys()):
-                    # Print the full category title
-                    print(f"- {category_title}")
-                print("\n")
+            print_sections(article["sections"])
+            print("\n") # Add a newline after sections
 
-        else:
-            print(f"Article '{random_title}' not found.")
+        # Print Categories
+        if article["categories"]:
+            print("Categories:")
+            print("-" * 10)
+            # Categories are returned as a dictionary keyed by title
+            for category_title in sorted(article["categories"].keys()):
+                # Print the full category title
+                print(f"- {category_title}")
+            print("\n")
+        mark_seen(language, article["title"])
     else:
-        print("Could not retrieve a random article title.") 
\ No newline at end of file
+        print("Could not retrieve a random article.")
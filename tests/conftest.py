@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wiki_http  # noqa: E402
+import wiki_cache  # noqa: E402
+import wiki_search  # noqa: E402
+from wiki_fake_server import start_fake_server, synthetic_corpus  # noqa: E402
+
+FAKE_ARTICLES = 200
+
+
+@pytest.fixture(scope="session")
+def fake_server():
+    server = start_fake_server(pages=synthetic_corpus(FAKE_ARTICLES), latency=0, jitter=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+# The shared transport pointed at the fake server (without hedging), and the
+# local caches and indexes under a temporary directory
+@pytest.fixture
+def fake_wiki(fake_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(wiki_http, "_transport", None)
+    monkeypatch.setattr(wiki_cache, "_cache", None)
+    monkeypatch.setattr(wiki_search, "_index", None)
+    transport = wiki_http.configure_transport(base_url=fake_server.base_url, hedge_percentile=None)
+    yield fake_server
+    transport.close()
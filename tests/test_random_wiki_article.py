@@ -0,0 +1,15 @@
+import io
+import json
+
+from random_wiki_article import run_batch
+
+
+def test_batch_streams_one_json_line_per_article(fake_wiki):
+    output = io.StringIO()
+    report = run_batch(6, ["en", "de"], "test-agent", 3, output)
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert (report["requested"], report["fetched"], report["failed"]) == (6, 6, 0)
+    assert report["per_language"] == {"en": 3, "de": 3}
+    assert sorted(line["language"] for line in lines) == ["de"] * 3 + ["en"] * 3
+    titles = set(fake_wiki.sorted_titles)
+    assert all(line["title"] in titles and line["sections"] for line in lines)
@@ -0,0 +1,54 @@
+import pytest
+
+from wiki_backends import RestBackend, ActionApiBackend, parse_page_html, html_to_text, ARTICLE, INTRO
+from wiki_query import parse_query_page
+
+PARSOID_HTML = """<!DOCTYPE html>
+<html prefix="dc: http://purl.org/dc/terms/ mw: http://mediawiki.org/rdf/"
+ about="https://en.wikipedia.org/wiki/Special:Redirect/revision/1234567">
+<head><meta charset="utf-8"/><meta property="mw:pageId" content="42"/>
+<title>Ada Lovelace</title></head>
+<body>
+<section data-mw-section-id="0">
+<table class="infobox"><tr><td>Born 1815</td></tr></table>
+<p><b>Ada Lovelace</b> was a mathematician.<sup class="reference">[1]</sup></p>
+<p>She wrote the first program.</p>
+</section>
+<section data-mw-section-id="1"><div class="mw-heading mw-heading2"><h2 id="Early_life">Early life</h2></div>
+<p>Born in London.</p>
+<section data-mw-section-id="2"><h3 id="Education">Education</h3><p>Tutored at home.</p></section>
+</section>
+<section data-mw-section-id="3"><h2 id="Legacy">Legacy</h2><style>.x{}</style><p>Ada Lovelace Day.</p></section>
+<link rel="mw:PageProp/Category" href="./Category:English_mathematicians#Lovelace"/>
+<link rel="mw:PageProp/Category" href="./Category:1815_births"/>
+</body></html>"""
+
+
+def test_parse_page_html():
+    article = parse_page_html(PARSOID_HTML)
+    assert article["title"] == "Ada Lovelace"
+    assert (article["pageid"], article["lastrevid"]) == (42, 1234567)
+    assert article["summary"] == "Ada Lovelace was a mathematician.\nShe wrote the first program."
+    early, legacy = article["sections"]
+    assert (early.title, early.level, early.text) == ("Early life", 1, "Born in London.")
+    assert [(s.title, s.level, s.text) for s in early.sections] == [("Education", 2, "Tutored at home.")]
+    assert (legacy.title, legacy.text, legacy.sections) == ("Legacy", "Ada Lovelace Day.", [])
+    assert list(article["categories"]) == ["Category:English mathematicians", "Category:1815 births"]
+
+
+def test_html_to_text_drops_references_and_tables():
+    assert html_to_text("<p>One<sup>[2]</sup> two</p><table><tr><td>x</td></tr></table><p>Three</p>") == "One two\nThree"
+
+
+@pytest.mark.parametrize("backend", [RestBackend(), ActionApiBackend()], ids=lambda b: b.name)
+def test_backends_agree_on_fake_server_articles(fake_wiki, backend):
+    page = fake_wiki.pages[11]
+    article = backend.call(ARTICLE, "test-agent", "en", title=page["title"])
+    expected = parse_query_page(page)
+    assert (article["title"], article["summary"], article["lastrevid"]) == (
+        expected["title"], expected["summary"], expected["lastrevid"]
+    )
+    assert [s.title for s in article["sections"]] == [s.title for s in expected["sections"]]
+    assert set(article["categories"]) == set(expected["categories"])
+    intro = backend.call(INTRO, "test-agent", "en", title=page["title"])
+    assert intro["summary"] == expected["summary"]
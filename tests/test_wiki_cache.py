@@ -0,0 +1,192 @@
+import os
+import random
+
+import pytest
+
+import wiki_cache
+from wiki_cache import ArticleCache
+from wiki_query import WikiSection
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(wiki_cache.time, "time", clock)
+    return clock
+
+
+def make_article(title, revid=1, size=200):
+    # Random text, so the compressed payload is about `size` bytes
+    rng = random.Random(title)
+    section = WikiSection("History", 1, "".join(rng.choice("abcdefghij ") for _ in range(size)))
+    section.sections = [WikiSection("Early years", 2, "Early text.")]
+    return {
+        "title": title, "summary": f"About {title}.", "sections": [section],
+        "categories": {"Category:Tests": {"ns": 14, "title": "Category:Tests"}},
+        "pageid": 1, "lastrevid": revid,
+    }
+
+
+def test_round_trip_keeps_the_article(tmp_path, clock):
+    cache = ArticleCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("en", make_article("Alpha", revid=5), etag="W/5")
+    article = cache.get("en", "Alpha")
+    assert article["summary"] == "About Alpha."
+    assert article["lastrevid"] == 5
+    assert list(article["categories"]) == ["Category:Tests"]
+    (history,) = article["sections"]
+    assert (history.title, history.level) == ("History", 1)
+    assert history.sections[0].text == "Early text."
+    assert cache.validator("en", "Alpha") == (5, "W/5", False)
+    assert cache.get("de", "Alpha") is None
+    cache.close()
+
+
+def test_newer_revision_replaces_the_older_one(tmp_path, clock):
+    cache = ArticleCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("en", make_article("Alpha", revid=1))
+    cache.put("en", make_article("Alpha", revid=2))
+    assert cache.get("en", "Alpha")["lastrevid"] == 2
+    assert cache.get("en", "Alpha", revid=1) is None
+    assert cache.stats()["entries"] == 1
+    cache.close()
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, clock):
+    probe = ArticleCache(":memory:")
+    probe.put("en", make_article("Probe"))
+    size = probe.stats()["bytes"]
+    probe.close()
+
+    cache = ArticleCache(str(tmp_path / "cache.sqlite3"), max_bytes=int(size * 4.5))
+    for i in range(4):
+        clock.now += 1
+        cache.put("en", make_article(f"Title {i}"))
+    clock.now += 1
+    assert cache.get("en", "Title 0") is not None  # now the most recently used
+    clock.now += 1
+    cache.put("en", make_article("Title 4"))
+
+    stats = cache.stats()
+    assert stats["bytes"] <= cache.max_bytes * wiki_cache.EVICTION_TARGET
+    assert stats["evictions"] >= 1
+    assert cache.get("en", "Title 1") is None
+    assert cache.get("en", "Title 0") is not None
+    assert cache.get("en", "Title 4") is not None
+    cache.close()
+
+
+def test_expired_entries_are_served_only_when_stale_is_allowed(tmp_path, clock):
+    cache = ArticleCache(str(tmp_path / "cache.sqlite3"), ttl=3600)
+    cache.put("en", make_article("Alpha", revid=3), etag="W/3")
+    clock.now += 3601
+    assert cache.get("en", "Alpha") is None
+    assert cache.get("en", "Alpha", allow_stale=True)["title"] == "Alpha"
+    assert cache.validator("en", "Alpha") == (3, "W/3", True)
+    assert cache.expired_entries("en") == [("Alpha", 3, "W/3")]
+
+    cache.renew("en", "Alpha", 3)
+    assert cache.get("en", "Alpha") is not None
+    assert cache.expired_entries("en") == []
+
+    clock.now += 3601
+    assert cache.purge_expired() == 1
+    assert cache.get("en", "Alpha", allow_stale=True) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["stale_hits"], stats["revalidated"], stats["expired"]) == (1, 1, 1, 1)
+    cache.close()
+
+
+def test_articles_survive_reopening(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ArticleCache(path)
+    for i in range(3):
+        cache.put("en" if i % 2 else "de", make_article(f"Title {i}"))
+    cache.close()
+
+    reopened = ArticleCache(path)
+    assert sorted((language, a["title"]) for language, a in reopened.articles(batch=2)) == [
+        ("de", "Title 0"), ("de", "Title 2"), ("en", "Title 1"),
+    ]
+    assert reopened.random_article("en")["title"] == "Title 1"
+    assert reopened.random_article("fr") is None
+    reopened.close()
+    assert os.path.exists(path)
+
+
+def test_byte_total_follows_puts_evictions_and_purges(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ArticleCache(path, max_bytes=1000, ttl=3600)
+
+    def table_bytes():
+        return cache._db.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+
+    for i in range(20):
+        clock.now += 1
+        cache.put("en", make_article(f"Title {i % 7}", revid=i))
+        assert cache.stats()["bytes"] == table_bytes()
+    assert cache.stats()["evictions"] > 0
+    clock.now += 3601
+    cache.put("en", make_article("Fresh"))
+    cache.purge_expired()
+    total = cache.stats()["bytes"]
+    assert total == table_bytes() > 0
+    cache.close()
+    reopened = ArticleCache(path)
+    assert reopened.stats()["bytes"] == total
+    reopened.close()
+
+
+def test_rest_fetch_stores_its_etag_on_the_first_write(fake_wiki):
+    import random_wiki_article
+    from wiki_backends import get_selector, ALL_LANGUAGES
+    page = fake_wiki.pages[21]
+    get_selector().set_override(ALL_LANGUAGES, "rest")
+    try:
+        article = random_wiki_article.fetch_article(page["title"], "test-agent", "en")
+    finally:
+        get_selector().set_override(ALL_LANGUAGES, None)
+    assert "etag" not in article
+    assert wiki_cache.get_cache().validator("en", page["title"]) == (page["lastrevid"], f'W/"{page["lastrevid"]}"', False)
+
+
+def test_expired_article_is_revalidated_with_its_etag(fake_wiki, monkeypatch):
+    import random_wiki_article
+    from wiki_backends import get_selector, ALL_LANGUAGES
+    page = fake_wiki.pages[22]
+    get_selector().set_override(ALL_LANGUAGES, "rest")
+    try:
+        random_wiki_article.fetch_article(page["title"], "test-agent", "en")
+    finally:
+        get_selector().set_override(ALL_LANGUAGES, None)
+    cache = wiki_cache.get_cache()
+
+    def expire():
+        cache._db.execute("UPDATE articles SET fetched_at = 0")
+
+    # Unchanged: an empty 304 renews the cached copy
+    expire()
+    before = fake_wiki.stats()["requests"]
+    article = random_wiki_article.fetch_article(page["title"], "test-agent", "en")
+    after = fake_wiki.stats()["requests"]
+    assert article["lastrevid"] == page["lastrevid"]
+    assert after.get("title", 0) == before.get("title", 0) + 1
+    assert (after.get("html"), after.get("api")) == (before.get("html"), before.get("api"))
+    assert cache.validator("en", page["title"])[2] is False
+    assert cache.stats()["revalidated"] == 1
+
+    # Edited since: the ETag no longer matches and the new revision is fetched
+    monkeypatch.setitem(page, "lastrevid", page["lastrevid"] + 1)
+    expire()
+    article = random_wiki_article.fetch_article(page["title"], "test-agent", "en")
+    assert article["lastrevid"] == page["lastrevid"]
+    assert cache.validator("en", page["title"])[0] == page["lastrevid"]
+    assert cache.stats()["revalidated"] == 1
@@ -0,0 +1,132 @@
+import bz2
+import random
+
+import pytest
+
+from wiki_dump import MultistreamDump, normalize_title
+from wiki_query import WikiSection
+
+SITEINFO = """<mediawiki>
+<siteinfo>
+<sitename>Wikipedia</sitename>
+<namespaces>
+<namespace key="0" />
+<namespace key="6">File</namespace>
+<namespace key="14">Category</namespace>
+</namespaces>
+</siteinfo>
+"""
+
+ARTICLE_TEXT = """'''Alpha''' is a {{lang|en|test}} article about [[Greek alphabet|letters]].<ref>Source</ref>
+
+== History ==
+It was first used [[Phoenicia|long ago]].
+
+=== Origins ===
+Older still.
+
+[[Category:Letters]]
+[[File:Alpha.png|thumb|A caption]]
+"""
+
+
+def page_xml(pageid, title, text="", ns=0, redirect=None):
+    redirect_tag = f'<redirect title="{redirect}" />' if redirect else ""
+    return (
+        f"<page><title>{title}</title><ns>{ns}</ns><id>{pageid}</id>{redirect_tag}"
+        f"<revision><id>{pageid * 10}</id><text>{text}</text></revision></page>\n"
+    )
+
+
+def escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def write_dump(directory, pages, per_stream=2):
+    """Write pages (id, title, text, ns, redirect) as a multistream dump with a .bz2 index"""
+    dump_path = directory / "xxwiki-20240101-pages-articles-multistream.xml.bz2"
+    index_path = directory / "xxwiki-20240101-pages-articles-multistream-index.txt.bz2"
+    index_lines = []
+    with open(dump_path, "wb") as out:
+        out.write(bz2.compress(SITEINFO.encode("utf-8")))
+        for start in range(0, len(pages), per_stream):
+            offset = out.tell()
+            stream = "".join(page_xml(*page) for page in pages[start:start + per_stream])
+            out.write(bz2.compress(stream.encode("utf-8")))
+            index_lines += [f"{offset}:{page[0]}:{page[1]}\n" for page in pages[start:start + per_stream]]
+        out.write(bz2.compress(b"</mediawiki>"))
+    index_path.write_bytes(bz2.compress("".join(index_lines).encode("utf-8")))
+    return str(dump_path), str(index_path)
+
+
+# A tiny dump: a siteinfo stream, then streams of two pages each (articles,
+# a redirect, a category page and a file page)
+@pytest.fixture
+def dump(tmp_path):
+    pages = [
+        (1, "Alpha", escape(ARTICLE_TEXT), 0, None),
+        (2, "Beta", "Beta has no sections. [[Category:Letters]]", 0, None),
+        (3, "A", "", 0, "Alpha"),
+        (4, "Category:Letters", "Letters.", 14, None),
+        (5, "File:Alpha.png", "An image.", 6, None),
+        (6, "Gamma ray", "High energy.", 0, None),
+    ]
+    dump = MultistreamDump(*write_dump(tmp_path, pages), "xx")
+    yield dump
+    dump.close()
+
+
+def test_random_draws_skip_redirects_and_other_namespaces(dump):
+    dump._random = random.Random(1)
+    titles = {title for _ in range(50) for title in dump.random_titles(2)}
+    assert titles == {"Alpha", "Beta", "Gamma ray"}
+
+
+def test_random_article_payload_shape(dump):
+    article = dump.random_article()
+    assert set(article) == {"title", "summary", "sections", "categories", "pageid", "lastrevid"}
+    assert article["lastrevid"] == article["pageid"] * 10
+
+
+def test_article_by_title_parses_wikitext(dump):
+    article = dump.article("alpha")
+    assert article["title"] == "Alpha"
+    assert article["summary"] == "Alpha is a article about letters."
+    assert article["categories"] == {"Category:Letters": {"ns": 14, "title": "Category:Letters"}}
+    [history] = article["sections"]
+    assert isinstance(history, WikiSection)
+    assert (history.title, history.level, history.text) == ("History", 1, "It was first used long ago.")
+    assert [(s.title, s.level, s.text) for s in history.sections] == [("Origins", 2, "Older still.")]
+
+
+def test_article_follows_one_redirect(dump):
+    assert dump.article("A")["pageid"] == 1
+
+
+def test_article_lookup_of_titles_not_in_namespace_zero_or_missing(dump):
+    assert dump.article("Category:Letters") is None
+    assert dump.article("Delta") is None
+    assert dump.article("Gamma_ray")["title"] == "Gamma ray"
+
+
+def test_sidecars_are_reused(dump):
+    reopened = MultistreamDump(dump.dump_path, dump.index_path, "xx")
+    try:
+        assert reopened.count == 6
+        assert reopened.article("Beta")["summary"] == "Beta has no sections."
+    finally:
+        reopened.close()
+
+
+def test_every_title_is_found_despite_hash_collisions(tmp_path):
+    pages = [(i, f"Page {i}", f"Text {i}.", 0, None) for i in range(1, 2001)]
+    dump = MultistreamDump(*write_dump(tmp_path, pages, per_stream=100), "xx")
+    try:
+        assert all(dump._find_title(f"Page {i}")[1] == i for i in range(1, 2001))
+        assert dump._find_title("Page 2001") is None
+    finally:
+        dump.close()
+
+
+def test_normalize_title():
+    assert normalize_title("  gamma_ray  ") == "Gamma ray"
@@ -0,0 +1,107 @@
+import os
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QEventLoop  # noqa: E402
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+from wiki_gui_tool import WikiReflectionTool  # noqa: E402
+from wiki_query import parse_query_page  # noqa: E402
+from wiki_snapshot import ArticleSnapshot  # noqa: E402
+
+TIMEOUT = 10
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def window(app, fake_wiki):
+    window = WikiReflectionTool(prefetch_depth=0, startup_fetch=False)
+    yield window
+    window.close()
+    app.processEvents()
+
+
+def wait_until(app, condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 20)
+
+
+def snapshot(fake_wiki, index, language):
+    return ArticleSnapshot.from_article(language, parse_query_page(fake_wiki.pages[index]))
+
+
+def test_history_steps_switch_the_current_language(window, fake_wiki):
+    window.show_snapshot(snapshot(fake_wiki, 1, "en"))
+    window.show_snapshot(snapshot(fake_wiki, 2, "de"))
+    assert (window.language, window.language_combo.currentText()) == ("de", "German")
+    window.go_back()
+    assert (window.language, window.language_combo.currentText()) == ("en", "English")
+    window.go_forward()
+    assert window.language == "de"
+    # The combo was synced without fetching
+    assert window.history.current().title == fake_wiki.pages[2]["title"]
+
+
+def test_editions_view_compares_and_switches_edition(app, window, fake_wiki):
+    window.show_snapshot(snapshot(fake_wiki, 3, "en"))
+    window.show_editions()
+    view = window.editions_view
+    wait_until(app, lambda: view.chosen and len(view.times) == len(view.chosen))
+    assert not view.jobs
+    chosen = view.chosen[0]
+    panel = view.panels[chosen]
+    assert panel.snapshot.title == fake_wiki.pages[3]["title"]
+
+    panel.clicked.emit(panel.snapshot)
+    assert window.language == chosen
+    assert window.history.current() is panel.snapshot
+
+    # Comparing again after every job finished cancels nothing that is gone
+    view.compare()
+    wait_until(app, lambda: len(view.times) == len(view.chosen))
+    view.close()
+
+
+def test_superseded_langlinks_lookup_does_not_fill_the_view(app, window, fake_wiki, monkeypatch):
+    monkeypatch.setattr(fake_wiki, "latency", 0.2)
+    first, second = snapshot(fake_wiki, 4, "en"), snapshot(fake_wiki, 5, "en")
+    window.show_snapshot(first)
+    window.show_editions()
+    view = window.editions_view
+    (job,) = view.jobs
+    view.show_article(second)
+    assert job not in view.jobs
+    assert job._cancelled.is_set()
+    wait_until(app, lambda: len(view.times) == len(view.chosen))
+    time.sleep(0.3)
+    app.processEvents()
+    assert ("en", first.title) not in view.links_cache
+    assert ("en", second.title) in view.links_cache
+    assert all(panel.snapshot.title == second.title for panel in view.panels.values())
+    view.close()
+
+
+def test_search_runs_off_the_gui_thread_once_typing_pauses(app, window, fake_wiki):
+    from wiki_search import get_search_index
+    page = fake_wiki.pages[6]
+    index = get_search_index()
+    index.add("en", parse_query_page(page))
+    index.flush()
+    for i in range(1, len(page["title"]) + 1):
+        window.search_box.setText(page["title"][:i])
+    assert window.search_results.count() == 0  # nothing searched while typing
+    wait_until(app, lambda: window.search_results.count() > 0)
+    assert window.search_generation == 1
+    item = window.search_results.item(0)
+    assert item.text().startswith(page["title"])
+    window.search_box.setText("")
+    wait_until(app, lambda: not window.search_results.isVisibleTo(window))
@@ -0,0 +1,94 @@
+import pytest
+
+import wiki_history
+from wiki_cache import ArticleCache
+from wiki_history import ArticleHistory, SpilledEntry
+from wiki_snapshot import ArticleSnapshot, SectionSnapshot
+
+
+def make_snapshot(i, text_size=10):
+    sections = [SectionSnapshot("Body", 1, "x" * text_size)]
+    return ArticleSnapshot("en", f"Title {i}", f"Summary {i}.", sections, ["Category:Tests"], pageid=i, lastrevid=100 + i)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ArticleCache(str(tmp_path / "cache.sqlite3"))
+    yield cache
+    cache.close()
+
+
+def test_back_and_forward_walk_the_visited_articles(cache):
+    history = ArticleHistory(cache=cache)
+    snapshots = [make_snapshot(i) for i in range(3)]
+    for snapshot in snapshots:
+        assert history.visit(snapshot)
+    assert not history.visit(snapshots[-1])
+    assert history.back() is snapshots[1]
+    assert history.back() is snapshots[0]
+    assert history.back() is None
+    assert not history.can_go_back()
+    assert history.forward() is snapshots[1]
+    assert history.can_go_forward()
+
+
+def test_visiting_drops_the_forward_entries(cache):
+    history = ArticleHistory(cache=cache)
+    for i in range(3):
+        history.visit(make_snapshot(i))
+    history.back()
+    history.back()
+    history.visit(make_snapshot(9))
+    assert not history.can_go_forward()
+    assert history.stats()["entries"] == 2
+    assert history.back().title == "Title 0"
+
+
+def test_farthest_entries_spill_to_the_cache_and_come_back(cache):
+    history = ArticleHistory(max_snapshots=3, cache=cache)
+    for i in range(6):
+        history.visit(make_snapshot(i))
+    stats = history.stats()
+    assert (stats["entries"], stats["in_memory"], stats["spilled"]) == (6, 3, 3)
+    assert isinstance(history._entries[0], SpilledEntry)
+    assert cache.validator("en", "Title 0")[0] == 100
+
+    for i in reversed(range(5)):
+        snapshot = history.back()
+        assert (snapshot.title, snapshot.lastrevid, snapshot.summary) == (f"Title {i}", 100 + i, f"Summary {i}.")
+        assert snapshot.sections[0].text == "x" * 10
+    # Walking back spilled the newest entries in turn
+    assert history.stats()["in_memory"] == 3
+    assert isinstance(history._entries[5], SpilledEntry)
+    assert history.forward().title == "Title 1"
+
+
+def test_byte_cap_spills_large_snapshots(cache):
+    first = make_snapshot(0, text_size=4000)
+    history = ArticleHistory(max_bytes=first.nbytes() + 1000, cache=cache)
+    history.visit(first)
+    history.visit(make_snapshot(1, text_size=4000))
+    assert history.stats()["spilled"] == 1
+    assert history.stats()["bytes"] <= history.max_bytes
+    assert history.back().title == "Title 0"
+
+
+def test_entries_missing_from_the_cache_are_skipped(cache):
+    history = ArticleHistory(max_snapshots=1, cache=cache)
+    for i in range(3):
+        history.visit(make_snapshot(i))
+    with cache._lock:
+        cache._db.execute("DELETE FROM articles WHERE title = ?", ("Title 1",))
+    assert history.back().title == "Title 0"
+    assert history.stats()["entries"] == 2
+
+
+def test_old_references_are_forgotten(cache, monkeypatch):
+    monkeypatch.setattr(wiki_history, "MAX_SPILLED", 4)
+    history = ArticleHistory(max_snapshots=2, cache=cache)
+    for i in range(10):
+        history.visit(make_snapshot(i))
+    stats = history.stats()
+    assert stats["entries"] == 6
+    assert stats["position"] == 5
+    assert history.current().title == "Title 9"
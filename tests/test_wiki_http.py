@@ -0,0 +1,131 @@
+import time
+import threading
+
+import pytest
+import requests
+
+import wiki_http
+import wiki_ratelimit
+from wiki_breaker import CLOSED, HALF_OPEN, OPEN, FAILURE_THRESHOLD, CircuitOpenError
+from wiki_http import WikiTransport
+
+QUERY = {"action": "query", "list": "random", "rnlimit": 1, "format": "json", "formatversion": 2}
+
+
+# A private transport on the fake server, without retries so every failing
+# query is one request and one breaker failure, and without the limiter
+# slowing down after each 503
+@pytest.fixture
+def transport(fake_server, monkeypatch):
+    monkeypatch.setattr(wiki_ratelimit, "THROTTLE_FACTOR", 1.0)
+    transport = WikiTransport(base_url=fake_server.base_url, hedge_percentile=None, max_retries=0)
+    yield transport
+    transport.close()
+
+
+def api_requests(server):
+    return server.stats()["requests"].get("api", 0)
+
+
+def test_breaker_opens_fails_fast_and_closes_after_a_trial(fake_server, transport, monkeypatch):
+    client = transport.client("en")
+    monkeypatch.setattr(fake_server, "error_rate", 1.0)
+    for _ in range(FAILURE_THRESHOLD):
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.query(QUERY)
+    assert client.breaker.state == OPEN and transport.is_degraded("en")
+
+    # Open: nothing reaches the server
+    sent = api_requests(fake_server)
+    with pytest.raises(CircuitOpenError):
+        client.query(QUERY)
+    assert api_requests(fake_server) == sent
+    assert client.breaker.stats()["rejected"] == 1
+
+    # Half open after the reset timeout: one trial, which closes the circuit
+    client.breaker.reset_timeout = 0.05
+    time.sleep(0.06)
+    assert not transport.is_degraded("en")
+    monkeypatch.setattr(fake_server, "error_rate", 0.0)
+    assert client.query(QUERY)["query"]["random"]
+    assert client.breaker.state == CLOSED and client.breaker.failures == 0
+
+
+def test_failed_trial_reopens_and_only_one_trial_is_let_through(fake_server, transport, monkeypatch):
+    client = transport.client("de")
+    breaker = client.breaker
+    monkeypatch.setattr(fake_server, "error_rate", 1.0)
+    for _ in range(FAILURE_THRESHOLD):
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.query(QUERY)
+    breaker.reset_timeout = 0.05
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    # A second caller fails fast while the trial is in flight
+    with pytest.raises(CircuitOpenError):
+        client.query(QUERY)
+    breaker.record_failure()
+    assert breaker.state == OPEN and breaker.stats()["opened"] == 2
+    with pytest.raises(CircuitOpenError):
+        client.query(QUERY)
+
+
+def test_hedge_wins_over_a_stuck_request(fake_server, transport, monkeypatch):
+    monkeypatch.setattr(wiki_http, "HEDGE_DEFAULT_DELAY", 0.05)
+    transport.hedge_percentile = 0.9
+    client = transport.client("en")
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(threading.current_thread().name)
+        if len(calls) == 1:
+            release.wait(5)
+            return "stuck"
+        return client._timed_query(QUERY, None, None)
+
+    result = transport.hedged(client, call)
+    release.set()
+    # The duplicate's answer is returned; the primary's is dropped when it ends
+    assert result["query"]["random"]
+    assert len(calls) == 2
+    assert (client.hedges, client.hedge_wins) == (1, 1)
+
+
+def test_queued_hedge_is_cancelled_when_the_primary_answers(fake_server, transport, monkeypatch):
+    monkeypatch.setattr(wiki_http, "HEDGE_DEFAULT_DELAY", 0.05)
+    # One worker: the duplicate waits in the queue behind the slow primary
+    monkeypatch.setattr(wiki_http, "HEDGE_WORKERS", 1)
+    transport.hedge_percentile = 0.9
+    client = transport.client("en")
+    calls = []
+
+    def call():
+        calls.append(time.perf_counter())
+        time.sleep(0.1)
+        return client._timed_query(QUERY, None, None)
+
+    assert transport.hedged(client, call)["query"]["random"]
+    transport._hedge_pool.shutdown(wait=True)
+    assert len(calls) == 1
+    assert (client.hedges, client.hedge_wins) == (1, 0)
+
+
+def test_failed_primary_falls_back_to_the_hedge(fake_server, transport, monkeypatch):
+    monkeypatch.setattr(wiki_http, "HEDGE_DEFAULT_DELAY", 0.05)
+    transport.hedge_percentile = 0.9
+    client = transport.client("en")
+    calls = []
+
+    def call():
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(0.1)
+            raise requests.exceptions.ConnectionError("reset")
+        time.sleep(0.2)
+        return client._timed_query(QUERY, None, None)
+
+    assert transport.hedged(client, call)["query"]["random"]
+    assert client.hedge_wins == 1
@@ -0,0 +1,23 @@
+import json
+
+import pytest
+
+from wiki_metrics import ARTICLE, FETCH, TITLE, PhaseMetrics
+
+
+def test_failed_fetch_is_still_recorded(tmp_path):
+    log_path = tmp_path / "metrics.jsonl"
+    metrics = PhaseMetrics(str(log_path))
+    with pytest.raises(ConnectionError):
+        with metrics.trace("en") as trace:
+            with metrics.phase(TITLE, "en"):
+                pass
+            with metrics.phase(ARTICLE, "en"):
+                raise ConnectionError("reset")
+    assert metrics.last_trace() is trace
+    assert metrics.current_trace() is None
+    report = metrics.to_json()["en"]
+    assert report[FETCH]["count"] == 1 and report[ARTICLE]["count"] == 1
+    metrics.set_log(None)
+    [line] = log_path.read_text(encoding="utf-8").splitlines()
+    assert json.loads(line)["language"] == "en"
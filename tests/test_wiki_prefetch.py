@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+from wiki_prefetch import ArticlePrefetcher
+from wiki_snapshot import ArticleSnapshot
+
+TIMEOUT = 10
+
+
+def wait_ready(prefetcher, language, count):
+    deadline = time.monotonic() + TIMEOUT
+    while prefetcher.ready_count(language) < count:
+        assert time.monotonic() < deadline, "prefetcher did not fill up"
+        time.sleep(0.01)
+
+
+# Every test ends with the pool full, so no refill outlives the fake server
+@pytest.fixture
+def prefetcher(fake_wiki):
+    prefetcher = ArticlePrefetcher("test-agent", depth=3, concurrency=2)
+    yield prefetcher
+    prefetcher.shutdown()
+
+
+def test_warm_fills_the_pool_with_snapshots(prefetcher, fake_wiki):
+    prefetcher.warm("en")
+    wait_ready(prefetcher, "en", 3)
+    time.sleep(0.05)
+    assert prefetcher.ready_count("en") == 3
+
+    titles = {page["title"] for page in fake_wiki.pages}
+    snapshot = prefetcher.pop("en")
+    assert isinstance(snapshot, ArticleSnapshot)
+    assert snapshot.language == "en"
+    assert snapshot.title in titles
+    wait_ready(prefetcher, "en", 3)
+
+
+def test_pop_tops_the_pool_up_again(prefetcher):
+    prefetcher.warm("en")
+    wait_ready(prefetcher, "en", 3)
+    popped = {prefetcher.pop("en").title for _ in range(3)}
+    assert len(popped) == 3
+    wait_ready(prefetcher, "en", 3)
+
+
+def test_empty_pool_returns_none_and_starts_a_refill(prefetcher):
+    assert prefetcher.pop("de") is None
+    wait_ready(prefetcher, "de", 3)
+
+
+def test_no_refill_after_shutdown(fake_wiki):
+    prefetcher = ArticlePrefetcher("test-agent", depth=2)
+    prefetcher.shutdown()
+    prefetcher.warm("en")
+    assert prefetcher.pop("en") is None
+    assert prefetcher.ready_count("en") == 0
@@ -0,0 +1,65 @@
+from wiki_query import parse_extract, parse_query_page, fetch_article_combined
+
+EXTRACT = (
+    "Summary line one.\nSummary line two.\n\n"
+    "== History ==\nHistory text.\n\n"
+    "=== Early years ===\nEarly text.\n\n"
+    "==== Childhood ====\nChildhood text.\n\n"
+    "=== Later years ===\nLater text.\n\n"
+    "== Legacy ==\nLegacy text."
+)
+
+
+def test_parse_extract_builds_the_section_tree():
+    summary, sections = parse_extract(EXTRACT)
+    assert summary == "Summary line one.\nSummary line two."
+    assert [(s.title, s.level) for s in sections] == [("History", 1), ("Legacy", 1)]
+    history, legacy = sections
+    assert history.text == "History text."
+    assert [s.title for s in history.sections] == ["Early years", "Later years"]
+    assert history.sections[0].sections[0].title == "Childhood"
+    assert history.sections[0].sections[0].level == 3
+    assert history.sections[1].text == "Later text."
+    assert legacy.text == "Legacy text."
+    assert legacy.sections == []
+
+
+def test_parse_extract_without_sections_is_all_summary():
+    summary, sections = parse_extract("  Just a stub.\nSecond line.  ")
+    assert summary == "Just a stub.\nSecond line."
+    assert sections == []
+
+
+def test_parse_extract_keeps_empty_sections():
+    summary, sections = parse_extract("Intro.\n\n== See also ==\n\n\n== References ==\n")
+    assert summary == "Intro."
+    assert [(s.title, s.text) for s in sections] == [("See also", ""), ("References", "")]
+
+
+def test_parse_extract_closes_deeper_sections_on_a_shallower_heading():
+    _, sections = parse_extract("S.\n\n== A ==\na\n\n==== Deep ====\nd\n\n== B ==\nb")
+    assert [s.title for s in sections] == ["A", "B"]
+    assert [s.title for s in sections[0].sections] == ["Deep"]
+
+
+def test_parse_query_page():
+    page = {
+        "title": "Example", "pageid": 7, "lastrevid": 42, "extract": EXTRACT,
+        "categories": [{"ns": 14, "title": "Category:Examples"}],
+    }
+    article = parse_query_page(page)
+    assert article["title"] == "Example"
+    assert article["pageid"] == 7 and article["lastrevid"] == 42
+    assert list(article["categories"]) == ["Category:Examples"]
+    assert [s.title for s in article["sections"]] == ["History", "Legacy"]
+    assert parse_query_page({"title": "Gone", "missing": True}) is None
+    assert parse_query_page({"title": "No extract", "pageid": 1}) is None
+
+
+def test_fetch_article_combined_against_the_fake_server(fake_wiki):
+    page = fake_wiki.pages[3]
+    article = fetch_article_combined(page["title"], "test-agent", "en")
+    assert article["title"] == page["title"]
+    assert article["summary"] == parse_extract(page["extract"])[0]
+    assert set(article["categories"]) == {c["title"] for c in page.get("categories", [])}
+    assert fetch_article_combined("No such article at all", "test-agent", "en") is None
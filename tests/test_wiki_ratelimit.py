@@ -0,0 +1,123 @@
+import time
+import threading
+
+import pytest
+
+import wiki_ratelimit
+from wiki_ratelimit import (
+    HostLimiter, RateLimiterRegistry, backoff_delay, parse_retry_after,
+    INITIAL_RATE, INITIAL_CONCURRENCY, SLOW_START_FACTOR, RATE_STEP, THROTTLE_FACTOR, CONGESTION_FACTOR,
+    MIN_RATE, MAX_RATE, MIN_CONCURRENCY, MAX_CONCURRENCY, MIN_LATENCY_SAMPLES,
+)
+
+
+def request(limiter, **outcome):
+    limiter.acquire()
+    limiter.release(**outcome)
+
+
+def test_slow_start_raises_rate_and_window_per_success():
+    limiter = HostLimiter("example.org")
+    for _ in range(3):
+        request(limiter, latency=0.05)
+    assert limiter.rate == pytest.approx(INITIAL_RATE * SLOW_START_FACTOR ** 3)
+    assert limiter.concurrency == pytest.approx(INITIAL_CONCURRENCY + 3)
+    assert limiter.in_flight == 0
+
+
+def test_throttling_halves_and_ends_slow_start():
+    limiter = HostLimiter("example.org", rate=40, concurrency=8)
+    request(limiter, throttled=True)
+    assert limiter.rate == pytest.approx(40 * THROTTLE_FACTOR)
+    assert limiter.concurrency == pytest.approx(8 * THROTTLE_FACTOR)
+    assert limiter.throttled == 1
+
+    # Additive increase from now on
+    request(limiter, latency=0.05)
+    assert limiter.rate == pytest.approx(20 + RATE_STEP / 20)
+    assert limiter.concurrency == pytest.approx(4 + 1 / 4)
+
+
+def test_decrease_stops_at_the_minimum():
+    limiter = HostLimiter("example.org", rate=1, concurrency=1)
+    for _ in range(5):
+        limiter.pause(0)
+    assert (limiter.rate, limiter.concurrency) == (MIN_RATE, MIN_CONCURRENCY)
+
+
+def test_increase_stops_at_the_maximum():
+    limiter = HostLimiter("example.org", rate=100, concurrency=MAX_CONCURRENCY - 0.5)
+    request(limiter, latency=0.01)
+    assert limiter.concurrency == MAX_CONCURRENCY
+
+
+def test_latency_well_above_the_median_is_congestion():
+    limiter = HostLimiter("example.org", rate=20, concurrency=4)
+    for _ in range(MIN_LATENCY_SAMPLES - 1):
+        request(limiter, latency=0.01)
+    # Too few samples for a baseline yet
+    request(limiter, latency=1.0)
+    assert limiter.congested == 0
+
+    for _ in range(MIN_LATENCY_SAMPLES):
+        request(limiter, latency=0.01)
+    before = limiter.rate
+    request(limiter, latency=0.03)  # ordinary jitter
+    assert limiter.congested == 0
+    request(limiter, latency=1.0)
+    assert limiter.congested == 1
+    assert limiter.rate == pytest.approx(min(MAX_RATE, before * SLOW_START_FACTOR) * CONGESTION_FACTOR)
+    assert limiter.stats()["congested"] == 1
+
+
+def test_retry_after_pauses_the_host():
+    limiter = HostLimiter("example.org")
+    request(limiter, throttled=True, retry_after=30)
+    assert limiter.stats()["paused_for"] == pytest.approx(30, abs=1)
+
+
+def test_concurrency_window_blocks_until_release():
+    limiter = HostLimiter("example.org", rate=1000, concurrency=1)
+    limiter.acquire()
+    entered = threading.Event()
+
+    def second():
+        limiter.acquire()
+        entered.set()
+
+    thread = threading.Thread(target=second, daemon=True)
+    thread.start()
+    assert not entered.wait(0.1)
+    limiter.release(latency=0.01)
+    assert entered.wait(2)
+    thread.join(2)
+    assert limiter.in_flight == 1
+
+
+def test_registry_keeps_one_limiter_per_host():
+    registry = RateLimiterRegistry()
+    assert registry.for_host("a.example") is registry.for_host("a.example")
+    assert registry.for_host("a.example") is not registry.for_host("b.example")
+    assert set(registry.stats()) == {"a.example", "b.example"}
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("-5") == 0.0
+    assert parse_retry_after("") is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+
+
+def test_backoff_delay_stays_under_the_cap():
+    for attempt in range(20):
+        delay = backoff_delay(attempt)
+        assert 0 <= delay <= min(wiki_ratelimit.BACKOFF_CAP, wiki_ratelimit.BACKOFF_BASE * 2 ** attempt)
+
+
+def test_first_second_of_requests_is_not_held_back():
+    limiter = HostLimiter("example.org", rate=10, concurrency=32)
+    start = time.monotonic()
+    for _ in range(10):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.05
@@ -0,0 +1,96 @@
+import pytest
+
+import wiki_search
+from wiki_search import SearchIndex, match_query
+from wiki_query import WikiSection
+
+
+def make_article(title, summary="", body="", categories=(), revid=1):
+    sections = [WikiSection("Body", 1, body)] if body else []
+    return {
+        "title": title, "summary": summary, "sections": sections,
+        "categories": {f"Category:{c}": {} for c in categories}, "lastrevid": revid,
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.sqlite3"))
+    yield index
+    index.close()
+
+
+def titles(results):
+    return [r["title"] for r in results]
+
+
+def test_match_query():
+    assert match_query("Ada Lovelace") == '"ada" "lovelace"*'
+    assert match_query("ada lovelace ") == '"ada" "lovelace"'
+    assert match_query("Ada L") == '"ada" "l"'
+    assert match_query("  ?! ") is None
+
+
+def test_title_matches_rank_above_body_matches(index):
+    index.add("en", make_article("Lighthouse keeping", summary="A trade on the coast."))
+    index.add("en", make_article("Coastal trades", summary="Harbours and ports.", body="The lighthouse guided ships."))
+    index.add("en", make_article("Foghorns", summary="Sound signals.", categories=["Lighthouse equipment"]))
+    index.add("en", make_article("Unrelated", summary="Nothing to see."))
+    index.flush()
+    assert titles(index.search("lighthouse ")) == ["Lighthouse keeping", "Foghorns", "Coastal trades"]
+
+
+def test_prefix_matches_while_typing(index):
+    index.add("en", make_article("Astronomy", summary="Study of stars."))
+    index.add("en", make_article("Astrology", summary="Not a science."))
+    index.flush()
+    assert set(titles(index.search("astro"))) == {"Astronomy", "Astrology"}
+    assert titles(index.search("astron")) == ["Astronomy"]
+    assert index.search("astro ") == []
+
+
+def test_language_filter_and_snippet_marks(index):
+    index.add("en", make_article("Bridge", summary="A bridge spans a river."))
+    index.add("de", make_article("Brücke", summary="Eine bridge über den Fluss."))
+    index.flush()
+    assert {r["language"] for r in index.search("bridge ")} == {"en", "de"}
+    (result,) = index.search("bridge ", language="de")
+    assert result["title"] == "Brücke"
+    assert "[bridge]" in index.search("bridge ", language="de", marks=("[", "]"))[0]["snippet"]
+
+
+def test_diacritics_are_ignored(index):
+    index.add("de", make_article("Brücke", summary="Bauwerk."))
+    index.flush()
+    assert titles(index.search("brucke ")) == ["Brücke"]
+
+
+def test_same_revision_is_indexed_once_and_new_revisions_replace_it(index):
+    index.add("en", make_article("Comet", summary="Icy body.", revid=1))
+    index.add("en", make_article("Comet", summary="Icy body.", revid=1))
+    index.flush()
+    assert index.stats()["articles"] == 1
+    index.add("en", make_article("Comet", summary="A small solar system body with a tail.", revid=2))
+    index.flush()
+    assert titles(index.search("tail ")) == ["Comet"]
+    assert index.search("icy ") == []
+    assert index.stats()["articles"] == 1
+
+
+def test_broad_queries_list_title_matches_first(index, monkeypatch):
+    monkeypatch.setattr(wiki_search, "RANKED_MATCHES", 3)
+    for i in range(5):
+        index.add("en", make_article(f"Article {i}", summary="Mentions river."))
+    index.add("en", make_article("River", summary="Flowing water."))
+    index.flush()
+    results = titles(index.search("river ", limit=4))
+    assert results[0] == "River"
+    assert results[1:] == ["Article 4", "Article 3", "Article 2"]
+
+
+def test_a_bad_article_does_not_stop_the_indexing_thread(index, capsys):
+    index.add("en", make_article("Broken", summary=None, body="x") | {"sections": None})
+    index.add("en", make_article("Glacier", summary="Moving ice."))
+    index.flush()
+    assert titles(index.search("ice ")) == ["Glacier"]
+    assert "Error indexing articles" in capsys.readouterr().err
@@ -0,0 +1,90 @@
+import pytest
+
+import random_wiki_article
+from wiki_seen import BloomFilter, ScalableBloomFilter, SeenTitles, get_seen
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    keys = [f"Title {i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert not bloom.add("Title 7")
+
+
+def test_bloom_filter_false_positive_rate_stays_near_target():
+    bloom = BloomFilter(2000, 0.01)
+    for i in range(2000):
+        bloom.add(f"Seen {i}")
+    false_positives = sum(f"Unseen {i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.03
+
+
+def test_scalable_filter_grows_and_keeps_every_key():
+    bloom = ScalableBloomFilter()
+    keys = [f"Title {i}" for i in range(50000)]
+    for key in keys:
+        bloom.add(key)
+    assert len(bloom.filters) > 1
+    assert all(key in bloom for key in keys)
+    assert bloom.count <= len(keys)
+
+
+def test_seen_titles_persist(tmp_path):
+    path = str(tmp_path / "en.bloom")
+    seen = SeenTitles("en", path)
+    assert seen.add("Alpha")
+    assert not seen.add("Alpha")
+    seen.save()
+    reloaded = SeenTitles("en", path)
+    assert "Alpha" in reloaded and "Beta" not in reloaded
+    assert reloaded.stats()["titles"] == 1
+
+
+@pytest.fixture
+def seen_filter(fake_wiki, monkeypatch):
+    monkeypatch.setattr(random_wiki_article, "_spare_titles", {})
+    monkeypatch.setattr("wiki_seen._seen", {})
+    monkeypatch.setitem(random_wiki_article._seen_filter, "enabled", True)
+    return get_seen("en")
+
+
+def test_picked_titles_are_not_marked_seen(seen_filter):
+    titles = random_wiki_article.get_random_article_titles("en", limit=5)
+    assert len(titles) == 5 == len(set(titles))
+    assert not any(title in seen_filter for title in titles)
+
+
+def test_shown_titles_are_skipped(seen_filter, fake_wiki):
+    shown = fake_wiki.sorted_titles[:-50]
+    for title in shown:
+        random_wiki_article.mark_seen("en", title)
+    titles = random_wiki_article.get_random_article_titles("en", limit=3)
+    assert titles and not set(titles) & set(shown)
+
+
+def test_allow_repeats_neither_filters_nor_marks(seen_filter, monkeypatch):
+    monkeypatch.setitem(random_wiki_article._seen_filter, "enabled", False)
+    random_wiki_article.mark_seen("en", "Alpha")
+    assert "Alpha" not in seen_filter
+
+
+def test_random_fetch_with_the_filter_is_one_generator_request(seen_filter, fake_wiki, monkeypatch):
+    from wiki_backends import get_selector, ALL_LANGUAGES
+    get_selector().set_override(ALL_LANGUAGES, "action")
+    try:
+        before = fake_wiki.stats()["requests"].get("api", 0)
+        article = random_wiki_article.fetch_random_article("test-agent", "en", store=False)
+        assert article["title"] in fake_wiki.by_title
+        assert fake_wiki.stats()["requests"]["api"] - before == 1
+
+        # Articles shown before are drawn again
+        monkeypatch.setattr(random_wiki_article, "MAX_TITLE_BATCHES", 100)
+        shown = set(fake_wiki.sorted_titles[:150])
+        for title in shown:
+            random_wiki_article.mark_seen("en", title)
+        for _ in range(5):
+            assert random_wiki_article.fetch_random_article("test-agent", "en", store=False)["title"] not in shown
+    finally:
+        get_selector().set_override(ALL_LANGUAGES, None)
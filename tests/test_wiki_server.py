@@ -0,0 +1,86 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import urlopen
+
+import pytest
+
+import random_wiki_article
+from wiki_server import WikiServer, check_language, parse_args
+
+
+@pytest.fixture
+def server(fake_wiki):
+    server = WikiServer(("127.0.0.1", 0), "test-agent", prefetch_depth=0, languages=("en", "de"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path):
+    try:
+        with urlopen(f"http://127.0.0.1:{server.server_port}{path}", timeout=10) as response:
+            return response.status, json.load(response)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+
+def test_check_language():
+    assert check_language("en", {"en"}) == "en"
+    for language in ("fr", "EN", "e", "evil.example.com/x", "../../tmp", "en-", ""):
+        with pytest.raises(ValueError):
+            check_language(language, {"en", "EN", "e", "fr"} - {"fr"})
+
+
+@pytest.mark.parametrize("path", [
+    "/random?language=evil.example.com%2F",
+    "/random?language=..%2F..%2Ftmp",
+    "/article?language=fr&title=Foo",
+    "/batch?language=en,xx&count=2",
+    "/search?q=foo&language=..",
+    "/attacker.example/w/api.php?generator=random",
+])
+def test_unknown_languages_are_rejected(server, fake_wiki, path):
+    before = fake_wiki.stats()["requests"]
+    status, data = get(server, path)
+    assert status == 400
+    assert "language" in data["error"].lower()
+    assert fake_wiki.stats()["requests"] == before
+
+
+def test_article_by_title(server, fake_wiki):
+    page = fake_wiki.pages[5]
+    status, data = get(server, f"/article?language=de&title={quote(page['title'])}")
+    assert status == 200
+    assert data["title"] == page["title"]
+    status, _ = get(server, "/article?language=en&title=No%20such%20article")
+    assert status == 404
+
+
+def test_concurrent_requests_for_one_title_share_one_fetch(server, fake_wiki, monkeypatch):
+    monkeypatch.setattr(fake_wiki, "latency", 0.3)
+    page = fake_wiki.pages[7]
+    before = sum(fake_wiki.stats()["requests"].values())
+    coalesced = random_wiki_article.coalesced_fetches()
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        results = list(executor.map(
+            lambda _: get(server, f"/article?language=en&title={quote(page['title'])}"), range(6)
+        ))
+    assert [status for status, _ in results] == [200] * 6
+    assert {data["title"] for _, data in results} == {page["title"]}
+    assert random_wiki_article.coalesced_fetches() - coalesced == 5
+    # One fetch, whichever backend served it (the selector may try a second one)
+    assert sum(fake_wiki.stats()["requests"].values()) - before <= 2
+
+
+def test_parse_args_checks_languages():
+    args = parse_args(["--languages", "en,de", "-l", "de"])
+    assert (args.languages, args.language) == (["en", "de"], ["de"])
+    with pytest.raises(SystemExit):
+        parse_args(["--languages", "en", "-l", "de"])
+    with pytest.raises(SystemExit):
+        parse_args(["--languages", "en,../x"])
@@ -0,0 +1,20 @@
+import pytest
+
+from wiki_soak import growth, parse_args
+
+
+def test_growth_compares_the_averaged_ends():
+    samples = [{"traced_mb": value} for value in (10, 11, 12, 20, 30, 31, 32)]
+    assert growth(samples, "traced_mb") == 20
+    assert growth(samples[:2], "traced_mb") == 1
+
+
+def test_growth_needs_two_samples():
+    with pytest.raises(ValueError):
+        growth([{"traced_mb": 1.0}], "traced_mb")
+
+
+def test_a_soak_without_measured_fetches_is_refused():
+    with pytest.raises(SystemExit):
+        parse_args(["--fetches", "0"])
+    assert parse_args(["--fetches", "1", "--warmup", "0"]).fetches == 1
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+import wiki_titles
+import random_wiki_article
+from wiki_http import get_client
+from wiki_titles import TitleIndex, build_title_index, get_title_index, index_path, read_state
+
+
+@pytest.fixture
+def small_batches(monkeypatch):
+    monkeypatch.setattr(wiki_titles, "BATCH_SIZE", 30)
+    monkeypatch.setattr(wiki_titles, "CHECKPOINT_EVERY", 1)
+
+
+def test_build_indexes_every_title(fake_wiki, small_batches):
+    path = build_title_index("en")
+    index = get_title_index("en")
+    assert index.path == path
+    assert sorted(index.title(i) for i in range(index.count)) == fake_wiki.sorted_titles
+    assert read_state(path)["built_at"]
+    assert not os.path.exists(path + ".partial")
+
+
+def test_interrupted_build_is_not_served_and_resumes(fake_wiki, small_batches, monkeypatch):
+    client = get_client("en")
+    query = client.query
+    calls = []
+
+    def failing_query(params, **kwargs):
+        calls.append(params)
+        if len(calls) > 3:
+            raise ConnectionError("interrupted")
+        return query(params, **kwargs)
+
+    monkeypatch.setattr(client, "query", failing_query)
+    with pytest.raises(ConnectionError):
+        build_title_index("en")
+    # Three batches were checkpointed, but only to the partial file
+    partial = TitleIndex(index_path("en") + ".partial")
+    assert partial.count == 90
+    partial.close()
+    assert get_title_index("en") is None
+
+    monkeypatch.setattr(client, "query", query)
+    build_title_index("en")
+    index = get_title_index("en")
+    assert sorted(index.title(i) for i in range(index.count)) == fake_wiki.sorted_titles
+
+
+def test_index_of_an_unfinished_build_is_refused(fake_wiki, small_batches):
+    path = build_title_index("en")
+    with open(path + ".json", "w", encoding="utf-8") as f:
+        f.write('{"namespaces": [0], "pending": [0], "continue": null}')
+    assert get_title_index("en") is None
+
+
+def test_filters(fake_wiki, small_batches):
+    build_title_index("en")
+    index = get_title_index("en")
+    lengths = {page["title"]: page["length"] for page in fake_wiki.pages}
+    cutoff = sorted(lengths.values())[-20]
+    titles = index.random_titles(50, min_length=cutoff)
+    assert len(titles) == 50 and all(lengths[title] >= cutoff for title in titles)
+    assert index.random_title(namespaces=(14,)) is None
+
+
+def test_unmatched_filter_is_reported_instead_of_ignored(fake_wiki, small_batches, monkeypatch):
+    build_title_index("en")
+    monkeypatch.setitem(random_wiki_article._title_filter, "min_length", 10 ** 9)
+    with pytest.raises(wiki_titles.NoMatchingTitleError):
+        random_wiki_article.draw_titles("en", 1)
+
+
+def recent_changes(client, monkeypatch, changes):
+    query = client.query
+
+    def fake_query(params, **kwargs):
+        if params.get("list") == "recentchanges":
+            return {"batchcomplete": True, "query": {"recentchanges": changes}}
+        return query(params, **kwargs)
+
+    monkeypatch.setattr(client, "query", fake_query)
+
+
+def test_refresh_applies_new_deleted_and_moved_pages(fake_wiki, small_batches, monkeypatch):
+    build_title_index("en")
+    titles = fake_wiki.sorted_titles
+    lengths = {page["title"]: page["length"] for page in fake_wiki.pages}
+    recent_changes(get_client("en"), monkeypatch, [
+        {"type": "new", "ns": 0, "title": "Fresh page", "newlen": 1234},
+        {"type": "new", "ns": 0, "title": "Fresh redirect", "newlen": 20, "redirect": True},
+        # Created while the build ran: allpages listed it already
+        {"type": "new", "ns": 0, "title": titles[0], "newlen": lengths[titles[0]]},
+        {"type": "log", "ns": 0, "title": titles[1], "logtype": "delete", "logaction": "delete"},
+        {"type": "log", "ns": 0, "title": titles[2], "logtype": "move", "logaction": "move",
+         "logparams": {"target_ns": 0, "target_title": "Moved page"}},
+        {"type": "log", "ns": 0, "title": "Moved page", "logtype": "move", "logaction": "move_redir",
+         "logparams": {"target_ns": 0, "target_title": "Moved again"}},
+        {"type": "log", "ns": 0, "title": titles[3], "logtype": "move", "logaction": "move",
+         "logparams": {"target_ns": 2, "target_title": "User:Draft"}},
+    ])
+    build_title_index("en")
+    index = get_title_index("en")
+    entries = {index.title(i): index._lengths[i] for i in range(index.count)}
+    assert index.count == len(entries)
+    expected = set(titles) - set(titles[1:4]) | {"Fresh page", "Moved again"}
+    assert set(entries) == expected
+    assert entries["Fresh page"] == 1234
+    assert entries["Moved again"] == lengths[titles[2]]
@@ -0,0 +1,375 @@
+import os
+import re
+import time
+import random
+import threading
+from html.parser import HTMLParser
+from urllib.parse import quote, unquote
+
+from wiki_http import get_client
+from wiki_breaker import CircuitOpenError
+from wiki_query import (
+    WikiSection, fetch_article_combined, fetch_random_article_combined,
+    fetch_random_intro_combined, fetch_intro_combined,
+)
+
+# Operations a backend can implement
+ARTICLE = "article"                # full article by title
+RANDOM_ARTICLE = "random_article"  # full random article
+INTRO = "intro"                    # title and summary by title
+RANDOM_INTRO = "random_intro"      # title and summary of a random article
+
+# Weight of the newest sample in the moving latency and success averages
+EWMA_WEIGHT = 0.2
+# Share of calls sent to a backend other than the best one to keep its numbers current
+EXPLORE_RATE = 0.05
+# Success rate below which a backend is scored as if it had this rate (avoids division by zero)
+MIN_SUCCESS = 0.05
+# Action API compatible stand-in server used by the "local" backend, as a base URL template
+LOCAL_BASE_URL = os.environ.get("WIKI_LOCAL_URL")
+# Backend forced for every language ("action", "rest", "local"); empty or "auto" picks by measurements
+DEFAULT_OVERRIDE = os.environ.get("WIKI_BACKEND")
+# Override key that applies to all languages
+ALL_LANGUAGES = "*"
+RE_REVISION = re.compile(r"/revision/(\d+)")
+
+
+# Collects the text of an HTML fragment, one line per block element.
+# References, tables and styles are dropped like in plain-text extracts.
+class _TextExtractor(HTMLParser):
+    BLOCKS = {"p", "div", "li", "br", "h1", "h2", "h3", "h4", "h5", "h6", "dd", "dt", "blockquote"}
+    SKIPPED = {"style", "script", "sup", "table", "figure"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skip = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self._skip += 1
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self._skip = max(0, self._skip - 1)
+        elif tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip:
+            self.parts.append(data)
+
+
+def join_lines(parts):
+    lines = (" ".join(line.split()) for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def html_to_text(html):
+    extractor = _TextExtractor()
+    extractor.feed(html or "")
+    extractor.close()
+    return join_lines(extractor.parts)
+
+
+# Turns the Parsoid HTML of a page (REST page/html) into an article payload.
+# Parsoid wraps every section, headings included, in nested <section>
+# elements; the headingless first one is the lead. Categories are <link
+# rel="mw:PageProp/Category"> elements, and the page id and revision are in
+# the document head.
+class _ParsoidArticle(_TextExtractor):
+    HEADINGS = {"h1": 0, "h2": 1, "h3": 2, "h4": 3, "h5": 4, "h6": 5}
+
+    def __init__(self):
+        super().__init__()
+        self.title = None
+        self.pageid = None
+        self.revid = None
+        self.categories = {}
+        self.root = {"title": None, "level": 0, "parts": [], "sections": []}
+        self._open = [self.root]  # sections being read, outermost first
+        self._heading = None      # parts of the heading being read
+        self._in_title = False
+        self.parts = self.root["parts"]
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "html" and attrs.get("about"):
+            match = RE_REVISION.search(attrs["about"])
+            self.revid = int(match.group(1)) if match else None
+        elif tag == "title":
+            self._in_title = True
+            self.parts = []
+        elif tag == "meta" and attrs.get("property") == "mw:pageId":
+            self.pageid = int(attrs["content"])
+        elif tag == "link" and attrs.get("rel") == "mw:PageProp/Category":
+            name = unquote(attrs.get("href", "").lstrip("./").split("#")[0]).replace("_", " ")
+            self.categories[name] = {"ns": 14, "title": name}
+        elif tag == "section":
+            section = {"title": None, "level": None, "parts": [], "sections": []}
+            self._open.append(section)
+            self.parts = section["parts"]
+        elif tag in self.HEADINGS and not self._skip and self._open[-1]["title"] is None:
+            self._open[-1]["level"] = self.HEADINGS[tag]
+            self._heading = self.parts = []
+        else:
+            super().handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "title" and self._in_title:
+            self.title = join_lines(self.parts)
+            self._in_title = False
+            self.parts = self._open[-1]["parts"]
+        elif tag == "section" and len(self._open) > 1:
+            section = self._open.pop()
+            parent = self._open[-1]
+            if section["title"] is None:
+                # Headingless (the lead, or a wrapper): its content belongs to the parent
+                parent["parts"].extend(section["parts"])
+                parent["sections"].extend(section["sections"])
+            else:
+                parent["sections"].append(section)
+            self.parts = parent["parts"]
+        elif tag in self.HEADINGS and self._heading is not None:
+            self._open[-1]["title"] = join_lines(self._heading)
+            self._heading = None
+            self.parts = self._open[-1]["parts"]
+        else:
+            super().handle_endtag(tag)
+
+    def sections(self, items=None):
+        sections = []
+        for item in self.root["sections"] if items is None else items:
+            section = WikiSection(item["title"], item["level"], join_lines(item["parts"]))
+            section.sections = self.sections(item["sections"])
+            sections.append(section)
+        return sections
+
+
+def parse_page_html(html):
+    """Article payload (as wiki_query.parse_query_page() returns) from Parsoid page HTML"""
+    parser = _ParsoidArticle()
+    parser.feed(html)
+    parser.close()
+    return {
+        "title": parser.title,
+        "summary": join_lines(parser.root["parts"]),
+        "sections": parser.sections(),
+        "categories": parser.categories,
+        "pageid": parser.pageid,
+        "lastrevid": parser.revid,
+    }
+
+
+# Source of article data. Each backend implements some of the operations
+# (ARTICLE, RANDOM_ARTICLE, INTRO, RANDOM_INTRO) and returns the same payload
+# shapes as wiki_query: full articles as in parse_query_page(), intros as
+# {"title", "summary", "pageid", "lastrevid"}. A full article answered by a
+# REST endpoint also carries the response's "etag", for the article cache.
+class Backend:
+    name = None
+    operations = ()
+
+    def available(self, language):
+        return True
+
+    def call(self, operation, user_agent, language, title=None, timeout=None):
+        raise NotImplementedError
+
+
+# MediaWiki action API: one combined extracts|categories|info query per article
+class ActionApiBackend(Backend):
+    name = "action"
+    operations = (ARTICLE, RANDOM_ARTICLE, INTRO, RANDOM_INTRO)
+
+    def __init__(self, base_url=None):
+        self.base_url = base_url
+
+    def call(self, operation, user_agent, language, title=None, timeout=None):
+        options = {"timeout": timeout, "base_url": self.base_url}
+        if operation == ARTICLE:
+            return fetch_article_combined(title, user_agent, language, **options)
+        if operation == RANDOM_ARTICLE:
+            return fetch_random_article_combined(user_agent, language, **options)
+        if operation == INTRO:
+            return fetch_intro_combined(title, user_agent, language, **options)
+        return fetch_random_intro_combined(user_agent, language, **options)
+
+
+# An action API compatible server run next to the app (a mirror, a test
+# stand-in or wiki_server.py), configured with WIKI_LOCAL_URL; unavailable otherwise
+class LocalBackend(ActionApiBackend):
+    name = "local"
+
+    def __init__(self, base_url=LOCAL_BASE_URL):
+        super().__init__(base_url)
+
+    def available(self, language):
+        return bool(self.base_url)
+
+
+# REST API: page/summary answers are small and CDN-cached, which makes them
+# the cheapest way to fill the summary pane; page/html carries the whole
+# article, categories included, as Parsoid HTML.
+class RestBackend(Backend):
+    name = "rest"
+    operations = (ARTICLE, INTRO, RANDOM_INTRO)
+
+    def call(self, operation, user_agent, language, title=None, timeout=None):
+        client = get_client(language)
+        headers = {"User-Agent": user_agent}
+        if operation == RANDOM_INTRO:
+            # Redirects to page/summary/<random title>
+            return self._summary(client.rest("/page/random/summary", headers=headers, timeout=timeout))
+        path = quote(title.replace(" ", "_"), safe="")
+        if operation == INTRO:
+            return self._summary(client.rest(f"/page/summary/{path}", headers=headers, timeout=timeout))
+        response = client.rest(f"/page/html/{path}", headers=headers, timeout=timeout)
+        response.raise_for_status()
+        article = parse_page_html(response.text)
+        article["etag"] = response.headers.get("ETag")
+        return article
+
+    def _summary(self, response):
+        response.raise_for_status()
+        data = response.json()
+        if data.get("type") == "no-extract" or "extract" not in data:
+            return None
+        titles = data.get("titles") or {}
+        return {
+            "title": titles.get("normalized") or data["title"].replace("_", " "),
+            "summary": data["extract"].strip(),
+            "pageid": data.get("pageid"),
+            "lastrevid": int(data["revision"]) if data.get("revision") else None,
+        }
+
+
+# Moving latency and success averages of one backend for one language
+class BackendStats:
+    __slots__ = ("latency", "success", "calls", "failures")
+
+    def __init__(self):
+        self.latency = None
+        self.success = 1.0
+        self.calls = 0
+        self.failures = 0
+
+    def record(self, latency, ok):
+        self.calls += 1
+        if ok:
+            self.latency = latency if self.latency is None else (
+                (1 - EWMA_WEIGHT) * self.latency + EWMA_WEIGHT * latency
+            )
+        else:
+            self.failures += 1
+        self.success = (1 - EWMA_WEIGHT) * self.success + EWMA_WEIGHT * (1.0 if ok else 0.0)
+
+    def score(self):
+        # Expected time per useful answer; untried backends go first, ones
+        # that never answered go last (exploration still retries them)
+        if self.latency is None:
+            return float("inf") if self.calls else 0.0
+        return self.latency / max(MIN_SUCCESS, self.success)
+
+
+# Picks a backend per language and operation from measured latency and
+# success rate, with a little exploration so slower backends are re-measured,
+# and falls through to the next backend when one fails. A per-language
+# override pins the choice.
+class BackendSelector:
+    def __init__(self, backends):
+        self.backends = {backend.name: backend for backend in backends}
+        self.overrides = {}  # language -> backend name
+        self._stats = {}     # (language, operation, backend name) -> BackendStats
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def set_override(self, language, name):
+        """Always use the named backend for a language, or for every language with ALL_LANGUAGES
+
+        None, "" or "auto" restores the automatic choice.
+        """
+        if name in (None, "", "auto"):
+            self.overrides.pop(language, None)
+        elif name not in self.backends:
+            raise ValueError(f"Unknown backend {name!r}; choose from {', '.join(self.backends)}")
+        else:
+            self.overrides[language] = name
+
+    def ranked(self, language, operation):
+        """Backends able to run the operation for the language, best first"""
+        candidates = [
+            b for b in self.backends.values() if operation in b.operations and b.available(language)
+        ]
+        override = self.overrides.get(language) or self.overrides.get(ALL_LANGUAGES)
+        pinned = [b for b in candidates if b.name == override]
+        if pinned:
+            return pinned  # an override without the operation falls back to the automatic choice
+        with self._lock:
+            candidates.sort(key=lambda b: self._stats_for(language, operation, b.name).score())
+            if len(candidates) > 1 and self._random.random() < EXPLORE_RATE:
+                explored = candidates.pop(self._random.randrange(1, len(candidates)))
+                candidates.insert(0, explored)
+        return candidates
+
+    def call(self, operation, user_agent, language, title=None, timeout=None):
+        """Run the operation on the best backend, falling through to the next on errors"""
+        error = None
+        for backend in self.ranked(language, operation):
+            start = time.perf_counter()
+            try:
+                result = backend.call(operation, user_agent, language, title=title, timeout=timeout)
+            except CircuitOpenError as e:
+                error = e  # the language is degraded, not the backend
+                continue
+            except Exception as e:
+                self._record(language, operation, backend.name, time.perf_counter() - start, False)
+                error = e
+                continue
+            self._record(language, operation, backend.name, time.perf_counter() - start, True)
+            return result
+        if error is not None:
+            raise error
+        return None
+
+    def stats(self):
+        """Latency (ms), success rate and call counts per language, operation and backend"""
+        report = {}
+        with self._lock:
+            for (language, operation, name), stats in self._stats.items():
+                report.setdefault(language, {}).setdefault(operation, {})[name] = {
+                    "latency_ms": round(stats.latency * 1000, 1) if stats.latency is not None else None,
+                    "success": round(stats.success, 3),
+                    "calls": stats.calls,
+                    "failures": stats.failures,
+                }
+        for language, name in self.overrides.items():
+            report.setdefault(language, {})["override"] = name
+        return report
+
+    def _stats_for(self, language, operation, name):
+        key = (language, operation, name)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = BackendStats()
+        return stats
+
+    def _record(self, language, operation, name, latency, ok):
+        with self._lock:
+            self._stats_for(language, operation, name).record(latency, ok)
+
+
+_selector = None
+_selector_lock = threading.Lock()
+
+
+def get_selector():
+    """Return the process-wide backend selector with the built-in backends"""
+    global _selector
+    with _selector_lock:
+        if _selector is None:
+            _selector = BackendSelector([ActionApiBackend(), RestBackend(), LocalBackend()])
+            _selector.set_override(ALL_LANGUAGES, DEFAULT_OVERRIDE)
+        return _selector
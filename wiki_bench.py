@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+
+from wiki_fake_server import start_fake_server, load_corpus, DEFAULT_LATENCY, DEFAULT_JITTER
+from wiki_stats import LatencyReservoir
+
+# Every benchmark, in the order they run
+BENCHMARKS = ("random_title", "fetcher", "display_article", "history_spill", "theme_switch", "cli_batch")
+# Metrics compared against a baseline, and whether a larger value is better
+COMPARED_METRICS = {"p50_ms": False, "p90_ms": False, "articles_per_s": True}
+DEFAULT_TOLERANCE = 0.25
+# Timing differences smaller than this are noise, whatever their relative size
+NOISE_FLOOR_MS = 1.0
+RESULT_VERSION = 1
+USER_AGENT = 'RandomWikiReflectionToolBench (YourProjectName <your_email@example.com>)'
+
+
+def summarize(samples):
+    summary = samples.summary()
+    return {
+        "count": summary["count"],
+        "mean_ms": round(summary["mean"], 3),
+        "p50_ms": round(summary["p50"], 3),
+        "p90_ms": round(summary["p90"], 3),
+        "p99_ms": round(summary["p99"], 3),
+        "max_ms": round(summary["max"], 3),
+    }
+
+
+def timed(call, iterations, warmup, setup=None):
+    """Run call() warmup + iterations times and summarize the timed runs in milliseconds
+
+    setup(), if given, runs untimed before each call.
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        call()
+    samples = LatencyReservoir()
+    for _ in range(iterations):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        call()
+        samples.add((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def bench_random_title(options):
+    # Spare titles of the previous batch are dropped first, so every draw is
+    # a request rather than a queue pop
+    from random_wiki_article import get_random_article_title, drop_spare_titles
+    return timed(lambda: get_random_article_title(options.language), options.iterations, options.warmup,
+                 setup=lambda: drop_spare_titles(options.language))
+
+
+def make_snapshots(options, pages, count):
+    from wiki_snapshot import ArticleSnapshot
+    from wiki_query import parse_query_page
+    return [
+        ArticleSnapshot.from_article(options.language, parse_query_page(pages[i % len(pages)]))
+        for i in range(count)
+    ]
+
+
+def bench_fetcher(options):
+    # ArticleFetcher.run() on this thread: its signals are delivered directly,
+    # so the time to the first and the last signal is measured without Qt's event loop
+    from wiki_gui_tool import ArticleFetcher
+    first_content = LatencyReservoir()
+    total = LatencyReservoir()
+
+    def run(record):
+        fetcher = ArticleFetcher(0, None, USER_AGENT, options.language)
+        start = time.perf_counter()
+        marks = {}
+        fetcher.signals.title_ready.connect(lambda *_: marks.setdefault("first", time.perf_counter()))
+        fetcher.signals.article_fetched.connect(lambda *_: marks.setdefault("done", time.perf_counter()))
+        fetcher.run()
+        if record and "done" in marks:
+            first_content.add((marks["first"] - start) * 1000)
+            total.add((marks["done"] - start) * 1000)
+
+    for i in range(options.warmup + options.iterations):
+        run(i >= options.warmup)
+    return {"first_content": summarize(first_content), **summarize(total)}
+
+
+def bench_window(options, app, pages):
+    # display_article() and theme switches on a shown window, including the
+    # layout and paint Qt does afterwards. The history holds every article
+    # in memory, so no spill to the disk cache is timed (see history_spill).
+    from wiki_gui_tool import WikiReflectionTool
+    from wiki_history import ArticleHistory
+
+    # No startup fetch or restored article: nothing else runs while timing
+    window = WikiReflectionTool(prefetch_depth=0, startup_fetch=False)
+    window.show()
+    app.processEvents()
+    snapshots = make_snapshots(options, pages, options.iterations + options.warmup)
+    window.history = ArticleHistory(max_snapshots=len(snapshots) + 1, max_bytes=sys.maxsize)
+    queue = iter(snapshots)
+
+    def display():
+        window.display_article(next(queue))
+        app.processEvents()
+
+    def switch_theme():
+        window.toggle_theme()
+        app.processEvents()
+
+    results = {
+        "display_article": timed(display, options.iterations, options.warmup),
+        "theme_switch": timed(switch_theme, options.iterations, options.warmup),
+    }
+    window.close()
+    app.processEvents()
+    return results
+
+
+def bench_history_spill(options, pages):
+    # ArticleHistory.visit() with a full in-memory ring, so every visit moves
+    # the farthest snapshot into the (empty) disk cache
+    from wiki_history import ArticleHistory, DEFAULT_MAX_SNAPSHOTS
+    history = ArticleHistory()
+    snapshots = make_snapshots(options, pages, DEFAULT_MAX_SNAPSHOTS + options.warmup + options.iterations)
+    for snapshot in snapshots[:DEFAULT_MAX_SNAPSHOTS]:
+        history.visit(snapshot)
+    queue = iter(snapshots[DEFAULT_MAX_SNAPSHOTS:])
+    return timed(lambda: history.visit(next(queue)), options.iterations, options.warmup)
+
+
+def bench_cli_batch(options):
+    from random_wiki_article import run_batch
+    with open(os.devnull, "w", encoding="utf-8") as output:
+        summary = run_batch(options.batch, [options.language], USER_AGENT, options.concurrency, output)
+    result = {key: round(value, 3) for key, value in summary["latency_ms"].items()}
+    return {
+        "count": summary["fetched"],
+        "failed": summary["failed"],
+        "articles_per_s": round(summary["articles_per_s"], 2),
+        "mean_ms": result["mean"],
+        "p50_ms": result["p50"],
+        "p90_ms": result["p90"],
+        "p99_ms": result["p99"],
+        "max_ms": result["max"],
+    }
+
+
+# Run the selected benchmarks against a fresh fake server and an empty,
+# throw-away cache directory, so runs only differ by the code under test
+def run_benchmarks(options):
+    started = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    os.environ["XDG_CACHE_HOME"] = tempfile.mkdtemp(prefix="wiki-bench-")
+    pages = load_corpus(options.corpus) if options.corpus else None
+    server = start_fake_server(pages=pages, latency=options.latency, jitter=options.jitter,
+                               error_rate=options.error_rate, seed=options.seed)
+
+    from wiki_http import configure_transport, POOL_MAXSIZE
+    from wiki_backends import get_selector, ALL_LANGUAGES
+    from random_wiki_article import set_seen_filter
+    configure_transport(user_agent=USER_AGENT, base_url=server.base_url,
+                        pool_maxsize=max(POOL_MAXSIZE, options.concurrency * 2))
+    get_selector().set_override(ALL_LANGUAGES, options.backend)
+    # Seen titles would make later iterations depend on earlier ones
+    set_seen_filter(False)
+
+    selected = [name for name in BENCHMARKS if name in options.only] if options.only else list(BENCHMARKS)
+    results = {}
+    gui_wanted = {"fetcher", "display_article", "theme_switch"} & set(selected)
+    app = None
+    if gui_wanted:
+        try:
+            os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+            from PyQt6.QtWidgets import QApplication
+            app = QApplication.instance() or QApplication([])
+        except ImportError as e:
+            for name in gui_wanted:
+                results[name] = {"skipped": f"PyQt6 is not available: {e}"}
+
+    for name in selected:
+        if name in results:
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        if name == "random_title":
+            results[name] = bench_random_title(options)
+        elif name == "fetcher":
+            results[name] = bench_fetcher(options)
+        elif name in ("display_article", "theme_switch"):
+            results.update({k: v for k, v in bench_window(options, app, server.pages).items() if k in selected})
+        elif name == "history_spill":
+            results[name] = bench_history_spill(options, server.pages)
+        elif name == "cli_batch":
+            results[name] = bench_cli_batch(options)
+
+    server.shutdown()
+    server.server_close()
+    return {
+        "version": RESULT_VERSION,
+        "started": started,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            "language": options.language,
+            "backend": options.backend,
+            "iterations": options.iterations,
+            "warmup": options.warmup,
+            "batch": options.batch,
+            "concurrency": options.concurrency,
+            "latency": options.latency,
+            "jitter": options.jitter,
+            "error_rate": options.error_rate,
+            "seed": options.seed,
+            "corpus": options.corpus or "synthetic",
+        },
+        "results": results,
+        "server": server.stats(),
+    }
+
+
+def compare_results(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Lines describing each compared metric, and whether any regressed beyond tolerance"""
+    lines = []
+    regressed = False
+    if baseline.get("config") != current.get("config"):
+        lines.append("warning: the baseline was run with a different configuration")
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            if metric not in result or not base.get(metric):
+                continue
+            change = result[metric] / base[metric] - 1
+            worse = -change if higher_is_better else change
+            flag = ""
+            noise = metric.endswith("_ms") and abs(result[metric] - base[metric]) < NOISE_FLOOR_MS
+            if worse > tolerance and not noise:
+                flag = "  REGRESSION"
+                regressed = True
+            lines.append(f"{name} {metric}: {base[metric]:.2f} -> {result[metric]:.2f} ({change:+.0%}){flag}")
+    return lines, regressed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fetch, display and batch paths against a local fake wiki.")
+    parser.add_argument("-o", "--output", default="-", help="JSON result file (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="compare with an earlier result file; exits with 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"relative slowdown reported as a regression (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run only these benchmarks")
+    parser.add_argument("-n", "--iterations", type=int, default=50, help="timed runs per benchmark (default: 50)")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed runs before each benchmark (default: 3)")
+    parser.add_argument("--batch", type=int, default=200, help="articles fetched by cli_batch (default: 200)")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="cli_batch requests in flight (default: 8)")
+    parser.add_argument("-l", "--language", default="en", help="language code used for all requests (default: en)")
+    parser.add_argument("--backend", default="action", help="backend to pin: action, rest or auto (default: action)")
+    parser.add_argument("--corpus", metavar="PATH", help="recorded pages to serve (see wiki_fake_server.py --record)")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY,
+                        help=f"fake server response time in seconds (default: {DEFAULT_LATENCY})")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER,
+                        help=f"mean random extra response time in seconds (default: {DEFAULT_JITTER})")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of HTTP 503 answers (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the corpus, delays and errors (default: 0)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = run_benchmarks(args)
+    text = json.dumps(report, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        lines, regressed = compare_results(baseline, report, args.tolerance)
+        for line in lines:
+            print(line, file=sys.stderr)
+        sys.exit(1 if regressed else 0)
@@ -0,0 +1,94 @@
+import time
+import threading
+import requests
+
+# Consecutive failures (errors or very slow answers) that open the circuit
+FAILURE_THRESHOLD = 5
+# A successful answer slower than this many seconds still counts as a failure
+SLOW_CALL_SECONDS = 8.0
+# Seconds an open circuit fails fast before letting one trial request through
+RESET_TIMEOUT = 30.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while a language edition is degraded"""
+
+
+# Per-language circuit breaker. After FAILURE_THRESHOLD failures in a row the
+# circuit opens and calls fail fast (callers serve cached articles) for
+# RESET_TIMEOUT seconds; then a single trial call is let through and its
+# outcome closes the circuit again or re-opens it.
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD,
+                 reset_timeout=RESET_TIMEOUT, slow_call=SLOW_CALL_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.slow_call = slow_call
+        self.state = CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        """True while calls would be rejected; does not use up the half-open trial"""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            if self.state == OPEN:
+                return time.monotonic() - self._opened_at < self.reset_timeout
+            return self._trial_in_flight
+
+    def allow(self):
+        """Reserve permission for one call; False means fail fast"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """Like allow(), but raise CircuitOpenError when the call must not be made"""
+        if not self.allow():
+            raise CircuitOpenError(f"Wikipedia '{self.name}' is degraded, failing fast")
+
+    def record_success(self, latency):
+        if latency > self.slow_call:
+            self.record_failure()
+            return
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.opened += 1
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
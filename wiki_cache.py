@@ -0,0 +1,278 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import threading
+
+from wiki_query import WikiSection
+from wiki_snapshot import sections_to_data, sections_from_data
+
+# Default cache size cap (compressed payload bytes)
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+# Entries older than this are revalidated when online (still served offline)
+DEFAULT_TTL = 7 * 24 * 3600
+# Eviction trims the cache to this fraction of the cap so it does not run on every insert
+EVICTION_TARGET = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    language TEXT NOT NULL,
+    title TEXT NOT NULL,
+    revid INTEGER NOT NULL DEFAULT 0,
+    payload BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    etag TEXT,
+    PRIMARY KEY (language, title, revid)
+);
+CREATE INDEX IF NOT EXISTS articles_lru ON articles (accessed_at);
+"""
+
+
+def default_cache_path():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "wiki_reflection_tool", "articles.sqlite3")
+
+
+def make_section(title, level, text, children):
+    section = WikiSection(title, level, text)
+    section.sections = children
+    return section
+
+
+def encode_article(article):
+    data = {
+        "title": article["title"],
+        "summary": article["summary"],
+        "sections": sections_to_data(article["sections"]),
+        "categories": sorted(article["categories"].keys()),
+        "pageid": article.get("pageid"),
+        "lastrevid": article.get("lastrevid"),
+    }
+    return zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+def decode_article(payload):
+    data = json.loads(zlib.decompress(payload).decode("utf-8"))
+    data["sections"] = sections_from_data(data["sections"], make_section)
+    data["categories"] = {title: {"ns": 14, "title": title} for title in data["categories"]}
+    return data
+
+
+# Persistent SQLite cache of fetched articles keyed by (language, title,
+# revision id), with a size cap, LRU eviction and a TTL. Safe to share
+# between the GUI thread and worker threads.
+class ArticleCache:
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self.path = path or default_cache_path()
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(articles)")}
+        if "etag" not in columns:
+            # Caches created before revalidation existed
+            self._db.execute("ALTER TABLE articles ADD COLUMN etag TEXT")
+        # Payload bytes stored, kept up to date by put() and the deletes so
+        # eviction does not sum the whole table on every insert
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM articles").fetchone()[0]
+        self._hits = 0
+        self._misses = 0
+        self._stale_hits = 0
+        self._evictions = 0
+        self._expired = 0
+        self._revalidated = 0
+
+    def get(self, language, title, revid=None, allow_stale=False):
+        """Return the cached article (newest revision unless revid is given) or None"""
+        query = "SELECT revid, payload, fetched_at FROM articles WHERE language = ? AND title = ?"
+        args = [language, title]
+        if revid is not None:
+            query += " AND revid = ?"
+            args.append(revid)
+        query += " ORDER BY revid DESC LIMIT 1"
+        with self._lock:
+            row = self._db.execute(query, args).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            stale = self._is_expired(row[2])
+            if stale and not allow_stale:
+                self._misses += 1
+                return None
+            if stale:
+                self._stale_hits += 1
+            else:
+                self._hits += 1
+            self._touch(language, title, row[0])
+        return decode_article(row[1])
+
+    def put(self, language, article, etag=None):
+        payload = encode_article(article)
+        now = time.time()
+        revid = article.get("lastrevid") or 0
+        with self._lock:
+            # The same revision is replaced; older revisions are dead weight
+            replaced = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM articles WHERE language = ? AND title = ? AND revid <= ?",
+                (language, article["title"], revid)
+            ).fetchone()[0]
+            self._db.execute(
+                "DELETE FROM articles WHERE language = ? AND title = ? AND revid <= ?",
+                (language, article["title"], revid)
+            )
+            self._db.execute(
+                "INSERT INTO articles (language, title, revid, payload, size, fetched_at, accessed_at, etag) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (language, article["title"], revid, payload, len(payload), now, now, etag)
+            )
+            self._bytes += len(payload) - replaced
+            self._evict()
+
+    def validator(self, language, title):
+        """(revid, etag, expired) of the newest cached revision of a title, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT revid, etag, fetched_at FROM articles WHERE language = ? AND title = ? "
+                "ORDER BY revid DESC LIMIT 1",
+                (language, title)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], self._is_expired(row[2])
+
+    def expired_entries(self, language, limit=50):
+        """(title, revid, etag) of expired entries, most recently used first"""
+        if not self.ttl:
+            return []
+        with self._lock:
+            return self._db.execute(
+                "SELECT title, revid, etag FROM articles WHERE language = ? AND fetched_at < ? "
+                "ORDER BY accessed_at DESC LIMIT ?",
+                (language, time.time() - self.ttl, limit)
+            ).fetchall()
+
+    def renew(self, language, title, revid, etag=None):
+        """Mark a cached revision as current again after the server confirmed it unchanged"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE articles SET fetched_at = ?, etag = COALESCE(?, etag) "
+                "WHERE language = ? AND title = ? AND revid = ?",
+                (time.time(), etag, language, title, revid)
+            )
+            self._revalidated += 1
+
+    def random_article(self, language, allow_stale=True):
+        """Return a random cached article for the language (used in offline mode)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT title, revid, payload, fetched_at FROM articles WHERE language = ? "
+                "ORDER BY RANDOM() LIMIT 1",
+                (language,)
+            ).fetchone()
+            if row is None or (not allow_stale and self._is_expired(row[3])):
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._touch(language, row[0], row[1])
+        return decode_article(row[2])
+
+    def articles(self, batch=200):
+        """Yield (language, article) for every cached revision, without touching access times"""
+        last = 0
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT rowid, language, payload FROM articles WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last, batch)
+                ).fetchall()
+            if not rows:
+                return
+            for rowid, language, payload in rows:
+                yield language, decode_article(payload)
+            last = rows[-1][0]
+
+    def purge_expired(self):
+        if not self.ttl:
+            return 0
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            removed = self._db.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM articles WHERE fetched_at < ?", (cutoff,)
+            ).fetchone()[0]
+            cursor = self._db.execute("DELETE FROM articles WHERE fetched_at < ?", (cutoff,))
+            self._bytes -= removed
+            self._expired += cursor.rowcount
+            return cursor.rowcount
+
+    def stats(self):
+        """Return hit/miss/eviction counters and the current cache size"""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            total = self._bytes
+            lookups = self._hits + self._stale_hits + self._misses
+            return {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "stale_hits": self._stale_hits,
+                "misses": self._misses,
+                "hit_ratio": (self._hits + self._stale_hits) / lookups if lookups else 0.0,
+                "evictions": self._evictions,
+                "expired": self._expired,
+                "revalidated": self._revalidated,
+            }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _is_expired(self, fetched_at):
+        return bool(self.ttl) and fetched_at < time.time() - self.ttl
+
+    def _touch(self, language, title, revid):
+        self._db.execute(
+            "UPDATE articles SET accessed_at = ? WHERE language = ? AND title = ? AND revid = ?",
+            (time.time(), language, title, revid)
+        )
+
+    def _evict(self):
+        total = self._bytes
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICTION_TARGET
+        # Walk entries from least to most recently used until under the target
+        victims = []
+        for language, title, revid, size in self._db.execute(
+            "SELECT language, title, revid, size FROM articles ORDER BY accessed_at"
+        ):
+            if total <= target:
+                break
+            victims.append((language, title, revid))
+            total -= size
+        self._db.executemany(
+            "DELETE FROM articles WHERE language = ? AND title = ? AND revid = ?", victims
+        )
+        self._bytes = total
+        self._evictions += len(victims)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the process-wide article cache, opening it on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ArticleCache()
+        return _cache
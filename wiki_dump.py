@@ -0,0 +1,400 @@
+import os
+import re
+import sys
+import bz2
+import glob
+import mmap
+import random
+import zlib
+import threading
+import xml.etree.ElementTree as ET
+from array import array
+from collections import OrderedDict
+
+from wiki_query import parse_extract
+
+# Directory searched for "<language>wiki-<date>-pages-articles-multistream.xml.bz2"
+# dumps and their index files (overridable with WIKI_DUMP_DIR)
+DUMP_SUFFIX = "-pages-articles-multistream.xml.bz2"
+INDEX_SUFFIXES = ("-pages-articles-multistream-index.txt", "-pages-articles-multistream-index.txt.bz2")
+# Decompressed streams (about 100 pages each) kept in memory
+STREAM_CACHE_SIZE = 4
+# Bytes read from the dump per decompression step
+READ_SIZE = 256 * 1024
+# Random index entries tried before giving up (most are redirects or other namespaces)
+MAX_DRAWS = 64
+# Slots per index line in the title lookup table (open addressing, half empty)
+TITLE_SLOTS_PER_LINE = 2
+
+# Namespace names used when a dump carries no siteinfo
+DEFAULT_NAMESPACES = {6: ["File", "Image"], 14: ["Category"]}
+
+RE_COMMENT = re.compile(r"<!--.*?-->", re.S)
+RE_REF = re.compile(r"<ref[^>]*/>|<ref[^>]*>.*?</ref>", re.S | re.I)
+RE_TAG_BLOCK = re.compile(r"<(gallery|math|chem|score|timeline|syntaxhighlight|source|pre|imagemap)\b[^>]*>.*?</\1>", re.S | re.I)
+RE_TAG = re.compile(r"</?[a-zA-Z][^>]*>")
+RE_TEMPLATE = re.compile(r"\{\{[^{}]*\}\}")
+RE_TABLE = re.compile(r"\{\|(?:(?!\{\|).)*?\|\}", re.S)
+RE_LINK = re.compile(r"\[\[([^\[\]]*)\]\]")
+RE_EXTERNAL = re.compile(r"\[(?:https?:)?//[^\s\]]+(?:\s+([^\]]*))?\]")
+RE_QUOTES = re.compile(r"'{2,}")
+RE_LIST = re.compile(r"^[*#:;]+\s*", re.M)
+RE_HEADING = re.compile(r"^(={2,6})\s*(.*?)\s*\1\s*$")
+
+
+def _strip_nested(pattern, text):
+    # Remove innermost matches until none are left (templates nest)
+    while True:
+        text, count = pattern.subn("", text)
+        if not count:
+            return text
+
+
+def normalize_title(title):
+    title = " ".join(title.replace("_", " ").split())
+    return title[:1].upper() + title[1:]
+
+
+def _title_key(raw_line):
+    # Title field of an index line, the key of the title lookup table
+    return raw_line.rstrip(b"\n").split(b":", 2)[-1]
+
+
+def _line_offsets(index):
+    """Start offset of every line in the memory-mapped index, plus its end"""
+    offsets = array("Q", [0])
+    position = index.find(b"\n")
+    while position != -1:
+        offsets.append(position + 1)
+        position = index.find(b"\n", position + 1)
+    if offsets[-1] != len(index):
+        offsets.append(len(index))
+    return offsets
+
+
+# Local backend over a Wikipedia pages-articles-multistream dump. The dump is
+# a series of independent bz2 streams of about 100 pages each; the index file
+# maps "stream offset:page id:title" per line. The index is memory-mapped
+# (a .bz2 index is decompressed next to it once). Two sidecar files are built
+# on first use: a table of line offsets, so drawing a random page costs one
+# random number and decompressing only the stream that holds the page, and
+# a hash table of line numbers by title, so fetching a page by title needs no
+# scan of the index.
+class MultistreamDump:
+    def __init__(self, dump_path, index_path, language=None):
+        self.dump_path = dump_path
+        self.language = language
+        self.index_path = self._plain_index(index_path)
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._streams = OrderedDict()  # offset -> {page id: page dict}
+        self._fd = os.open(dump_path, os.O_RDONLY)
+        with open(self.index_path, "rb") as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._lines = self._load_line_offsets()
+        self.count = len(self._lines) - 1
+        self._titles = self._load_title_table()
+        self._load_siteinfo()
+
+    def close(self):
+        self._lines.release()
+        self._lines_map.close()
+        self._titles.release()
+        self._titles_map.close()
+        self._index.close()
+        os.close(self._fd)
+
+    def random_titles(self, limit=1):
+        """Titles of up to `limit` uniformly drawn articles (namespace 0, no redirects)"""
+        titles = []
+        for _ in range(limit):
+            page = self._draw()
+            if page is None:
+                break
+            titles.append(page["title"])
+        return titles
+
+    def random_article(self):
+        page = self._draw()
+        return self._to_article(page) if page else None
+
+    def article(self, title):
+        """The article with this title in the shape of wiki_query.parse_query_page, or None"""
+        page = self._page_by_title(normalize_title(title))
+        if page is not None and page["redirect"]:
+            # Follow one redirect, as the action API does with redirects=1
+            page = self._page_by_title(normalize_title(page["redirect"]))
+        if page is None or page["redirect"] or page["ns"] != 0:
+            return None
+        return self._to_article(page)
+
+    def _draw(self):
+        if self.count <= 0:
+            return None
+        for _ in range(MAX_DRAWS):
+            offset, pageid, title = self._entry(self._random.randrange(self.count))
+            if self._namespace_of(title) != 0:
+                continue  # cheap title check before any decompression
+            page = self._stream_pages(offset).get(pageid)
+            if page and page["ns"] == 0 and not page["redirect"]:
+                return page
+        return None
+
+    def _entry(self, line):
+        raw = self._index[self._lines[line]:self._lines[line + 1]].rstrip(b"\n")
+        offset, pageid, title = raw.split(b":", 2)
+        return int(offset), int(pageid), title.decode("utf-8")
+
+    def _page_by_title(self, title):
+        entry = self._find_title(title)
+        if entry is None:
+            return None
+        offset, pageid = entry
+        return self._stream_pages(offset).get(pageid)
+
+    def _find_title(self, title):
+        # Probe the title table from the title's hash slot until an empty one;
+        # hash collisions are told apart by the title field of each line
+        key = title.encode("utf-8")
+        slots = self._titles
+        slot = zlib.crc32(key) % len(slots)
+        while slots[slot]:
+            line = slots[slot] - 1
+            raw = self._index[self._lines[line]:self._lines[line + 1]]
+            if _title_key(raw) == key:
+                offset, pageid, _ = raw.split(b":", 2)
+                return int(offset), int(pageid)
+            slot = (slot + 1) % len(slots)
+        return None
+
+    def _stream_pages(self, offset):
+        with self._lock:
+            pages = self._streams.get(offset)
+            if pages is not None:
+                self._streams.move_to_end(offset)
+                return pages
+        pages = {}
+        for element in ET.fromstring(b"<pages>" + self._read_stream(offset) + b"</pages>").iter("page"):
+            redirect = element.find("redirect")
+            pages[int(element.findtext("id"))] = {
+                "title": element.findtext("title"),
+                "ns": int(element.findtext("ns") or 0),
+                "pageid": int(element.findtext("id")),
+                "revid": int(element.findtext("revision/id") or 0) or None,
+                "redirect": redirect.get("title") if redirect is not None else None,
+                "text": element.findtext("revision/text") or "",
+            }
+        with self._lock:
+            self._streams[offset] = pages
+            while len(self._streams) > STREAM_CACHE_SIZE:
+                self._streams.popitem(last=False)
+        return pages
+
+    def _read_stream(self, offset):
+        # Decompress exactly one bz2 stream starting at offset
+        decompressor = bz2.BZ2Decompressor()
+        chunks = []
+        while not decompressor.eof:
+            data = os.pread(self._fd, READ_SIZE, offset)
+            if not data:
+                break
+            offset += len(data)
+            chunks.append(decompressor.decompress(data))
+        return b"".join(chunks)
+
+    def _load_siteinfo(self):
+        # The first stream holds the <mediawiki><siteinfo> header
+        self.namespaces = {}
+        header = self._read_stream(0)
+        match = re.search(rb"<siteinfo>.*</siteinfo>", header, re.S)
+        if match:
+            siteinfo = ET.fromstring(match.group(0))
+            for ns in siteinfo.iter("namespace"):
+                if ns.text:
+                    self.namespaces.setdefault(int(ns.get("key")), []).append(ns.text)
+        for key, names in DEFAULT_NAMESPACES.items():
+            self.namespaces.setdefault(key, []).extend(names)
+        self._prefixes = {
+            name.lower(): key for key, names in self.namespaces.items() for name in names if key != 0
+        }
+        self.category_name = self.namespaces[14][0]
+
+    def _namespace_of(self, title):
+        prefix, colon, _ = title.partition(":")
+        return self._prefixes.get(prefix.strip().lower(), 0) if colon else 0
+
+    def _to_article(self, page):
+        summary, sections, categories = self.parse_wikitext(page["text"])
+        return {
+            "title": page["title"],
+            "summary": summary,
+            "sections": sections,
+            "categories": categories,
+            "pageid": page["pageid"],
+            "lastrevid": page["revid"],
+        }
+
+    def parse_wikitext(self, wikitext):
+        """Plain-text summary, WikiSection tree and category dict of a page's wikitext"""
+        categories = {}
+
+        def link(match):
+            target, _, label = match.group(1).partition("|")
+            ns = self._namespace_of(target) if not target.startswith(":") else 0
+            if ns == 14:
+                name = normalize_title(target.partition(":")[2])
+                title = f"{self.category_name}:{name}"
+                categories[title] = {"ns": 14, "title": title}
+                return ""
+            if ns == 6:
+                return ""  # images and their captions
+            return label or target.lstrip(":")
+
+        text = RE_COMMENT.sub("", wikitext)
+        text = RE_REF.sub("", text)
+        text = RE_TAG_BLOCK.sub("", text)
+        text = _strip_nested(RE_TEMPLATE, text)
+        text = _strip_nested(RE_TABLE, text)
+        while True:
+            text, count = RE_LINK.subn(link, text)
+            if not count:
+                break
+        text = RE_EXTERNAL.sub(lambda m: m.group(1) or "", text)
+        text = RE_TAG.sub("", text)
+        text = RE_QUOTES.sub("", text)
+        text = RE_LIST.sub("", text)
+
+        # Rebuild the layout of an exsectionformat=wiki extract and reuse its parser
+        lines = []
+        for line in text.split("\n"):
+            line = " ".join(line.split())
+            if not line or line in ("{{", "}}"):
+                continue
+            heading = RE_HEADING.match(line)
+            if heading:
+                if heading.group(2):
+                    marks = heading.group(1)
+                    lines.append(f"\n\n{marks} {heading.group(2)} {marks}")
+                continue
+            lines.append(line)
+        summary, sections = parse_extract("\n".join(lines) + "\n")
+        return summary, sections, categories
+
+    def _plain_index(self, index_path):
+        # mmap needs the uncompressed index; decompress a .bz2 index once
+        if not index_path.endswith(".bz2"):
+            return index_path
+        plain_path = index_path[:-len(".bz2")]
+        if not os.path.exists(plain_path) or os.path.getmtime(plain_path) < os.path.getmtime(index_path):
+            partial = plain_path + ".part"
+            with bz2.open(index_path, "rb") as source, open(partial, "wb") as target:
+                while True:
+                    chunk = source.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+            os.replace(partial, plain_path)
+        return plain_path
+
+    def _load_line_offsets(self):
+        # Sidecar table of line offsets (8 bytes per page), built on first use
+        path = self.index_path + ".lines"
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(self.index_path):
+            partial = path + ".part"
+            with open(partial, "wb") as f:
+                _line_offsets(self._index).tofile(f)
+            os.replace(partial, path)
+        with open(path, "rb") as f:
+            self._lines_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._lines_map).cast("Q")
+
+    def _load_title_table(self):
+        # Sidecar open-addressing hash table: slot crc32(title) % size (or the
+        # next free one) holds the title's line number + 1, 0 marks a free slot.
+        # Filled in place through a writable map, so a large index needs no
+        # table in memory.
+        path = self.index_path + ".titles"
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(self.index_path):
+            partial = path + ".part"
+            size = max(1, self.count * TITLE_SLOTS_PER_LINE)
+            with open(partial, "wb") as f:
+                f.truncate(size * 4)
+            with open(partial, "r+b") as f, mmap.mmap(f.fileno(), 0) as table_map:
+                table = memoryview(table_map).cast("I")
+                for line in range(self.count):
+                    slot = zlib.crc32(_title_key(self._index[self._lines[line]:self._lines[line + 1]])) % size
+                    while table[slot]:
+                        slot = (slot + 1) % size
+                    table[slot] = line + 1
+                table.release()
+            os.replace(partial, path)
+        with open(path, "rb") as f:
+            self._titles_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._titles_map).cast("I")
+
+
+def default_dump_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.environ.get("WIKI_DUMP_DIR") or os.path.join(base, "wiki_reflection_tool", "dumps")
+
+
+def index_path_for(dump_path):
+    """The index file that belongs to a multistream dump, or None if there is none"""
+    if not dump_path.endswith(DUMP_SUFFIX):
+        return None
+    stem = dump_path[:-len(DUMP_SUFFIX)]
+    for suffix in INDEX_SUFFIXES:
+        if os.path.exists(stem + suffix):
+            return stem + suffix
+    return None
+
+
+def find_dumps(directory):
+    """Map language -> (dump, index) for every complete dump in a directory"""
+    dumps = {}
+    for dump_path in sorted(glob.glob(os.path.join(directory, "*wiki-*" + DUMP_SUFFIX))):
+        index_path = index_path_for(dump_path)
+        if index_path:
+            # "enwiki-20240601-..." -> "en"; later (newer) dumps win
+            language = os.path.basename(dump_path).split("wiki-", 1)[0].replace("_", "-")
+            dumps[language] = (dump_path, index_path)
+    return dumps
+
+
+_dumps = {}
+_dumps_lock = threading.Lock()
+_discovered = False
+
+
+def open_dump(language, dump_path, index_path=None):
+    """Use a dump as the local backend for a language"""
+    index_path = index_path or index_path_for(dump_path)
+    if index_path is None:
+        raise FileNotFoundError(f"No multistream index found for {dump_path}")
+    dump = MultistreamDump(dump_path, index_path, language)
+    with _dumps_lock:
+        old = _dumps.get(language)
+        _dumps[language] = dump
+    if old is not None:
+        old.close()
+    return dump
+
+
+def get_dump(language):
+    """The local dump for a language (found in default_dump_dir() on first use), or None"""
+    global _discovered
+    with _dumps_lock:
+        if not _discovered:
+            _discovered = True
+            directory = default_dump_dir()
+            found = find_dumps(directory) if os.path.isdir(directory) else {}
+            # Opened under the lock: concurrent first callers wait for the
+            # dumps instead of going to the network
+            for code, (dump_path, index_path) in found.items():
+                if code in _dumps:
+                    continue  # opened explicitly with open_dump()
+                try:
+                    _dumps[code] = MultistreamDump(dump_path, index_path, code)
+                except (OSError, ValueError, ET.ParseError) as e:
+                    print(f"Error opening Wikipedia dump {dump_path}: {e}", file=sys.stderr)
+        return _dumps.get(language)
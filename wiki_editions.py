@@ -0,0 +1,310 @@
+import time
+import functools
+import threading
+
+from PyQt6.QtWidgets import (
+    QWidget, QFrame, QVBoxLayout, QHBoxLayout, QLabel, QCheckBox, QPushButton, QTextBrowser, QScrollArea
+)
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt6.QtGui import QCursor
+
+# Editions ticked when the view is first opened
+DEFAULT_EDITIONS = ("en", "de", "fr", "uk")
+PANEL_WIDTH = 340
+# Langlinks answers kept, so ticking more editions needs no new query
+LINKS_CACHE_SIZE = 64
+
+
+# Signals of LanglinksJob, tagged with the generation of the comparison
+class LanglinksSignals(QObject):
+    links_ready = pyqtSignal(int, object)
+    error_occurred = pyqtSignal(int, str)
+
+
+# Job resolving the titles of an article in every other edition with one
+# prop=langlinks query. Cancelled like ArticleFetcher: a cancelled job never
+# emits, even if its request completes.
+class LanglinksJob(QRunnable):
+    def __init__(self, generation, title, user_agent, language):
+        super().__init__()
+        self.signals = LanglinksSignals()
+        self.generation = generation
+        self.title = title
+        self.user_agent = user_agent
+        self.language = language
+        self._cancelled = threading.Event()
+        # Set when run() returns; the pool may delete the job any time after that
+        self._finished = False
+        self._finished_lock = threading.Lock()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def run(self):
+        try:
+            if self._cancelled.is_set():
+                return
+            from wiki_query import fetch_langlinks
+            try:
+                links = fetch_langlinks(self.title, self.user_agent, self.language)
+            except Exception as e:
+                if not self._cancelled.is_set():
+                    self.signals.error_occurred.emit(self.generation, f"Error resolving other editions: {e}")
+                return
+            if not self._cancelled.is_set():
+                self.signals.links_ready.emit(self.generation, links)
+        finally:
+            with self._finished_lock:
+                self._finished = True
+
+    def take_from(self, pool):
+        """Drop the job from the pool's queue if it has not run yet"""
+        with self._finished_lock:
+            if not self._finished:
+                pool.tryTake(self)
+
+    def disconnect(self):
+        for signal in (self.signals.links_ready, self.signals.error_occurred):
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass  # Nothing connected
+
+
+# One column of the comparison: an edition's title, fetch time and summary.
+# Clicking the title opens that edition in the main window.
+class EditionPanel(QFrame):
+    clicked = pyqtSignal(object)
+
+    def __init__(self, name, parent=None):
+        super().__init__(parent)
+        self.setFrameShape(QFrame.Shape.StyledPanel)
+        self.setFixedWidth(PANEL_WIDTH)
+        self.snapshot = None
+        layout = QVBoxLayout(self)
+        header = QLabel(name)
+        header.setStyleSheet("font-weight: bold;")
+        self.title_label = QLabel("...")
+        self.title_label.setWordWrap(True)
+        self.title_label.setStyleSheet("font-size: 18px; font-weight: bold;")
+        self.title_label.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        self.title_label.mousePressEvent = self.open_article
+        self.time_label = QLabel("")
+        self.summary_text = QTextBrowser()
+        layout.addWidget(header)
+        layout.addWidget(self.title_label)
+        layout.addWidget(self.time_label)
+        layout.addWidget(self.summary_text)
+
+    def open_article(self, event):
+        if self.snapshot is not None:
+            self.clicked.emit(self.snapshot)
+
+    def set_title(self, title):
+        self.title_label.setText(title)
+
+    def set_summary(self, summary_html):
+        self.summary_text.setHtml(summary_html)
+
+    def set_done(self, snapshot, elapsed_ms=None):
+        self.snapshot = snapshot
+        self.title_label.setText(snapshot.title)
+        self.summary_text.setHtml(snapshot.summary_html)
+        sections = f"{snapshot.section_count} sections"
+        self.time_label.setText(sections if elapsed_ms is None else f"{elapsed_ms:.0f} ms, {sections}")
+
+    def set_message(self, message):
+        self.title_label.setText("")
+        self.time_label.setText(message)
+
+
+# Side-by-side view of the article shown in the main window and the same
+# article in the editions ticked above it. The titles come from one langlinks
+# query; every edition is then fetched at the same time on a pool with a
+# thread per edition, so the total is about the slowest edition rather than
+# the sum. Each transport host keeps its pooled connection between
+# comparisons. Panels fill in as their edition arrives.
+class EditionsView(QWidget):
+    article_chosen = pyqtSignal(object)
+
+    def __init__(self, language_codes, user_agent, make_fetcher, translations, parent=None):
+        super().__init__(parent, Qt.WindowType.Window)
+        self.language_codes = language_codes
+        self.user_agent = user_agent
+        self.make_fetcher = make_fetcher
+        self.translations = translations
+        self.resize(1200, 700)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(len(language_codes))
+        self.generation = 0
+        self.snapshot = None
+        self.jobs = []
+        self.panels = {}
+        self.chosen = []
+        self.started = None
+        self.fetches_started = None
+        self.links_ms = 0.0
+        self.times = {}  # language -> ms from the start of the edition fetches, None if failed
+        self.links_cache = {}  # (language, title) -> {language: title}, oldest first
+
+        layout = QVBoxLayout(self)
+        choices = QHBoxLayout()
+        self.checkboxes = {}
+        for name, code in language_codes.items():
+            checkbox = QCheckBox(code)
+            checkbox.setToolTip(name)
+            checkbox.setChecked(code in DEFAULT_EDITIONS)
+            choices.addWidget(checkbox)
+            self.checkboxes[code] = checkbox
+        choices.addStretch()
+        self.compare_button = QPushButton()
+        self.compare_button.clicked.connect(self.compare)
+        choices.addWidget(self.compare_button)
+        layout.addLayout(choices)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        self.panels_widget = QWidget()
+        self.panels_layout = QHBoxLayout(self.panels_widget)
+        self.panels_layout.setAlignment(Qt.AlignmentFlag.AlignLeft)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setWidget(self.panels_widget)
+        layout.addWidget(scroll)
+        self.set_translations(translations)
+
+    def set_translations(self, translations):
+        self.translations = translations
+        self.setWindowTitle(translations["editions"])
+        self.compare_button.setText(translations["compare"])
+
+    def show_article(self, snapshot):
+        """Compare a shown article (an ArticleSnapshot) with its other editions"""
+        self.snapshot = snapshot
+        self.show()
+        self.raise_()
+        self.compare()
+
+    def compare(self):
+        if self.snapshot is None:
+            return
+        self.cancel_jobs()
+        self.generation += 1
+        self.times = {}
+        for panel in self.panels.values():
+            self.panels_layout.removeWidget(panel)
+            panel.hide()
+            panel.deleteLater()
+        self.panels = {}
+
+        names = {code: name for name, code in self.language_codes.items()}
+        source = self.snapshot
+        self.add_panel(source.language, names.get(source.language, source.language)).set_done(source)
+        self.chosen = [code for code, box in self.checkboxes.items() if box.isChecked() and code != source.language]
+        for code in self.chosen:
+            self.add_panel(code, names[code])
+        self.status_label.setText(f"{source.title} ({source.language})")
+
+        self.started = time.perf_counter()
+        links = self.links_cache.get((source.language, source.title))
+        if links is not None:
+            self.on_links_ready(self.generation, links)
+        elif self.chosen:
+            job = LanglinksJob(self.generation, source.title, self.user_agent, source.language)
+            job.signals.links_ready.connect(functools.partial(self.drop_job, job))
+            job.signals.error_occurred.connect(functools.partial(self.drop_job, job))
+            job.signals.links_ready.connect(self.on_links_ready)
+            job.signals.error_occurred.connect(self.on_links_error)
+            self.jobs.append(job)
+            self.pool.start(job)
+
+    def add_panel(self, code, name):
+        panel = EditionPanel(f"{name} ({code})")
+        panel.clicked.connect(self.article_chosen)
+        self.panels_layout.addWidget(panel)
+        self.panels[code] = panel
+        return panel
+
+    def on_links_ready(self, generation, links):
+        if generation != self.generation:
+            return
+        key = (self.snapshot.language, self.snapshot.title)
+        self.links_cache[key] = links
+        if len(self.links_cache) > LINKS_CACHE_SIZE:
+            del self.links_cache[next(iter(self.links_cache))]
+        self.fetches_started = time.perf_counter()
+        self.links_ms = (self.fetches_started - self.started) * 1000
+        self.status_label.setText(f"{self.snapshot.title}: {len(links)} editions linked ({self.links_ms:.0f} ms)")
+        for code in self.chosen:
+            title = links.get(code)
+            if title is None:
+                self.times[code] = None
+                self.panels[code].set_message(self.translations["no_edition"])
+                continue
+            fetcher = self.make_fetcher(generation, title, code)
+            fetcher.signals.title_ready.connect(functools.partial(self.on_title_ready, code))
+            fetcher.signals.summary_ready.connect(functools.partial(self.on_summary_ready, code))
+            fetcher.signals.article_fetched.connect(functools.partial(self.on_article_fetched, code, fetcher))
+            fetcher.signals.error_occurred.connect(functools.partial(self.on_fetch_error, code, fetcher))
+            self.jobs.append(fetcher)
+            self.pool.start(fetcher)
+        self.update_status()
+
+    def on_links_error(self, generation, message):
+        if generation == self.generation:
+            self.status_label.setText(message)
+
+    def on_title_ready(self, code, generation, title, url):
+        if generation == self.generation:
+            self.panels[code].set_title(title)
+
+    def on_summary_ready(self, code, generation, summary_html):
+        if generation == self.generation:
+            self.panels[code].set_summary(summary_html)
+
+    def on_article_fetched(self, code, fetcher, generation, snapshot):
+        self.drop_job(fetcher)
+        if generation != self.generation:
+            return
+        elapsed_ms = (time.perf_counter() - self.fetches_started) * 1000
+        self.times[code] = elapsed_ms
+        self.panels[code].set_done(snapshot, elapsed_ms)
+        self.update_status()
+
+    def on_fetch_error(self, code, fetcher, generation, message):
+        self.drop_job(fetcher)
+        if generation != self.generation:
+            return
+        self.times[code] = None
+        self.panels[code].set_message(message)
+        self.update_status()
+
+    def update_status(self):
+        if len(self.times) < len(self.chosen):
+            return
+        times = [ms for ms in self.times.values() if ms is not None]
+        total_ms = (time.perf_counter() - self.started) * 1000
+        # Fetches started together, so each time is that edition's own duration
+        self.status_label.setText(
+            f"{self.snapshot.title}: {len(times)} editions in {total_ms:.0f} ms "
+            f"(langlinks {self.links_ms:.0f} ms, slowest edition {max(times, default=0.0):.0f} ms, "
+            f"one after another {sum(times):.0f} ms)"
+        )
+
+    def drop_job(self, job, *signal_args):
+        # A finished job may already be deleted by the pool; it must not be
+        # looked up in the pool's queue again
+        if job in self.jobs:
+            self.jobs.remove(job)
+
+    def cancel_jobs(self):
+        for job in self.jobs:
+            job.cancel()
+            job.disconnect()
+            job.take_from(self.pool)
+        self.jobs = []
+
+    def closeEvent(self, event):
+        self.cancel_jobs()
+        self.generation += 1
+        super().closeEvent(event)
@@ -0,0 +1,338 @@
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from html import escape
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+
+from wiki_query import combined_query_params, run_combined_query, RE_SECTION
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8766
+# Articles of the built-in synthetic corpus
+SYNTHETIC_ARTICLES = 500
+# Default response time: a fixed part plus exponentially distributed jitter
+# with the given mean, which gives the long tail of a real network
+DEFAULT_LATENCY = 0.05
+DEFAULT_JITTER = 0.02
+# Editions every page is linked to (prop=langlinks); the same corpus is
+# served under each of them
+LANGLINK_LANGUAGES = ("en", "uk", "de", "fr", "es", "it", "pl", "ru", "ja", "zh", "rm")
+WORDS = (
+    "river city history music science village species language century empire "
+    "island railway station football club mountain album church castle battle "
+    "novel film village district province school county theory bridge museum"
+).split()
+
+
+# Deterministic articles shaped like formatversion=2 pages of a combined
+# extracts|categories|info query, with wiki-formatted section headings
+def synthetic_corpus(count=SYNTHETIC_ARTICLES, seed=0):
+    rng = random.Random(seed)
+
+    def text(words):
+        sentences = []
+        while words > 0:
+            n = rng.randint(6, 20)
+            sentence = " ".join(rng.choice(WORDS) for _ in range(n))
+            sentences.append(sentence.capitalize() + ".")
+            words -= n
+        return " ".join(sentences)
+
+    pages = []
+    for i in range(count):
+        title = f"{rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {i}"
+        parts = [text(rng.randint(40, 250))]
+        level = 2
+        for _ in range(rng.randint(2, 14)):
+            level = rng.choice([2, 2, 3]) if level == 2 else rng.choice([2, 3, 4])
+            marks = "=" * level
+            parts.append(f"\n\n{marks} {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)} {marks}\n{text(rng.randint(30, 500))}")
+        extract = "".join(parts)
+        pages.append({
+            "pageid": 1000 + i,
+            "ns": 0,
+            "title": title,
+            "extract": extract,
+            "categories": [{"ns": 14, "title": f"Category:{rng.choice(WORDS).capitalize()}s"} for _ in range(rng.randint(0, 8))],
+            "lastrevid": 100000 + i,
+            "length": len(extract.encode("utf-8")),
+        })
+    return pages
+
+
+def load_corpus(path):
+    """Read recorded pages, one JSON page per line"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def record_corpus(language, count, path, user_agent):
+    """Record `count` random articles of a live wiki as corpus pages"""
+    params = combined_query_params(generator="random", grnnamespace=0, grnlimit=1)
+    recorded = 0
+    with open(path, "a", encoding="utf-8") as out:
+        while recorded < count:
+            for page in run_combined_query(language, user_agent, params):
+                if "extract" in page:
+                    out.write(json.dumps(page, ensure_ascii=False) + "\n")
+                    recorded += 1
+    return recorded
+
+
+def lead(extract):
+    match = RE_SECTION.search(extract)
+    return (extract[:match.start()] if match else extract).strip()
+
+
+def html_paragraphs(text):
+    return "".join(f"<p>{escape(paragraph)}</p>" for paragraph in text.split("\n") if paragraph.strip())
+
+
+def page_html(page, language):
+    """The page as Parsoid HTML (REST page/html): nested <section> elements,
+    category links, and the page id and revision in the head"""
+    extract = page["extract"]
+    matches = list(RE_SECTION.finditer(extract))
+    body = [f'<section data-mw-section-id="0">{html_paragraphs(lead(extract))}</section>']
+    levels = []  # levels of the open sections
+    for i, match in enumerate(matches):
+        level = len(match.group(1))
+        while levels and levels[-1] >= level:
+            levels.pop()
+            body.append("</section>")
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(extract)
+        heading = escape(match.group(2))
+        body.append(f'<section data-mw-section-id="{i + 1}"><h{level} id="{heading}">{heading}</h{level}>')
+        body.append(html_paragraphs(extract[match.end():end]))
+        levels.append(level)
+    body.extend("</section>" for _ in levels)
+    body.extend(
+        f'<link rel="mw:PageProp/Category" href="./{quote(c["title"].replace(" ", "_"))}"/>'
+        for c in page.get("categories", [])
+    )
+    return (
+        f'<!DOCTYPE html>\n<html prefix="mw: https://mediawiki.org/rdf/" '
+        f'about="https://{language}.wikipedia.org/wiki/Special:Redirect/revision/{page["lastrevid"]}">'
+        f'<head><meta charset="utf-8"/><meta property="mw:pageId" content="{page["pageid"]}"/>'
+        f'<title>{escape(page["title"])}</title></head><body>{"".join(body)}</body></html>'
+    )
+
+
+# Stand-in for a MediaWiki site with its action and REST APIs, serving a
+# fixed corpus of pages to every language under /<language>/, with
+# configurable latency, jitter and error rate. Point the tools at it with
+# WIKI_BASE_URL=http://127.0.0.1:8766/{language}.
+#
+#   /<language>/w/api.php                          list=random, generator=random|allpages,
+#                                                  titles= with prop=extracts|categories|info|langlinks
+#   /<language>/api/rest_v1/page/summary/<title>   also page/random/summary
+#   /<language>/api/rest_v1/page/html/<title>
+#   /<language>/api/rest_v1/page/title/<title>     with ETag and If-None-Match
+class FakeWikiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pages=None, latency=DEFAULT_LATENCY, jitter=DEFAULT_JITTER,
+                 error_rate=0.0, seed=0):
+        super().__init__(address, FakeWikiHandler)
+        self.pages = pages if pages is not None else synthetic_corpus(seed=seed)
+        self.by_title = {page["title"]: page for page in self.pages}
+        self.sorted_titles = sorted(self.by_title)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = {}  # endpoint -> count
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        """Base URL template for wiki_http clients"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/{{language}}"
+
+    def delay(self, endpoint):
+        """Count a request and decide its response time and whether it fails"""
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            jitter = self._random.expovariate(1 / self.jitter) if self.jitter > 0 else 0.0
+            failed = self._random.random() < self.error_rate
+        return self.latency + jitter, failed
+
+    def random_pages(self, count):
+        with self._lock:
+            return [self._random.choice(self.pages) for _ in range(count)]
+
+    def stats(self):
+        with self._lock:
+            return {"pages": len(self.pages), "requests": dict(self.requests)}
+
+
+class FakeWikiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle on, the body
+    # waits for the client's delayed ACK (about 40 ms on Linux)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = url.path.split("/", 2)  # "", language, rest
+        rest = "/" + parts[2] if len(parts) == 3 else url.path
+        if rest == "/w/api.php":
+            endpoint = "api"
+        elif rest.startswith("/api/rest_v1/page/"):
+            endpoint = rest.split("/")[4]
+        else:
+            return self.send_json(404, {"error": f"Unknown path {url.path}"})
+        delay, failed = self.server.delay(endpoint)
+        time.sleep(delay)
+        if failed:
+            return self.send_json(503, {"error": "Service temporarily unavailable"})
+        if endpoint == "api":
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            return self.send_json(200, self.action_api(params, parts[1]))
+        self.rest_api(unquote(rest[len("/api/rest_v1/page/"):]), parts[1])
+
+    def action_api(self, params, language):
+        server = self.server
+        if params.get("list") == "random":
+            pages = server.random_pages(min(500, int(params.get("rnlimit", 1))))
+            return {"batchcomplete": True, "query": {"random": [
+                {"id": page["pageid"], "ns": 0, "title": page["title"]} for page in pages
+            ]}}
+        generator = params.get("generator")
+        result = {"batchcomplete": True}
+        if generator == "random":
+            pages = server.random_pages(min(500, int(params.get("grnlimit", 1))))
+        elif generator == "allpages":
+            limit = min(500, int(params.get("gaplimit", 10)))
+            start = params.get("gapcontinue", "")
+            titles = [t for t in server.sorted_titles if t >= start][:limit + 1]
+            if len(titles) > limit:
+                result["continue"] = {"gapcontinue": titles[-1], "continue": "gapcontinue||"}
+            pages = [server.by_title[t] for t in titles[:limit]]
+        elif params.get("titles"):
+            pages = [server.by_title.get(t.replace("_", " "), {"ns": 0, "title": t, "missing": True})
+                     for t in params["titles"].split("|")]
+        else:
+            return {"error": {"code": "badparams", "info": "Unsupported query."}}
+        props = set(params.get("prop", "").split("|"))
+        pages = [self.page_json(page, props, bool(params.get("exintro")), language) for page in pages]
+        if params.get("formatversion") != "2":
+            # formatversion=1 (wikipediaapi): pages keyed by id, missing ones by negative ids
+            pages = {
+                str(page["pageid"]) if "pageid" in page else str(-i): dict(page, missing="") if page.get("missing") else page
+                for i, page in enumerate(pages, 1)
+            }
+        result["query"] = {"pages": pages}
+        return result
+
+    def page_json(self, page, props, intro_only, language):
+        if page.get("missing"):
+            return page
+        data = {"pageid": page["pageid"], "ns": page["ns"], "title": page["title"]}
+        if "extracts" in props:
+            data["extract"] = lead(page["extract"]) if intro_only else page["extract"]
+        if "categories" in props and page.get("categories"):
+            data["categories"] = page["categories"]
+        if "info" in props:
+            data["lastrevid"] = page.get("lastrevid")
+            data["length"] = page.get("length", len(page["extract"]))
+        if "langlinks" in props:
+            data["langlinks"] = [{"lang": code, "title": page["title"]} for code in LANGLINK_LANGUAGES if code != language]
+        return data
+
+    def rest_api(self, path, language):
+        kind, _, title = path.partition("/")
+        if path == "random/summary":
+            page = self.server.random_pages(1)[0]
+        else:
+            page = self.server.by_title.get(title.replace("_", " "))
+        if page is None:
+            return self.send_json(404, {"type": "https://mediawiki.org/wiki/HyperSwitch/errors/not_found"})
+        if kind in ("summary", "random"):
+            return self.send_json(200, {
+                "type": "standard",
+                "title": page["title"].replace(" ", "_"),
+                "titles": {"normalized": page["title"]},
+                "pageid": page["pageid"],
+                "revision": str(page["lastrevid"]),
+                "extract": lead(page["extract"]),
+            })
+        if kind == "html":
+            # Same validator as page/title, as both depend on the revision only
+            body = page_html(page, language).encode("utf-8")
+            return self.send_body(200, body, "text/html; charset=utf-8", {"ETag": f'W/"{page["lastrevid"]}"'})
+        if kind == "title":
+            etag = f'W/"{page["lastrevid"]}"'
+            if self.headers.get("If-None-Match") == etag:
+                return self.send_body(304, b"", None, {"ETag": etag})
+            return self.send_json(200, {"items": [{"title": page["title"], "rev": page["lastrevid"]}]}, {"ETag": etag})
+        self.send_json(404, {"error": f"Unknown endpoint {kind}"})
+
+    def send_json(self, status, data, headers=None):
+        self.send_body(status, json.dumps(data, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8", headers)
+
+    def send_body(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would drown benchmark output
+
+
+def start_fake_server(host=DEFAULT_HOST, port=0, **options):
+    """Start a FakeWikiServer on a background thread; port 0 picks a free port"""
+    server = FakeWikiServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, name="fake-wiki", daemon=True).start()
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the MediaWiki action and REST APIs.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT})")
+    parser.add_argument("--corpus", metavar="PATH",
+                        help="recorded pages (JSON lines) to serve instead of the synthetic corpus")
+    parser.add_argument("--latency", type=float, default=DEFAULT_LATENCY,
+                        help=f"fixed response time in seconds (default: {DEFAULT_LATENCY})")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER,
+                        help=f"mean of the random extra response time in seconds (default: {DEFAULT_JITTER})")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="share of requests answered with HTTP 503 (default: 0)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the corpus, delays and errors (default: 0)")
+    parser.add_argument("--record", type=int, metavar="N",
+                        help="record N random articles of a live Wikipedia into --corpus and exit")
+    parser.add_argument("-l", "--language", default="en", help="language to record from (default: en)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    user_agent = 'RandomWikiReflectionTool (YourProjectName <your_email@example.com>)'
+    if args.record:
+        if not args.corpus:
+            sys.exit("--record needs --corpus PATH")
+        count = record_corpus(args.language, args.record, args.corpus, user_agent)
+        print(f"Recorded {count} articles to {args.corpus}", file=sys.stderr)
+        sys.exit(0)
+    pages = load_corpus(args.corpus) if args.corpus else None
+    server = FakeWikiServer((args.host, args.port), pages, latency=args.latency, jitter=args.jitter,
+                            error_rate=args.error_rate, seed=args.seed)
+    print(f"Serving {len(server.pages)} pages on http://{args.host}:{server.server_port}; "
+          f"use WIKI_BASE_URL={server.base_url}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
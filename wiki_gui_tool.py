@@ -1,13 +1,53 @@
 import sys
-import wikipediaapi
-import requests
-import webbrowser
+import json
+import time
+
+# Taken before the imports, as the start of the startup timings
+IMPORT_STARTED = time.perf_counter()
+
+import functools
+import threading
+from collections import deque
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QWidget, QLabel, QPushButton, QTextBrowser,
-    QHBoxLayout, QComboBox, QFrame, QScrollArea, QSizePolicy
+    QHBoxLayout, QComboBox, QFrame, QCheckBox, QTreeView, QSplitter,
+    QLineEdit, QListWidget, QListWidgetItem
+)
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt6.QtGui import QCursor, QKeySequence, QShortcut
+
+# The network modules (requests, wikipediaapi and everything built on them)
+# are imported by the first fetch worker, off the GUI thread and after the
+# window has been painted
+from wiki_seen import seen_stats
+from wiki_snapshot import (
+    ArticleSnapshot, article_url, render_summary_html, render_section_html, iter_section_chunks
 )
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QCursor, QPalette, QColor
+from wiki_section_model import SectionTreeModel
+from wiki_themes import ThemeManager
+from wiki_metrics import get_metrics, phase, FetchTrace, RENDER, DISPLAY
+from wiki_waterfall import WaterfallOverlay
+from wiki_search import get_search_index
+from wiki_history import ArticleHistory
+from wiki_editions import EditionsView
+from wiki_startup import StartupTimer, save_last_article, load_last_article, IMPORT, CONSTRUCT, FIRST_FRESH
+
+# Number of ready-to-show articles kept per Wikipedia language
+PREFETCH_DEPTH = 3
+# Number of articles the prefetch pool downloads in parallel
+PREFETCH_CONCURRENCY = 2
+# Maximum number of worker threads used for on-demand fetches
+FETCH_WORKERS = 2
+# Longest wait for running fetch workers when the window closes
+CLOSE_TIMEOUT_MS = 1000
+# Time budget for a single GUI-thread handler: one frame at 60 Hz
+FRAME_BUDGET_MS = 1000 / 60
+# Approximate number of sections added to the outline per streamed chunk
+SECTIONS_PER_CHUNK = 25
+# Search results listed while typing
+SEARCH_RESULTS = 12
+# Pause in typing after which the search runs
+SEARCH_DELAY_MS = 150
 
 # GUI translations
 GUI_TRANSLATIONS = {
@@ -21,7 +61,13 @@ GUI_TRANSLATIONS = {
         "categories": "Categories",
         "new_article": "🔄 New Random Article",
         "fetching": "Fetching article...",
-        "error": "Error"
+        "error": "Error",
+        "offline": "Offline",
+        "timings": "Timings",
+        "search": "🔍 Search articles seen before...",
+        "editions": "🌐 Other Languages",
+        "compare": "Fetch",
+        "no_edition": "No article in this edition"
     },
     "Ukrainian": {
         "window_title": "Інструмент для рефлексії Вікіпедії",
@@ -33,7 +79,13 @@ GUI_TRANSLATIONS = {
         "categories": "Категорії",
         "new_article": "🔄 Нова випадкова стаття",
         "fetching": "Отримання статті...",
-        "error": "Помилка"
+        "error": "Помилка",
+        "offline": "Офлайн",
+        "timings": "Таймінги",
+        "search": "🔍 Пошук серед переглянутих статей...",
+        "editions": "🌐 Іншими мовами",
+        "compare": "Отримати",
+        "no_edition": "У цьому розділі немає статті"
     },
     "German": {
         "window_title": "Wikipedia Reflexions-Tool",
@@ -45,7 +97,13 @@ GUI_TRANSLATIONS = {
         "categories": "Kategorien",
         "new_article": "🔄 Neuer zufälliger Artikel",
         "fetching": "Artikel wird geladen...",
-        "error": "Fehler"
+        "error": "Fehler",
+        "offline": "Offline",
+        "timings": "Zeiten",
+        "search": "🔍 Bereits gesehene Artikel durchsuchen...",
+        "editions": "🌐 Andere Sprachen",
+        "compare": "Laden",
+        "no_edition": "Kein Artikel in dieser Ausgabe"
     },
     "French": {
         "window_title": "Outil de Réflexion Wikipédia",
@@ -57,7 +115,13 @@ GUI_TRANSLATIONS = {
         "categories": "Catégories",
         "new_article": "🔄 Nouvel article aléatoire",
         "fetching": "Chargement de l'article...",
-        "error": "Erreur"
+        "error": "Erreur",
+        "offline": "Hors ligne",
+        "timings": "Durées",
+        "search": "🔍 Rechercher dans les articles déjà vus...",
+        "editions": "🌐 Autres langues",
+        "compare": "Charger",
+        "no_edition": "Pas d'article dans cette édition"
     },
     "Russian": {
         "window_title": "Инструмент для рефлексии Википедии",
@@ -69,7 +133,13 @@ GUI_TRANSLATIONS = {
         "categories": "Категории",
         "new_article": "🔄 Новая случайная статья",
         "fetching": "Загрузка статьи...",
-        "error": "Ошибка"
+        "error": "Ошибка",
+        "offline": "Офлайн",
+        "timings": "Тайминги",
+        "search": "🔍 Поиск по просмотренным статьям...",
+        "editions": "🌐 На других языках",
+        "compare": "Загрузить",
+        "no_edition": "В этом разделе нет статьи"
     },
     "Romani": {
         "window_title": "Wikipedia Reflection Tool",
@@ -81,63 +151,179 @@ GUI_TRANSLATIONS = {
         "categories": "Categories",
         "new_article": "🔄 New Random Article",
         "fetching": "Fetching article...",
-        "error": "Error"
+        "error": "Error",
+        "offline": "Offline",
+        "timings": "Timings",
+        "search": "🔍 Search articles seen before...",
+        "editions": "🌐 Other Languages",
+        "compare": "Fetch",
+        "no_edition": "No article in this edition"
     }
 }
 
-# Reuse the function to get a random article title
-def get_random_article_title(language='en'):
-    url = f"https://{language}.wikipedia.org/w/api.php"
-    params = {
-        "action": "query",
-        "list": "random",
-        "rnnamespace": 0, # Only get articles (namespace 0)
-        "rnlimit": 1,
-        "format": "json"
-    }
-    try:
-        response = requests.get(url, params=params)
-        response.raise_for_status() # Raise an exception for bad status codes
-        data = response.json()
-        title = data['query']['random'][0]['title']
-        return title
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching random article title: {e}")
-        return None
-
-# Thread to fetch Wikipedia article data to avoid freezing the GUI
-class ArticleFetcher(QThread):
-    article_fetched = pyqtSignal(str, str, list, dict)
-    error_occurred = pyqtSignal(str)
-
-    def __init__(self, title, user_agent, language):
+# Records how long a GUI-thread handler blocks the event loop and warns when
+# it takes longer than one frame
+def measure_ui_block(method):
+    # Qt passes extra signal arguments (e.g. "checked"); drop what the method does not take
+    arity = method.__code__.co_argcount - 1
+
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        start = time.perf_counter()
+        try:
+            return method(self, *args[:arity])
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.ui_block_times.append((method.__name__, elapsed_ms))
+            if elapsed_ms > FRAME_BUDGET_MS:
+                print(f"GUI thread blocked for {elapsed_ms:.1f} ms in {method.__name__}", file=sys.stderr)
+    return wrapper
+
+# Records a handler that paints fetched content as a "display" phase of the
+# fetch in progress (its trace is taken before the handler may finish it)
+def display_phase(method):
+    @functools.wraps(method)
+    def wrapper(self, *args):
+        with phase(DISPLAY, self.language, method.__name__, self.fetch_trace):
+            return method(self, *args)
+    return wrapper
+
+
+# Signals of ArticleFetcher (a QRunnable cannot emit signals itself). Every
+# signal carries the generation of the request it answers. An article is
+# streamed in stages (title, summary HTML, chunks of section snapshots,
+# categories HTML), then article_fetched delivers the complete ArticleSnapshot.
+class FetcherSignals(QObject):
+    title_ready = pyqtSignal(int, str, str)
+    summary_ready = pyqtSignal(int, str)
+    sections_chunk = pyqtSignal(int, int, object)
+    categories_ready = pyqtSignal(int, str)
+    article_fetched = pyqtSignal(int, object)
+    error_occurred = pyqtSignal(int, str)
+
+
+# Result of SearchJob, tagged with the generation of the search
+class SearchSignals(QObject):
+    results_ready = pyqtSignal(int, object)
+
+
+# Job running one full-text search off the GUI thread
+class SearchJob(QRunnable):
+    def __init__(self, generation, text):
+        super().__init__()
+        self.signals = SearchSignals()
+        self.generation = generation
+        self.text = text
+
+    def run(self):
+        results = get_search_index().search(self.text, limit=SEARCH_RESULTS, marks=("", ""))
+        self.signals.results_ready.emit(self.generation, results)
+
+
+# Job run on the window's thread pool to fetch Wikipedia article data without
+# freezing the GUI. For random articles a small title + summary query is
+# answered first so it can be painted while the full article loads. A
+# cancelled job never emits, even if its request completes.
+class ArticleFetcher(QRunnable):
+    def __init__(self, generation, title, user_agent, language, trace=None):
         super().__init__()
+        self.signals = FetcherSignals()
+        self.generation = generation
         self.title = title
         self.user_agent = user_agent
         self.language = language
+        self.trace = trace
+        self._cancelled = threading.Event()
+        # Set when run() returns; the pool may delete the job any time after that
+        self._finished = False
+        self._finished_lock = threading.Lock()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
 
     def run(self):
         try:
-            wiki_wiki = wikipediaapi.Wikipedia(
-                user_agent=self.user_agent,
-                language=self.language,
-                extract_format=wikipediaapi.ExtractFormat.WIKI
-            )
-            page = wiki_wiki.page(self.title)
+            if self.is_cancelled():
+                return
+            # Phases timed while fetching land in the window's trace of this fetch
+            with get_metrics().attach(self.trace):
+                self.fetch()
+        finally:
+            # Release the trace now rather than when the pool deletes the job
+            self.trace = None
+            with self._finished_lock:
+                self._finished = True
 
-            if page.exists():
-                summary = page.summary
-                sections = page.sections # Get sections
-                categories = page.categories # Get categories
-                self.article_fetched.emit(page.title, summary, sections, categories)
+    def take_from(self, pool):
+        """Drop the job from the pool's queue if it has not run yet"""
+        # Holding the lock keeps run() from returning, so the pool cannot
+        # delete the job while it is looked up in the queue
+        with self._finished_lock:
+            if not self._finished:
+                pool.tryTake(self)
+
+    def disconnect(self):
+        """Detach every receiver, so a superseded job holds no reference to the window"""
+        signals = self.signals
+        for signal in (signals.title_ready, signals.summary_ready, signals.sections_chunk,
+                       signals.categories_ready, signals.article_fetched, signals.error_occurred):
+            try:
+                signal.disconnect()
+            except TypeError:
+                pass  # Nothing connected
+
+    def fetch(self):
+        try:
+            from random_wiki_article import fetch_article, fetch_random_article, fetch_random_intro
+            intro = None
+            if self.title:
+                article = fetch_article(self.title, self.user_agent, self.language)
             else:
-                self.error_occurred.emit(f"Article '{self.title}' not found.")
+                intro = fetch_random_intro(self.user_agent, self.language)
+                if intro and not self.is_cancelled():
+                    self.emit_intro(intro["title"], intro["summary"])
+                    article = fetch_article(intro["title"], self.user_agent, self.language)
+                else:
+                    # Offline or the summary query failed: one combined query or the cache
+                    article = fetch_random_article(self.user_agent, self.language)
+
+            if self.is_cancelled():
+                return  # Superseded while the request was in flight
+            if article:
+                # Render the HTML here so the GUI thread only has to set it
+                with phase(RENDER, self.language):
+                    snapshot = ArticleSnapshot.from_article(self.language, article)
+                if intro is None:
+                    self.emit_intro(snapshot.title, snapshot.summary)
+                self.emit_rest(snapshot)
+            elif self.title or intro:
+                self.signals.error_occurred.emit(self.generation, f"Article '{self.title or intro['title']}' not found.")
+            else:
+                self.signals.error_occurred.emit(self.generation, "Could not retrieve a random article.")
         except Exception as e:
-            self.error_occurred.emit(f"Error fetching article content: {e}")
+            if not self.is_cancelled():
+                self.signals.error_occurred.emit(self.generation, f"Error fetching article content: {e}")
+
+    def emit_intro(self, title, summary):
+        self.signals.title_ready.emit(self.generation, title, article_url(self.language, title))
+        self.signals.summary_ready.emit(self.generation, render_summary_html(summary))
+
+    def emit_rest(self, snapshot):
+        for index, sections in enumerate(iter_section_chunks(snapshot.sections, SECTIONS_PER_CHUNK)):
+            if self.is_cancelled():
+                return
+            self.signals.sections_chunk.emit(self.generation, index, sections)
+        if snapshot.categories:
+            self.signals.categories_ready.emit(self.generation, snapshot.categories_html)
+        self.signals.article_fetched.emit(self.generation, snapshot)
 
 
 class WikiReflectionTool(QMainWindow):
-    def __init__(self):
+    def __init__(self, prefetch_depth=PREFETCH_DEPTH, prefetch_concurrency=PREFETCH_CONCURRENCY, startup_timer=None,
+                 startup_fetch=True):
         super().__init__()
 
         # Initialize GUI language
@@ -146,40 +332,8 @@ class WikiReflectionTool(QMainWindow):
 
         self.setWindowTitle(self.translations["window_title"])
         self.setGeometry(100, 100, 1000, 800)
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #f0f0f0;
-            }
-            QLabel {
-                color: #333333;
-            }
-            QPushButton {
-                background-color: #4a90e2;
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 4px;
-                font-size: 14px;
-            }
-            QPushButton:hover {
-                background-color: #357abd;
-            }
-            QPushButton:disabled {
-                background-color: #cccccc;
-            }
-            QComboBox {
-                padding: 5px;
-                border: 1px solid #cccccc;
-                border-radius: 4px;
-                background-color: white;
-            }
-            QTextBrowser {
-                border: 1px solid #cccccc;
-                border-radius: 4px;
-                background-color: white;
-                padding: 10px;
-            }
-        """)
+        # Theme stylesheets are compiled once; the startup look is the classic theme
+        self.theme_manager = ThemeManager(self)
 
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -219,6 +373,14 @@ class WikiReflectionTool(QMainWindow):
         self.language_combo.currentTextChanged.connect(self.change_language)
         self.language_combo.setMinimumWidth(150)
         
+        # Offline mode: serve random articles from the local cache only
+        self.offline_checkbox = QCheckBox(self.translations["offline"])
+        self.offline_checkbox.toggled.connect(self.toggle_offline)
+
+        # Waterfall of the phases of the last fetch, drawn over the article
+        self.timings_checkbox = QCheckBox(self.translations["timings"])
+        self.timings_checkbox.toggled.connect(self.toggle_timings)
+
         # Theme toggle
         self.theme_button = QPushButton(self.translations["dark_theme"])
         self.theme_button.clicked.connect(self.toggle_theme)
@@ -230,15 +392,55 @@ class WikiReflectionTool(QMainWindow):
         controls_layout.addWidget(wiki_language_label)
         controls_layout.addWidget(self.language_combo)
         controls_layout.addStretch()
+        # Back/forward through the articles shown, repainted from the history
+        self.back_button = QPushButton("◀")
+        self.back_button.clicked.connect(self.go_back)
+        self.back_button.setFixedWidth(40)
+        self.forward_button = QPushButton("▶")
+        self.forward_button.clicked.connect(self.go_forward)
+        self.forward_button.setFixedWidth(40)
+        QShortcut(QKeySequence(QKeySequence.StandardKey.Back), self, activated=self.go_back)
+        QShortcut(QKeySequence(QKeySequence.StandardKey.Forward), self, activated=self.go_forward)
+        controls_layout.addWidget(self.back_button)
         self.fetch_button = QPushButton(self.translations["new_article"])
         self.fetch_button.clicked.connect(self.fetch_random_article)
         self.fetch_button.setMinimumWidth(200)
         controls_layout.addWidget(self.fetch_button)
+        controls_layout.addWidget(self.forward_button)
+        # The shown article in other Wikipedia editions, side by side
+        self.editions_button = QPushButton(self.translations["editions"])
+        self.editions_button.clicked.connect(self.show_editions)
+        controls_layout.addWidget(self.editions_button)
+        self.editions_view = None
         controls_layout.addStretch()
+        controls_layout.addWidget(self.offline_checkbox)
+        controls_layout.addWidget(self.timings_checkbox)
         controls_layout.addWidget(self.theme_button)
         
         self.main_layout.addLayout(controls_layout)
 
+        # Full-text search over every article fetched so far, as you type
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText(self.translations["search"])
+        self.search_box.setClearButtonEnabled(True)
+        # Searched once typing pauses, on a thread of its own
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(lambda: self.search_articles(self.search_box.text()))
+        self.search_box.textChanged.connect(lambda: self.search_timer.start())
+        self.search_pool = QThreadPool(self)
+        self.search_pool.setMaxThreadCount(1)
+        self.search_generation = 0
+        self.search_box.returnPressed.connect(self.open_first_result)
+        self.search_results = QListWidget()
+        self.search_results.setMaximumHeight(220)
+        self.search_results.setVisible(False)
+        self.search_results.itemActivated.connect(self.open_search_result)
+        self.search_results.itemClicked.connect(self.open_search_result)
+        self.main_layout.addWidget(self.search_box)
+        self.main_layout.addWidget(self.search_results)
+
         # Article container with shadow effect
         article_container = QFrame()
         article_container.setStyleSheet("""
@@ -284,15 +486,32 @@ class WikiReflectionTool(QMainWindow):
         self.sections_label.setVisible(False)
         article_layout.addWidget(self.sections_label)
 
-        self.sections_text = QTextBrowser()
-        self.sections_text.setStyleSheet("""
+        # Section outline: a lazily expanded tree; the full text of a section
+        # is rendered into the pane next to it only when the section is opened
+        self.section_model = SectionTreeModel(self)
+        self.sections_tree = QTreeView()
+        self.sections_tree.setModel(self.section_model)
+        self.sections_tree.setHeaderHidden(True)
+        self.sections_tree.setUniformRowHeights(True)  # Lets Qt lay out only visible rows
+        self.sections_tree.setStyleSheet("font-size: 14px;")
+        self.sections_tree.expanded.connect(self.show_section)
+        self.sections_tree.clicked.connect(self.show_section)
+
+        self.section_text = QTextBrowser()
+        self.section_text.setStyleSheet("""
             QTextBrowser {
                 font-size: 14px;
                 line-height: 1.6;
             }
         """)
-        self.sections_text.setVisible(False)
-        article_layout.addWidget(self.sections_text)
+
+        self.sections_view = QSplitter(Qt.Orientation.Horizontal)
+        self.sections_view.addWidget(self.sections_tree)
+        self.sections_view.addWidget(self.section_text)
+        self.sections_view.setStretchFactor(0, 1)
+        self.sections_view.setStretchFactor(1, 2)
+        self.sections_view.setVisible(False)
+        article_layout.addWidget(self.sections_view)
 
         # Categories with improved styling
         self.categories_label = QLabel(self.translations["categories"])
@@ -312,15 +531,47 @@ class WikiReflectionTool(QMainWindow):
 
         # Add article container to main layout
         self.main_layout.addWidget(article_container)
+        self.timings_overlay = WaterfallOverlay(self.central_widget)
 
         # Initialize state
         self.user_agent = 'RandomWikiReflectionToolGUI (YourProjectName <your_email@example.com>)'
         self.language = 'en'
         self.current_article_url = None
         self.is_dark_theme = False
+        self.theme_manager.apply("classic")
+        # Created once the first fetch has loaded the network modules
+        self.prefetcher = None
+        self.prefetch_options = {"depth": prefetch_depth, "concurrency": prefetch_concurrency}
+        self.network_loaded = False
 
-        # Fetch first article
-        self.fetch_random_article()
+        # Bounded pool for on-demand fetches. Each request gets a new
+        # generation; results from older generations are dropped.
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(FETCH_WORKERS)
+        self.fetch_generation = 0
+        self.active_fetcher = None
+        # (handler name, milliseconds) of recent GUI-thread handlers
+        self.ui_block_times = deque(maxlen=200)
+        # Time to first content is the headline latency: (language, first content ms, total ms)
+        self.fetch_latencies = deque(maxlen=200)
+        self.fetch_started = None
+        self.first_content_ms = None
+        # Phases of the fetch in progress; published when it has been painted
+        self.fetch_trace = None
+        # Articles shown so far, for back and forward
+        self.history = ArticleHistory()
+        self.update_history_buttons()
+        self.startup_timer = startup_timer
+        # The first fetch replaces the warm article only once its title arrives
+        self.replace_pending = False
+
+        # Paint the article shown last straight away from its local snapshot;
+        # the first fetch starts once the event loop runs, i.e. after the
+        # window is shown, and replaces it when the fresh article arrives.
+        # Benchmarks pass startup_fetch=False to start from an empty window.
+        if startup_fetch:
+            self.show_last_article()
+            QTimer.singleShot(0, self.fetch_first_article)
 
     def change_gui_language(self, language):
         """Change the GUI language"""
@@ -334,327 +585,442 @@ class WikiReflectionTool(QMainWindow):
         self.sections_label.setText(self.translations["sections"])
         self.categories_label.setText(self.translations["categories"])
         self.fetch_button.setText(self.translations["new_article"])
+        self.offline_checkbox.setText(self.translations["offline"])
+        self.timings_checkbox.setText(self.translations["timings"])
+        self.search_box.setPlaceholderText(self.translations["search"])
+        self.editions_button.setText(self.translations["editions"])
+        if self.editions_view is not None:
+            self.editions_view.set_translations(self.translations)
 
+    @measure_ui_block
     def toggle_theme(self):
         self.is_dark_theme = not self.is_dark_theme
-        if self.is_dark_theme:
-            # Apply dark theme stylesheet
-            dark_stylesheet = """
-                /* --- General Styles --- */
-                QMainWindow {
-                    background-color: #121212; /* Deep dark background */
-                    color: #e0e0e0; /* Light gray text for general elements */
-                }
-
-                QLabel {
-                    color: #e0e0e0; /* Consistent light gray for labels */
-                }
-
-                QPushButton {
-                    background-color: #0d6efd; /* Vibrant blue */
-                    color: #ffffff; /* White text on buttons */
-                    border: none;
-                    padding: 12px 24px; /* Increased padding for larger buttons */
-                    border-radius: 6px;
-                    font-size: 15px; /* Slightly larger font */
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background-color: #0b5ed7; /* Darker blue on hover */
-                }
-                QPushButton:pressed {
-                    background-color: #0a58ca; /* Even darker blue when pressed */
-                }
-                QPushButton:disabled {
-                    background-color: #2d2d2d; /* Dark gray for disabled */
-                    color: #808080; /* Lighter gray text for disabled */
-                }
-
-                /* --- ComboBox Styles --- */
-                QComboBox {
-                    min-width: 150px;
-                    padding: 8px; /* Padding inside the combobox */
-                    border: 1px solid #3d3d3d; /* Subtle dark border */
-                    border-radius: 4px; /* Slightly smaller radius */
-                    background-color: #1e1e1e; /* Dark background */
-                    color: #e0e0e0; /* Light gray text */
-                }
-                QComboBox:hover {
-                    border-color: #0d6efd; /* Highlight border on hover */
-                }
-                QComboBox::drop-down {
-                    border: none; /* No border for dropdown arrow area */
-                }
-                QComboBox::down-arrow {
-                    image: none; /* Hide default arrow */
-                    border: none;
-                }
-
-                QComboBox QAbstractItemView {
-                    background-color: #1e1e1e; /* Dark background for dropdown list */
-                    color: #e0e0e0; /* Light gray text for list items */
-                    selection-background-color: #0d6efd; /* Blue selection background */
-                    selection-color: #ffffff; /* White text on selection */
-                    border: 1px solid #3d3d3d; /* Subtle border for the list */
-                    font-size: 14px;
-                }
-
-                /* --- Article Content Area Styles (Frame and Text Browsers) --- */
-                QFrame {
-                    background-color: #1a1a1a; /* Slightly lighter dark background for content frame */
-                    border-radius: 8px; /* Rounded corners for content frame */
-                    border: 1px solid #3d3d3d; /* Subtle border for the frame */
-                }
-
-                QTextBrowser {
-                    background-color: #1a1a1a; /* Match frame background */
-                    color: #e0e0e0; /* Light gray text */
-                    border: none; /* No border for text browsers within the frame */
-                    padding: 10px; /* Internal padding */
-                }
-
-                /* --- Scrollbar Styles --- */
-                QScrollBar:vertical {
-                    border: none;
-                    background: #2d2d2d; /* Darker background for scrollbar area */
-                    width: 12px;
-                    margin: 0px;
-                }
-                QScrollBar::handle:vertical {
-                    background: #555555; /* Medium gray handle */
-                    border-radius: 6px;
-                    min-height: 30px;
-                }
-                QScrollBar::handle:vertical:hover {
-                    background: #0d6efd; /* Blue handle on hover */
-                }
-                QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                    height: 0px;
-                }
-                QScrollBar:horizontal {
-                    border: none;
-                    background: #2d2d2d; /* Darker background for scrollbar area */
-                    height: 12px;
-                    margin: 0px;
-                }
-                QScrollBar::handle:horizontal {
-                    background: #555555; /* Medium gray handle */
-                    border-radius: 6px;
-                    min-width: 30px;
-                }
-                QScrollBar::handle:horizontal:hover {
-                    background: #0d6efd; /* Blue handle on hover */
-                }
-                QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
-                    width: 0px;
-                }
-            """
-            self.setStyleSheet(dark_stylesheet)
-            self.update() # Force a repaint after changing stylesheet
+        self.apply_theme("dark" if self.is_dark_theme else "light")
 
-        else:
-            # Apply light theme stylesheet
-            self.setStyleSheet("""
-                QMainWindow {
-                    background-color: #f8f9fa;
-                }
-                QLabel {
-                    color: #212529;
-                }
-                QPushButton {
-                    background-color: #0d6efd;
-                    color: #ffffff;
-                    border: none;
-                    padding: 10px 20px;
-                    border-radius: 6px;
-                    font-size: 14px;
-                    font-weight: bold;
-                }
-                QPushButton:hover {
-                    background-color: #0b5ed7;
-                }
-                QPushButton:pressed {
-                    background-color: #0a58ca;
-                }
-                QPushButton:disabled {
-                    background-color: #e9ecef;
-                    color: #6c757d;
-                }
-                /* Styling for QComboBox in light theme */
-                QComboBox {
-                    padding: 8px;
-                    border: 2px solid #ced4da;
-                    border-radius: 6px;
-                    background-color: #ffffff;
-                    color: #212529;
-                    min-width: 150px;
-                }
-                QComboBox:hover {
-                    border-color: #0d6efd;
-                }
-                QComboBox::drop-down {
-                    border: none;
-                }
-                QComboBox::down-arrow {
-                    image: none;
-                    border: none;
-                }
-                 QComboBox QAbstractItemView {
-                     background-color: #ffffff;
-                     color: #212529;
-                     selection-background-color: #0d6efd;
-                     selection-color: #ffffff;
-                     border: 1px solid #ced4da;
-                     font-size: 14px;
-                 }
-                QTextBrowser {
-                    border: 2px solid #ced4da;
-                    border-radius: 8px;
-                    background-color: #ffffff;
-                    color: #212529;
-                    padding: 15px;
-                    font-size: 14px;
-                    line-height: 1.6;
-                }
-                QTextBrowser:hover {
-                    border-color: #0d6efd;
-                }
-                QFrame {
-                    background-color: #ffffff;
-                    border-radius: 12px;
-                    border: 2px solid #ced4da;
-                }
-                QFrame:hover {
-                    border-color: #0d6efd;
-                }
-                QScrollBar:vertical {
-                    border: none;
-                    background-color: #f8f9fa;
-                    width: 12px;
-                    margin: 0px;
-                }
-                QScrollBar::handle:vertical {
-                    background-color: #ced4da;
-                    border-radius: 6px;
-                    min-height: 30px;
-                }
-                QScrollBar::handle:vertical:hover {
-                    background-color: #0d6efd;
-                }
-                QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
-                    height: 0px;
-                }
-                QScrollBar:horizontal {
-                    border: none;
-                    background-color: #f8f9fa;
-                    height: 12px;
-                    margin: 0px;
-                }
-                QScrollBar::handle:horizontal {
-                    background-color: #ced4da;
-                    border-radius: 6px;
-                    min-width: 30px;
-                }
-                QScrollBar::handle:horizontal:hover {
-                    background-color: #0d6efd;
-                }
-                QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
-                    width: 0px;
-                }
-            """)
-            self.theme_button.setText(self.translations["dark_theme"])
-
-            # Reset palette for QComboBoxes in light theme to default
-            default_palette = QApplication.instance().palette()
-            self.language_combo.setPalette(default_palette)
-            self.gui_language_combo.setPalette(default_palette)
-
-            # Clear specific stylesheet for QComboBoxes in light theme
-            self.language_combo.setStyleSheet("")
-            self.gui_language_combo.setStyleSheet("")
+    def apply_theme(self, name):
+        """Switch to a registered theme (see wiki_themes.register_theme)"""
+        theme = self.theme_manager.apply(name)
+        self.is_dark_theme = theme.dark
+        self.theme_button.setText(self.translations["light_theme"] if theme.dark else self.translations["dark_theme"])
 
+    @measure_ui_block
     def change_language(self, language_name):
         """Change the Wikipedia language and fetch a new article"""
         self.language = self.language_codes[language_name]
         self.fetch_random_article()
 
+    def select_language(self, code):
+        """Make an edition the current one, as if picked in the language selector, without fetching"""
+        for name, language in self.language_codes.items():
+            if language == code:
+                self.language = code
+                self.language_combo.blockSignals(True)
+                self.language_combo.setCurrentText(name)
+                self.language_combo.blockSignals(False)
+                return
+
     def open_wiki_article(self, event):
         if self.current_article_url:
+            import webbrowser
             webbrowser.open(self.current_article_url)
 
+    def toggle_offline(self, checked):
+        from random_wiki_article import set_offline_mode
+        set_offline_mode(checked)
+
+    def show_last_article(self):
+        snapshot = load_last_article()
+        if snapshot is None:
+            return
+        # Carry on in the language of the last session
+        self.select_language(snapshot.language)
+        self.display_article(snapshot)
+        if self.startup_timer is not None:
+            self.startup_timer.warm = True
+
+    @measure_ui_block
+    def fetch_first_article(self):
+        # Keep the warm article up until the fresh one can be painted
+        warm = self.history.current() is not None
+        self.begin_fetch(self.language, clear=not warm)
+        self.replace_pending = warm
+        self.show_random_article()
+
+    @measure_ui_block
     def fetch_random_article(self):
+        self.begin_fetch(self.language)
+        self.show_random_article()
+
+    def show_random_article(self):
+        # Show a prefetched article straight away when one is ready
+        snapshot = self.prefetcher.pop(self.language) if self.prefetcher is not None else None
+        if snapshot:
+            self.display_article(snapshot)
+            return
+
+        # Fetch a random article on the worker pool; the title, extract and
+        # categories come back from a single request
+        self.start_fetcher(None, self.language)
+
+    @measure_ui_block
+    def open_article(self, language, title):
+        """Fetch and show a given article, e.g. a search result"""
+        self.select_language(language)
+        self.begin_fetch(language)
+        self.start_fetcher(title, language)
+
+    @measure_ui_block
+    def go_back(self):
+        self.show_history_entry(self.history.back())
+
+    @measure_ui_block
+    def go_forward(self):
+        self.show_history_entry(self.history.forward())
+
+    def show_history_entry(self, snapshot):
+        # history.visit() sees the same object and keeps the position
+        if snapshot is None:
+            self.update_history_buttons()
+            return
+        self.show_snapshot(snapshot)
+
+    def show_snapshot(self, snapshot):
+        # The snapshot is already rendered, so this paints in one handler
+        # without touching the network. Back/forward, search results and
+        # edition picks may be in another language, which becomes the current one.
+        self.select_language(snapshot.language)
+        self.begin_fetch(snapshot.language)
+        self.fetch_started = None  # Not a fetch: keep it out of the latency figures
+        self.display_article(snapshot)
+
+    def show_editions(self):
+        snapshot = self.history.current()
+        if snapshot is None:
+            return
+        if self.editions_view is None:
+            self.editions_view = EditionsView(
+                self.language_codes, self.user_agent,
+                lambda generation, title, language: ArticleFetcher(generation, title, self.user_agent, language),
+                self.translations, self,
+            )
+            self.editions_view.article_chosen.connect(self.show_snapshot)
+        self.editions_view.show_article(snapshot)
+
+    def update_history_buttons(self):
+        self.back_button.setEnabled(self.history.can_go_back())
+        self.forward_button.setEnabled(self.history.can_go_forward())
+
+    def begin_fetch(self, language, clear=True):
+        # Supersede any fetch still queued or in flight
+        self.fetch_generation += 1
+        self.cancel_active_fetch()
+        self.replace_pending = False
+        if clear:
+            self.clear_article()
+        self.fetch_button.setEnabled(False)  # Disable button while fetching
+        self.fetch_started = time.perf_counter()
+        self.first_content_ms = None
+        self.fetch_trace = FetchTrace(language)
+
+    def clear_article(self):
+        self.replace_pending = False
         self.title_label.setText("Fetching article...")
         self.summary_text.clear()
-        self.sections_text.clear()
+        self.section_model.clear()
+        self.section_text.clear()
         self.categories_text.clear()
         self.sections_label.setVisible(False)
-        self.sections_text.setVisible(False)
+        self.sections_view.setVisible(False)
         self.categories_label.setVisible(False)
         self.categories_text.clear()
-        self.fetch_button.setEnabled(False)  # Disable button while fetching
 
-        random_title = get_random_article_title(self.language)
+    def start_fetcher(self, title, language):
+        fetcher = ArticleFetcher(self.fetch_generation, title, self.user_agent, language, self.fetch_trace)
+        fetcher.signals.title_ready.connect(self.on_title_ready)
+        fetcher.signals.summary_ready.connect(self.on_summary_ready)
+        fetcher.signals.sections_chunk.connect(self.on_sections_chunk)
+        fetcher.signals.categories_ready.connect(self.on_categories_ready)
+        fetcher.signals.article_fetched.connect(self.on_article_fetched)
+        fetcher.signals.error_occurred.connect(self.on_fetch_error)
+        self.active_fetcher = fetcher
+        self.thread_pool.start(fetcher)
 
-        if random_title:
-            # Use a thread to fetch the article data
-            self.fetcher_thread = ArticleFetcher(random_title, self.user_agent, self.language)
-            self.fetcher_thread.article_fetched.connect(self.display_article)
-            self.fetcher_thread.error_occurred.connect(self.display_error)
-            self.fetcher_thread.start()
-        else:
-            self.display_error("Could not retrieve a random article title.")
+    def search_articles(self, text):
+        # Results of earlier searches still queued or running are dropped
+        self.search_generation += 1
+        self.search_pool.clear()
+        if not text.strip():
+            self.on_search_results(self.search_generation, [])
+            return
+        job = SearchJob(self.search_generation, text)
+        job.signals.results_ready.connect(self.on_search_results)
+        self.search_pool.start(job)
+
+    @measure_ui_block
+    def on_search_results(self, generation, results):
+        if generation != self.search_generation:
+            return
+        self.search_results.clear()
+        for result in results:
+            item = QListWidgetItem(f"{result['title']} ({result['language']})\n    {result['snippet']}")
+            item.setData(Qt.ItemDataRole.UserRole, (result["language"], result["title"]))
+            self.search_results.addItem(item)
+        self.search_results.setVisible(bool(results))
+
+    def open_first_result(self):
+        if self.search_results.count():
+            self.open_search_result(self.search_results.item(0))
 
-    def display_article(self, title, summary, sections, categories):
+    def open_search_result(self, item):
+        language, title = item.data(Qt.ItemDataRole.UserRole)
+        self.search_results.setVisible(False)
+        self.open_article(language, title)
+
+    def cancel_active_fetch(self):
+        if self.active_fetcher is not None:
+            self.active_fetcher.cancel()
+            self.active_fetcher.disconnect()
+            # Drop it from the queue if it has not started yet
+            self.active_fetcher.take_from(self.thread_pool)
+            self.active_fetcher = None
+
+    # Streamed stages: each one is painted as soon as it arrives. Results of
+    # superseded generations are dropped.
+    @display_phase
+    @measure_ui_block
+    def on_title_ready(self, generation, title, url):
+        if generation != self.fetch_generation:
+            return
+        if self.replace_pending:
+            self.clear_article()
         self.title_label.setText(title)
-        self.summary_text.setText(summary)
+        self.current_article_url = url
+        self.mark_first_content()
+
+    @display_phase
+    @measure_ui_block
+    def on_summary_ready(self, generation, summary_html):
+        if generation != self.fetch_generation:
+            return
+        self.summary_text.setHtml(summary_html)
+
+    @display_phase
+    @measure_ui_block
+    def on_sections_chunk(self, generation, index, sections):
+        if generation != self.fetch_generation:
+            return
+        if index == 0:
+            self.sections_label.setVisible(True)
+            self.sections_view.setVisible(True)
+            self.section_model.set_sections(sections)
+        else:
+            self.section_model.append_sections(sections)
 
-        # Create and store the Wikipedia URL
-        self.current_article_url = f"https://{self.language}.wikipedia.org/wiki/{title.replace(' ', '_')}"
+    @display_phase
+    @measure_ui_block
+    def on_categories_ready(self, generation, categories_html):
+        if generation != self.fetch_generation:
+            return
+        self.categories_label.setVisible(True)
+        self.categories_text.setVisible(True)
+        self.categories_text.setHtml(categories_html)
+
+    def on_article_fetched(self, generation, snapshot):
+        if generation != self.fetch_generation:
+            return  # Stale result of a superseded fetch
+        self.active_fetcher = None
+        self.network_loaded = True
+        # Every stage has been painted already
+        self.finish_fetch(snapshot)
+
+    def on_fetch_error(self, generation, message):
+        if generation != self.fetch_generation:
+            return
+        self.active_fetcher = None
+        self.network_loaded = True
+        self.display_error(message)
+        self.publish_trace()
+        if self.startup_timer is not None:
+            self.startup_timer.fail(message)
+
+    def ui_block_report(self):
+        """Summarise recent GUI-thread blocking times in milliseconds"""
+        times = sorted(ms for _, ms in self.ui_block_times)
+        if not times:
+            return {"count": 0, "max_ms": 0.0, "p50_ms": 0.0, "over_budget": 0}
+        return {
+            "count": len(times),
+            "max_ms": times[-1],
+            "p50_ms": times[len(times) // 2],
+            "over_budget": sum(1 for ms in times if ms > FRAME_BUDGET_MS),
+        }
+
+    def mark_first_content(self):
+        if self.first_content_ms is None and self.fetch_started is not None:
+            self.first_content_ms = (time.perf_counter() - self.fetch_started) * 1000
+
+    def fetch_latency_summary(self):
+        """Median and p95 of time to first content and total fetch time in milliseconds"""
+        def percentiles(values):
+            values = sorted(values)
+            if not values:
+                return {"p50_ms": 0.0, "p95_ms": 0.0}
+            return {
+                "p50_ms": values[len(values) // 2],
+                "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))],
+            }
+        return {
+            "count": len(self.fetch_latencies),
+            "first_content": percentiles(first for _, first, _ in self.fetch_latencies),
+            "total": percentiles(total for _, _, total in self.fetch_latencies),
+        }
+
+    def fetch_latency_report(self):
+        """fetch_latency_summary() plus the request tail latencies, hedging, circuit
+        state and backend choice of each language"""
+        from wiki_http import get_transport
+        from wiki_backends import get_selector
+        return {
+            **self.fetch_latency_summary(),
+            "languages": get_transport().language_stats(),
+            "backends": get_selector().stats(),
+            "seen": seen_stats(),
+            "phases": get_metrics().to_json(),
+        }
+
+    @display_phase
+    @measure_ui_block
+    def display_article(self, snapshot):
+        # All HTML was rendered by the worker; only hand it to the widgets here
+        if self.replace_pending:
+            self.clear_article()
+        self.title_label.setText(snapshot.title)
+        self.mark_first_content()
+        self.summary_text.setHtml(snapshot.summary_html)
+
+        # Store the Wikipedia URL
+        self.current_article_url = snapshot.url
 
         # Display sections
-        if sections:
+        if snapshot.sections:
             self.sections_label.setVisible(True)
-            self.sections_text.setVisible(True)
-            
-            # Create a list to store HTML content
-            sections_content = []
-            
-            def build_sections_html(secs, level=0):
-                for s in secs:
-                    indent = "&nbsp;" * level * 4  # Use non-breaking spaces for indentation
-                    sections_content.append(f"<h{min(level + 2, 6)}>{indent}{s.title}</h{min(level + 2, 6)}>")
-                    # Limit text and add paragraph tags for formatting
-                    sections_content.append(f"<p>{indent}{s.text[:500]}...</p>")
-                    if s.sections:
-                        build_sections_html(s.sections, level + 1)
-            
-            build_sections_html(sections)
-            # Join all HTML content with newlines
-            self.sections_text.setHtml("\n".join(sections_content))
+            self.sections_view.setVisible(True)
+            self.section_model.set_sections(snapshot.sections)
 
         # Display categories
-        if categories:
+        if snapshot.categories:
             self.categories_label.setVisible(True)
             self.categories_text.setVisible(True)
-            categories_text = ""
-            for category_title in sorted(categories.keys()):
-                 categories_text += f"- {category_title}\n"
-            self.categories_text.setText(categories_text)
+            self.categories_text.setHtml(snapshot.categories_html)
+
+        self.finish_fetch(snapshot)
+
+    def finish_fetch(self, snapshot):
+        if self.fetch_started is not None:
+            total_ms = (time.perf_counter() - self.fetch_started) * 1000
+            self.fetch_latencies.append((snapshot.language, self.first_content_ms or total_ms, total_ms))
+            self.fetch_started = None
+            if self.startup_timer is not None:
+                self.startup_timer.mark(FIRST_FRESH)
 
         self.fetch_button.setEnabled(True)  # Re-enable button
+        # The article of the last session was marked when it was first shown
+        if self.history.visit(snapshot) and self.network_loaded:
+            from random_wiki_article import mark_seen
+            mark_seen(snapshot.language, snapshot.title)
+        self.update_history_buttons()
+        self.publish_trace()
+
+        self.warm_prefetcher()
+
+    def warm_prefetcher(self):
+        # Keep the prefetch pool for this language warm. It is created after
+        # the first fetch, whose worker has imported the network modules.
+        if self.prefetcher is None:
+            if not self.network_loaded:
+                return
+            from wiki_prefetch import ArticlePrefetcher
+            self.prefetcher = ArticlePrefetcher(self.user_agent, **self.prefetch_options)
+        self.prefetcher.warm(self.language)
+
+    def publish_trace(self):
+        # Deferred so the display phase of the handler still running is included
+        trace, self.fetch_trace = self.fetch_trace, None
+        if trace is not None:
+            QTimer.singleShot(0, lambda: self.show_trace(trace))
+
+    def show_trace(self, trace):
+        get_metrics().finish(trace)
+        self.timings_overlay.set_trace(trace.to_json(), self.fetch_latency_summary())
+        self.place_timings_overlay()
+
+    def toggle_timings(self, checked):
+        self.timings_overlay.setVisible(checked)
+        self.place_timings_overlay()
 
+    def place_timings_overlay(self):
+        # Top right corner of the article, clear of the controls row
+        overlay = self.timings_overlay
+        overlay.move(self.central_widget.width() - overlay.width() - 20, 70)
+        overlay.raise_()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.place_timings_overlay()
+
+    @measure_ui_block
+    def show_section(self, index):
+        """Render the full text of the section that was expanded or clicked"""
+        section = self.section_model.section_at(index)
+        if section is not None:
+            self.section_text.setHtml(render_section_html(section))
+
+    @measure_ui_block
     def display_error(self, message):
         self.title_label.setText("Error")
         self.summary_text.setText(message)
         self.sections_label.setVisible(False)
-        self.sections_text.setVisible(False)
+        self.sections_view.setVisible(False)
         self.categories_label.setVisible(False)
         self.categories_text.setVisible(False)
         self.fetch_button.setEnabled(True) # Re-enable button
 
+    def closeEvent(self, event):
+        self.cancel_active_fetch()
+        self.thread_pool.clear()
+        self.search_timer.stop()
+        self.search_pool.clear()
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        # Workers must not outlive the window whose signals they were wired to
+        self.thread_pool.waitForDone(CLOSE_TIMEOUT_MS)
+        self.search_pool.waitForDone(CLOSE_TIMEOUT_MS)
+        snapshot = self.history.current()
+        if snapshot is not None:
+            save_last_article(snapshot)
+        super().closeEvent(event)
+
+
+# Print how long each startup step took as JSON, then close the window
+def report_startup(timer, window):
+    print(json.dumps(timer.report(), indent=2))
+    window.close()
+
 
 if __name__ == "__main__":
+    # --startup-timings: report import, construct, first paint and first fresh
+    # article times of this start instead of staying open
+    timer = None
+    if "--startup-timings" in sys.argv:
+        sys.argv.remove("--startup-timings")
+        timer = StartupTimer(IMPORT_STARTED)
+        timer.mark(IMPORT)
     app = QApplication(sys.argv)
-    main_window = WikiReflectionTool()
+    main_window = WikiReflectionTool(startup_timer=timer)
+    if timer is not None:
+        timer.mark(CONSTRUCT)
+        timer.watch_paint(main_window.title_label)
+        # Queued, so the handler that reached the milestone finishes first
+        timer.finished.connect(lambda: report_startup(timer, main_window), Qt.ConnectionType.QueuedConnection)
     main_window.show()
     sys.exit(app.exec()) 
\ No newline at end of file
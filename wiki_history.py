@@ -0,0 +1,149 @@
+import sys
+import sqlite3
+
+from wiki_snapshot import ArticleSnapshot
+
+# Snapshots kept in memory, and the memory their text may take
+DEFAULT_MAX_SNAPSHOTS = 30
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+# Older entries kept as references to the disk cache; beyond this they are forgotten
+MAX_SPILLED = 1000
+
+
+# An entry whose snapshot was moved out of memory into the article cache
+class SpilledEntry:
+    __slots__ = ("language", "title", "revid")
+
+    def __init__(self, language, title, revid):
+        self.language = language
+        self.title = title
+        self.revid = revid
+
+    def __repr__(self):
+        return f"SpilledEntry({self.language!r}, {self.title!r}, revid={self.revid})"
+
+
+# Back/forward history of shown articles. The entries around the current
+# position are pre-rendered ArticleSnapshot objects, so going back or forward
+# repaints without the network; the in-memory ring is capped by count and
+# bytes, and the entries farthest from the current position spill to the disk
+# cache as references. Visiting a new article drops the forward entries.
+# Used from the GUI thread only.
+class ArticleHistory:
+    def __init__(self, max_snapshots=DEFAULT_MAX_SNAPSHOTS, max_bytes=DEFAULT_MAX_BYTES, cache=None):
+        self.max_snapshots = max(1, max_snapshots)
+        self.max_bytes = max_bytes
+        self._cache = cache
+        self._entries = []  # ArticleSnapshot or SpilledEntry, oldest first
+        self._sizes = {}    # id(snapshot) -> nbytes of the snapshots in memory
+        self._position = -1
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            # Imported on first spill: the cache pulls in the network modules
+            from wiki_cache import get_cache
+            self._cache = get_cache()
+        return self._cache
+
+    def visit(self, snapshot):
+        """Record a newly shown article; returns False if it is the current entry already"""
+        if self.current() is snapshot:
+            return False
+        for entry in self._entries[self._position + 1:]:
+            self._sizes.pop(id(entry), None)
+        del self._entries[self._position + 1:]
+        self._entries.append(snapshot)
+        self._sizes[id(snapshot)] = snapshot.nbytes()
+        self._position = len(self._entries) - 1
+        self._trim()
+        return True
+
+    def current(self):
+        if 0 <= self._position < len(self._entries):
+            entry = self._entries[self._position]
+            return entry if isinstance(entry, ArticleSnapshot) else None
+        return None
+
+    def can_go_back(self):
+        return self._position > 0
+
+    def can_go_forward(self):
+        return self._position < len(self._entries) - 1
+
+    def back(self):
+        """Move one entry back and return its snapshot (None at the start)"""
+        return self._move(-1)
+
+    def forward(self):
+        return self._move(1)
+
+    def stats(self):
+        in_memory = [e for e in self._entries if isinstance(e, ArticleSnapshot)]
+        return {
+            "entries": len(self._entries),
+            "position": self._position,
+            "in_memory": len(in_memory),
+            "spilled": len(self._entries) - len(in_memory),
+            "bytes": sum(self._sizes.values()),
+        }
+
+    def _move(self, step):
+        # Entries whose spilled copy left the cache are skipped
+        position = self._position + step
+        while 0 <= position < len(self._entries):
+            snapshot = self._load(position)
+            if snapshot is not None:
+                self._position = position
+                self._trim()
+                return snapshot
+            del self._entries[position]
+            if step < 0:
+                self._position -= 1
+                position -= 1
+        return None
+
+    def _load(self, position):
+        entry = self._entries[position]
+        if isinstance(entry, ArticleSnapshot):
+            return entry
+        try:
+            article = self.cache.get(entry.language, entry.title, revid=entry.revid or None, allow_stale=True)
+        except sqlite3.Error as e:
+            print(f"Error loading history entry {entry.title!r}: {e}", file=sys.stderr)
+            article = None
+        if article is None:
+            return None
+        snapshot = ArticleSnapshot.from_article(entry.language, article)
+        self._entries[position] = snapshot
+        self._sizes[id(snapshot)] = snapshot.nbytes()
+        return snapshot
+
+    def _trim(self):
+        while True:
+            in_memory = [i for i, e in enumerate(self._entries) if isinstance(e, ArticleSnapshot) and i != self._position]
+            over = len(in_memory) + 1 > self.max_snapshots or sum(self._sizes.values()) > self.max_bytes
+            if not in_memory or not over:
+                break
+            self._spill(max(in_memory, key=lambda i: abs(i - self._position)))
+        excess = len(self._entries) - self.max_snapshots - MAX_SPILLED
+        if excess > 0:
+            # Only old references go; the current position shifts with them
+            removable = min(excess, self._position)
+            for entry in self._entries[:removable]:
+                self._sizes.pop(id(entry), None)
+            del self._entries[:removable]
+            self._position -= removable
+
+    def _spill(self, position):
+        snapshot = self._entries[position]
+        cache = self.cache
+        try:
+            # Usually cached by the fetch already; a stale copy is not renewed
+            validator = cache.validator(snapshot.language, snapshot.title)
+            if validator is None or validator[0] != (snapshot.lastrevid or 0):
+                cache.put(snapshot.language, snapshot.to_article())
+        except sqlite3.Error as e:
+            print(f"Error storing history entry {snapshot.title!r}: {e}", file=sys.stderr)
+        self._sizes.pop(id(snapshot), None)
+        self._entries[position] = SpilledEntry(snapshot.language, snapshot.title, snapshot.lastrevid)
@@ -0,0 +1,361 @@
+import os
+import time
+import threading
+import requests
+import wikipediaapi
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, CancelledError, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from wiki_breaker import CircuitBreaker
+from wiki_ratelimit import RateLimiterRegistry, backoff_delay, parse_retry_after
+from wiki_stats import SlidingLatencyWindow
+
+# Site serving a language's action and REST APIs; WIKI_BASE_URL points every
+# language at another site with the same APIs (e.g. wiki_fake_server.py)
+DEFAULT_BASE_URL = os.environ.get("WIKI_BASE_URL") or "https://{language}.wikipedia.org"
+# Default user agent for requests that do not send their own
+DEFAULT_USER_AGENT = 'RandomWikiReflectionTool (YourProjectName <your_email@example.com>)'
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (3.05, 15)
+# Number of hosts (one per Wikipedia language) kept in the connection pool
+POOL_CONNECTIONS = 16
+# Number of keep-alive connections kept open per host
+POOL_MAXSIZE = 8
+# Retries after throttling (429/503, maxlag) or a connection failure
+MAX_RETRIES = 2
+# Status codes that mean "slow down" rather than "failed"
+THROTTLE_STATUS = (429, 503)
+# Ask MediaWiki to refuse requests while database replication lags more
+# than this many seconds; it answers with a maxlag error and Retry-After
+MAXLAG = 5
+# Hedged queries: when no answer has arrived after this percentile of the
+# language's recent latency, a duplicate request is sent and the first answer
+# wins. None disables hedging.
+HEDGE_PERCENTILE = 0.9
+# Delay used while a language has fewer than HEDGE_MIN_SAMPLES recent latencies, and the lower bound
+HEDGE_DEFAULT_DELAY = 1.0
+HEDGE_MIN_DELAY = 0.05
+HEDGE_MIN_SAMPLES = 20
+# At most this fraction of a language's queries may be duplicated
+HEDGE_BUDGET = 0.1
+# Threads running hedged queries (created on demand)
+HEDGE_WORKERS = 64
+# Recent latencies kept per language for the hedge delay and tail
+# percentiles, and the age in seconds at which they are forgotten
+LANGUAGE_SAMPLES = 256
+LANGUAGE_SAMPLE_AGE = 300.0
+
+
+# wikipediaapi client whose API requests are sent by a WikiClient, so the
+# fallback path shares the pooled session, the host's rate limiter and the
+# retries with everything else instead of opening connections of its own
+class TransportWikipedia(wikipediaapi.Wikipedia):
+    def __init__(self, client, user_agent):
+        super().__init__(
+            user_agent=user_agent,
+            language=client.language,
+            extract_format=wikipediaapi.ExtractFormat.WIKI
+        )
+        self._wiki_client = client
+        self._user_agent = user_agent
+
+    def _get(self, language, params):
+        response = self._wiki_client.get(params, headers={"User-Agent": self._user_agent})
+        response.raise_for_status()
+        return response.json()
+
+    def _query(self, page, params):
+        # Entry point of wikipediaapi releases before 0.8
+        params.update(format="json", redirects=1)
+        return self._get(page.language, params)
+
+
+# Language-bound entry point to the MediaWiki action API. Clients are handed
+# out by WikiTransport.client() and all share the transport's connection pool.
+# Each client keeps its language's latency distribution, which sets the hedge
+# delay, and a circuit breaker that fails fast while the edition is degraded.
+class WikiClient:
+    def __init__(self, transport, language, base_url=DEFAULT_BASE_URL):
+        self.transport = transport
+        self.language = language
+        self.base_url = base_url.format(language=language).rstrip("/")
+        self.api_url = f"{self.base_url}/w/api.php"
+        self.rest_url = f"{self.base_url}/api/rest_v1"
+        self.latencies = SlidingLatencyWindow(LANGUAGE_SAMPLES, LANGUAGE_SAMPLE_AGE)
+        self.breaker = CircuitBreaker(language)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._wikipediaapi = {}  # user agent -> wikipediaapi.Wikipedia
+
+    def get(self, params, headers=None, **kwargs):
+        return self.transport.get(self.api_url, params=params, headers=headers, **kwargs)
+
+    def rest(self, path, headers=None, timeout=None):
+        """GET a REST API path (e.g. "/page/title/Foo") and return the response"""
+        return self.transport.get(self.rest_url + path, headers=headers, timeout=timeout)
+
+    def query(self, params, headers=None, timeout=None):
+        """Run an action API request and return the decoded JSON, hedged against slow answers
+
+        Raises CircuitOpenError without sending anything while the language is degraded.
+        """
+        self.breaker.check()
+        start = time.perf_counter()
+        try:
+            data = self.transport.hedged(self, lambda: self._timed_query(params, headers, timeout))
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success(time.perf_counter() - start)
+        return data
+
+    def hedge_delay(self):
+        """Seconds to wait for an answer before sending a duplicate, or None when hedging is off"""
+        fraction = self.transport.hedge_percentile
+        if fraction is None:
+            return None
+        if self.latencies.recent() < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, self.latencies.percentile(fraction) / 1000)
+
+    def stats(self):
+        """Tail latency (ms), hedging and circuit state of this language"""
+        stats = self.latencies.summary()
+        stats.update(calls=self.calls, hedges=self.hedges, hedge_wins=self.hedge_wins)
+        stats["circuit"] = self.breaker.stats()
+        return stats
+
+    def _timed_query(self, params, headers, timeout):
+        # Every finished attempt is sampled, including hedges that lost the race,
+        # so the percentiles describe the edition rather than the hedging
+        start = time.perf_counter()
+        data = self._query(params, headers, timeout)
+        self.latencies.add((time.perf_counter() - start) * 1000)
+        return data
+
+    def _query(self, params, headers, timeout):
+        # Single action API request, waiting out maxlag errors
+        params = dict(params)
+        params.setdefault("maxlag", MAXLAG)
+        for attempt in range(self.transport.max_retries + 1):
+            response = self.get(params, headers=headers, timeout=timeout)
+            response.raise_for_status()
+            data = response.json()
+            error = data.get("error") if isinstance(data, dict) else None
+            if not error or error.get("code") != "maxlag" or attempt == self.transport.max_retries:
+                return data
+            delay = parse_retry_after(response.headers.get("Retry-After")) or backoff_delay(attempt)
+            self.transport.limiters.for_host(urlsplit(self.api_url).hostname).pause(delay)
+
+    def wikipediaapi(self, user_agent):
+        """Return a cached wikipediaapi client for this language, sending its requests through this client"""
+        with self.transport._lock:
+            wiki = self._wikipediaapi.get(user_agent)
+            if wiki is None:
+                wiki = TransportWikipedia(self, user_agent)
+                self._wikipediaapi[user_agent] = wiki
+            return wiki
+
+
+# One requests session with keep-alive connection pooling per host, shared by
+# the GUI, the worker threads and the command line script, so DNS, TCP and TLS
+# handshakes are paid once per host instead of once per request.
+# Every request first passes the host's adaptive rate limiter, which is
+# shared by everything using the transport; throttled and failed requests
+# are retried with jittered exponential backoff.
+class WikiTransport:
+    def __init__(self, user_agent=DEFAULT_USER_AGENT, timeout=DEFAULT_TIMEOUT,
+                 pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                 max_retries=MAX_RETRIES, hedge_percentile=HEDGE_PERCENTILE, base_url=DEFAULT_BASE_URL):
+        self.timeout = timeout
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.hedge_percentile = hedge_percentile
+        self._hedge_pool = None
+        self.limiters = RateLimiterRegistry()
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._requests = 0
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        # urllib3 advertises brotli (and zstd) only when a decoder is installed
+        self.session.headers.update({
+            "User-Agent": user_agent,
+            "Accept-Encoding": ACCEPT_ENCODING,
+        })
+
+    def get(self, url, params=None, headers=None, timeout=None, **kwargs):
+        limiter = self.limiters.for_host(urlsplit(url).hostname)
+        timeout = timeout if timeout is not None else self.timeout
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            with self._lock:
+                self._requests += 1
+            start = time.perf_counter()
+            response = None
+            feedback = {}
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=timeout, **kwargs)
+                if response.status_code in THROTTLE_STATUS:
+                    feedback = {"throttled": True, "retry_after": parse_retry_after(response.headers.get("Retry-After"))}
+                else:
+                    feedback = {"latency": time.perf_counter() - start}
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == self.max_retries:
+                    raise
+            finally:
+                # The slot is given back whatever was raised; only answers adjust the rate
+                limiter.release(**feedback)
+
+            if response is None:
+                time.sleep(backoff_delay(attempt))
+                continue
+            if feedback.get("throttled"):
+                if attempt == self.max_retries:
+                    return response
+                # The limiter holds every request to the host for Retry-After;
+                # without one back off on our own
+                if feedback["retry_after"] is None:
+                    time.sleep(backoff_delay(attempt))
+                continue
+            return response
+
+    def hedged(self, client, call):
+        """Run call(); if it is slower than the client's hedge delay, race a duplicate"""
+        with self._lock:
+            client.calls += 1
+        delay = client.hedge_delay()
+        if delay is None:
+            return call()
+        with self._lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="wiki-hedge")
+            pool = self._hedge_pool
+
+        primary = pool.submit(call)
+        done, _ = wait([primary], timeout=delay)
+        with self._lock:
+            allowed = not done and client.hedges < max(1, HEDGE_BUDGET * client.calls)
+            if allowed:
+                client.hedges += 1
+        if not allowed:
+            return primary.result()
+
+        def duplicate():
+            # A duplicate queued behind busy hedge threads may only start once
+            # the primary has answered; it is not sent then
+            if primary.done() and primary.exception() is None:
+                raise CancelledError()
+            return call()
+
+        pending = {primary, pool.submit(duplicate)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                # The loser cannot be interrupted; its answer is dropped
+                for other in pending:
+                    other.cancel()
+                if future is not primary:
+                    with self._lock:
+                        client.hedge_wins += 1
+                return result
+        raise error
+
+    def language_stats(self):
+        """Tail latency percentiles, hedging and circuit state per language"""
+        with self._lock:
+            clients = dict(self._clients)
+        return {
+            key if isinstance(key, str) else f"{client.language} ({client.base_url})": client.stats()
+            for key, client in clients.items()
+        }
+
+    def is_degraded(self, language):
+        """True while the language's circuit breaker is failing fast"""
+        return self.client(language).breaker.is_open()
+
+    def rate_stats(self):
+        """Current adaptive rate, concurrency window and observed throughput per host"""
+        return self.limiters.stats()
+
+    def client(self, language, base_url=None):
+        """Return the shared client for a Wikipedia language, creating it on first use
+
+        base_url (a template like DEFAULT_BASE_URL) points the client at another
+        site with the same APIs, e.g. a local stand-in server, instead of the transport's.
+        """
+        key = language if base_url is None else (language, base_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = WikiClient(self, language, base_url or self.base_url)
+            return client
+
+    def connection_stats(self):
+        """Report requests vs. opened connections, overall and per host"""
+        hosts = {}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts[pool.host] = {
+                "requests": pool.num_requests,
+                "connections": pool.num_connections,
+                "reused": max(0, pool.num_requests - pool.num_connections),
+            }
+        total_requests = sum(h["requests"] for h in hosts.values())
+        total_connections = sum(h["connections"] for h in hosts.values())
+        with self._lock:
+            issued = self._requests
+        return {
+            "requests_issued": issued,
+            "requests": total_requests,
+            "connections": total_connections,
+            "reused": max(0, total_requests - total_connections),
+            "reuse_ratio": (1 - total_connections / total_requests) if total_requests else 0.0,
+            "hosts": hosts,
+        }
+
+    def close(self):
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def configure_transport(**options):
+    """Replace the shared transport with one built from options (e.g. a bigger pool for batch runs)"""
+    global _transport
+    with _transport_lock:
+        if _transport is not None:
+            _transport.close()
+        _transport = WikiTransport(**options)
+        return _transport
+
+
+def get_transport():
+    """Return the process-wide shared transport, creating it on first use"""
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            _transport = WikiTransport()
+        return _transport
+
+
+def get_client(language, base_url=None):
+    return get_transport().client(language, base_url)
@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+from wiki_stats import LatencyReservoir
+
+# Upper bounds (seconds) of the histogram buckets of every phase, from a warm
+# cache hit to a request that ran into the slow-network timeout
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Samples kept per phase and language for the JSON percentiles
+RESERVOIR_SIZE = 512
+# File that receives one JSON line per finished fetch (the --metrics-log option)
+DEFAULT_LOG_PATH = os.environ.get("WIKI_METRICS_LOG")
+
+# Phases of an article fetch, in the order they usually run
+TITLE = "title"            # drawing a random title (API rnlimit batch, title index or dump)
+CACHE = "cache"            # local cache lookup
+REVALIDATE = "revalidate"  # conditional request for an expired cached article
+INTRO = "intro"            # title and summary for the first paint
+ARTICLE = "article"        # full article (extract, sections and categories)
+EXTRACT = "extract"        # wikipediaapi page() summary and sections (fallback path)
+CATEGORIES = "categories"  # separate categories request (REST and wikipediaapi paths)
+RENDER = "render"          # building the HTML snapshot off the GUI thread
+DISPLAY = "display"        # handing the HTML to the widgets on the GUI thread
+FETCH = "fetch"            # the whole fetch, from request to last paint
+
+
+# Prometheus-style cumulative histogram of one phase in one language, plus a
+# reservoir of samples for percentiles
+class PhaseHistogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.reservoir = LatencyReservoir(RESERVOIR_SIZE)
+
+    def add(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.reservoir.add(seconds)
+
+    def cumulative(self):
+        total, buckets = 0, []
+        for bound, count in zip(BUCKETS, self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+
+# Timeline of one fetch: every phase as (phase, start offset, duration,
+# detail) relative to when the fetch started
+class FetchTrace:
+    def __init__(self, language):
+        self.language = language
+        self.started = time.perf_counter()
+        self.wall_time = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, phase, start, duration, detail=None):
+        with self._lock:
+            self.spans.append((phase, start - self.started, duration, detail))
+
+    def total(self):
+        with self._lock:
+            return max((start + duration for _, start, duration, _ in self.spans), default=0.0)
+
+    def to_json(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span[1])
+        return {
+            "time": round(self.wall_time, 3),
+            "language": self.language,
+            "total_ms": round(self.total() * 1000, 2),
+            "phases": [
+                {
+                    "phase": phase,
+                    "start_ms": round(start * 1000, 2),
+                    "duration_ms": round(duration * 1000, 2),
+                    "detail": detail,
+                }
+                for phase, start, duration, detail in spans
+            ],
+        }
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+# Per-phase latency histograms per language, the last finished fetch and an
+# optional JSON-lines log of every fetch
+class PhaseMetrics:
+    def __init__(self, log_path=DEFAULT_LOG_PATH):
+        self._histograms = {}  # (phase, language) -> PhaseHistogram
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_trace = None
+        self._log = None
+        self._log_lock = threading.Lock()
+        if log_path:
+            self.set_log(log_path)
+
+    def set_log(self, path):
+        """Append one JSON line per finished fetch to path (None stops logging)"""
+        with self._log_lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            if path:
+                try:
+                    self._log = open(path, "a", encoding="utf-8", buffering=1)
+                except OSError as e:
+                    print(f"Error opening metrics log {path}: {e}", file=sys.stderr)
+
+    def record(self, phase, language, seconds, start=None, detail=None, trace=None):
+        """Add a phase duration to its histogram and to the current (or given) trace"""
+        self._add(phase, language, seconds)
+        trace = trace or self.current_trace()
+        if trace is not None:
+            trace.add(phase, time.perf_counter() - seconds if start is None else start, seconds, detail)
+
+    @contextmanager
+    def phase(self, phase, language, detail=None, trace=None):
+        """Time the body of a with-statement as one phase"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, language, time.perf_counter() - start, start, detail, trace)
+
+    def current_trace(self):
+        return getattr(self._local, "trace", None)
+
+    @contextmanager
+    def attach(self, trace):
+        """Record the phases run by this thread into trace while the body runs"""
+        previous = self.current_trace()
+        self._local.trace = trace
+        try:
+            yield trace
+        finally:
+            self._local.trace = previous
+
+    @contextmanager
+    def trace(self, language):
+        """Trace a whole fetch run by this thread and finish it afterwards, also when it fails"""
+        trace = FetchTrace(language)
+        try:
+            with self.attach(trace):
+                yield trace
+        finally:
+            self.finish(trace)
+
+    def finish(self, trace):
+        """Record the total of a fetch, keep it as the last one and log it"""
+        if not trace.spans:
+            return
+        self._add(FETCH, trace.language, trace.total())
+        self._last_trace = trace
+        with self._log_lock:
+            if self._log is not None:
+                try:
+                    self._log.write(json.dumps(trace.to_json(), ensure_ascii=False) + "\n")
+                except OSError as e:
+                    print(f"Error writing metrics log: {e}", file=sys.stderr)
+
+    def last_trace(self):
+        return self._last_trace
+
+    def _add(self, phase, language, seconds):
+        with self._lock:
+            histogram = self._histograms.get((phase, language))
+            if histogram is None:
+                histogram = self._histograms[(phase, language)] = PhaseHistogram()
+            histogram.add(seconds)
+
+    def to_json(self):
+        """Count, mean and percentiles (ms) per language and phase"""
+        with self._lock:
+            histograms = dict(self._histograms)
+        report = {}
+        for (phase, language), histogram in sorted(histograms.items()):
+            summary = histogram.reservoir.summary()
+            report.setdefault(language, {})[phase] = {
+                "count": summary["count"],
+                "mean_ms": round(summary["mean"] * 1000, 2),
+                "p50_ms": round(summary["p50"] * 1000, 2),
+                "p90_ms": round(summary["p90"] * 1000, 2),
+                "p99_ms": round(summary["p99"] * 1000, 2),
+                "max_ms": round(summary["max"] * 1000, 2),
+            }
+        return report
+
+    def prometheus_text(self):
+        """All histograms in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = dict(self._histograms)
+        lines = [
+            "# HELP wiki_phase_seconds Time spent in each phase of an article fetch.",
+            "# TYPE wiki_phase_seconds histogram",
+        ]
+        for (phase, language), histogram in sorted(histograms.items()):
+            labels = f'phase="{_label(phase)}",language="{_label(language)}"'
+            for bound, count in histogram.cumulative():
+                lines.append(f'wiki_phase_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            reservoir = histogram.reservoir
+            lines.append(f'wiki_phase_seconds_bucket{{{labels},le="+Inf"}} {reservoir.count}')
+            lines.append(f"wiki_phase_seconds_sum{{{labels}}} {reservoir.total:.6f}")
+            lines.append(f"wiki_phase_seconds_count{{{labels}}} {reservoir.count}")
+        return "\n".join(lines) + "\n"
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the process-wide phase metrics"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = PhaseMetrics()
+        return _metrics
+
+
+def phase(name, language, detail=None, trace=None):
+    return get_metrics().phase(name, language, detail, trace)
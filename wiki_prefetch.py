@@ -0,0 +1,98 @@
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from random_wiki_article import get_random_article_titles, fetch_article
+from wiki_snapshot import ArticleSnapshot
+from wiki_metrics import get_metrics, phase, RENDER
+
+# Default number of ready articles kept per Wikipedia language
+DEFAULT_DEPTH = 3
+# Default number of articles fetched in parallel while refilling
+DEFAULT_CONCURRENCY = 2
+
+
+# Keeps a few fully fetched random articles per language warm in the
+# background, so that showing a new article does not wait on the network.
+# Articles are stored as pre-rendered ArticleSnapshot objects.
+class ArticlePrefetcher:
+    def __init__(self, user_agent, depth=DEFAULT_DEPTH, concurrency=DEFAULT_CONCURRENCY):
+        self.user_agent = user_agent
+        self.depth = max(0, int(depth))
+        self.concurrency = max(1, int(concurrency))
+        self._lock = threading.Lock()
+        self._ready = {}      # language -> deque of ArticleSnapshot
+        self._titles = {}     # language -> deque of titles not fetched yet
+        self._in_flight = {}  # language -> number of running refill jobs
+        self._title_locks = {}  # language -> lock serialising title batches
+        self._closed = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="prefetch"
+        )
+
+    def pop(self, language):
+        """Return a ready article for the language (or None) and top the pool up"""
+        with self._lock:
+            ready = self._ready.get(language)
+            article = ready.popleft() if ready else None
+        self.warm(language)
+        return article
+
+    def ready_count(self, language):
+        with self._lock:
+            return len(self._ready.get(language, ()))
+
+    def warm(self, language):
+        """Schedule enough refill jobs to bring the language back to full depth"""
+        with self._lock:
+            if self._closed:
+                return
+            ready = len(self._ready.setdefault(language, deque()))
+            in_flight = self._in_flight.get(language, 0)
+            missing = self.depth - ready - in_flight
+            if missing <= 0:
+                return
+            self._in_flight[language] = in_flight + missing
+        for _ in range(missing):
+            self._executor.submit(self._refill_one, language)
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _next_title(self, language):
+        with self._lock:
+            title_lock = self._title_locks.setdefault(language, threading.Lock())
+        # Concurrent refill jobs wait for one shared batch instead of each
+        # requesting their own
+        with title_lock:
+            with self._lock:
+                titles = self._titles.setdefault(language, deque())
+                if titles:
+                    return titles.popleft()
+            # One rnlimit batch covers the whole pool instead of a request per title
+            batch = get_random_article_titles(language, limit=self.depth)
+            if not batch:
+                return None
+            with self._lock:
+                self._titles[language].extend(batch[1:])
+            return batch[0]
+
+    def _refill_one(self, language):
+        try:
+            with get_metrics().trace(language):
+                title = self._next_title(language)
+                article = fetch_article(title, self.user_agent, language) if title else None
+                if article:
+                    with phase(RENDER, language):
+                        article = ArticleSnapshot.from_article(language, article)
+        except Exception as e:
+            if not self._closed:  # Jobs cut short by shutdown are not errors
+                print(f"Error prefetching article: {e}", file=sys.stderr)
+            article = None
+        with self._lock:
+            self._in_flight[language] -= 1
+            if article and not self._closed:
+                self._ready.setdefault(language, deque()).append(article)
@@ -0,0 +1,243 @@
+import re
+from urllib.parse import quote
+
+from wiki_http import get_client
+
+# Section headings inside a plain-text extract requested with exsectionformat=wiki,
+# e.g. "\n\n== History ==\n" (same pattern wikipediaapi uses for ExtractFormat.WIKI)
+RE_SECTION = re.compile(r"\n\n *(==+) (.*?) (==+) *\n")
+
+# Hard cap on continuation rounds for pages with a very long category list
+MAX_CONTINUATIONS = 5
+# Continuation keys that mean a page's props are incomplete. The random
+# generator always returns its own "grncontinue", which must not be followed.
+PROP_CONTINUE_KEYS = ("clcontinue", "excontinue")
+# Titles per prop=info request when revalidating cached articles (API limit)
+REVALIDATE_BATCH = 50
+
+
+# Plain section object exposing the same attributes as wikipediaapi's
+# WikipediaPageSection (title, level, text, sections), so existing display
+# code can render either one.
+class WikiSection:
+    def __init__(self, title, level, text=""):
+        self.title = title
+        self.level = level
+        self.text = text
+        self.sections = []
+
+    def __repr__(self):
+        return f"WikiSection({self.title!r}, level={self.level}, subsections={len(self.sections)})"
+
+
+def parse_extract(extract):
+    """Split a wiki-formatted plain-text extract into its summary and section tree"""
+    summary = None
+    sections = []
+    stack = []  # open sections, outermost first
+    section = None
+    prev_pos = 0
+
+    for match in RE_SECTION.finditer(extract):
+        if summary is None:
+            summary = extract[:match.start()].strip()
+        elif section is not None:
+            section.text = extract[prev_pos:match.start()].strip()
+
+        level = len(match.group(1)) - 1
+        section = WikiSection(match.group(2).strip(), level)
+
+        # Close every open section at the same or a deeper level
+        while stack and stack[-1].level >= level:
+            stack.pop()
+        (stack[-1].sections if stack else sections).append(section)
+        stack.append(section)
+        prev_pos = match.end()
+
+    # Pages without sections only have a summary
+    if summary is None:
+        summary = extract.strip()
+    elif section is not None:
+        section.text = extract[prev_pos:].strip()
+
+    return summary, sections
+
+
+# Parameters for one query returning the extract, categories and page info
+# together, instead of separate extract and categories requests.
+def combined_query_params(**selector):
+    params = {
+        "action": "query",
+        "prop": "extracts|categories|info",
+        "explaintext": 1,
+        "exsectionformat": "wiki",
+        "cllimit": "max",
+        "redirects": 1,
+        "format": "json",
+        "formatversion": 2,
+    }
+    params.update(selector)
+    return params
+
+
+def parse_query_page(page):
+    """Turn one page entry of a combined query into an article payload (None if missing)"""
+    if page.get("missing") or page.get("invalid") or "extract" not in page:
+        return None
+    summary, sections = parse_extract(page["extract"])
+    categories = {c["title"]: c for c in page.get("categories", [])}
+    return {
+        "title": page["title"],
+        "summary": summary,
+        "sections": sections,
+        "categories": categories,
+        "pageid": page.get("pageid"),
+        "lastrevid": page.get("lastrevid"),
+    }
+
+
+def run_combined_query(language, user_agent, params, timeout=None, base_url=None):
+    """Run a combined query, following category continuation, and return its pages"""
+    client = get_client(language, base_url)
+    headers = {"User-Agent": user_agent}
+    pages = {}
+    request_params = dict(params)
+
+    for _ in range(MAX_CONTINUATIONS + 1):
+        data = client.query(request_params, headers=headers, timeout=timeout)
+        for page in data.get("query", {}).get("pages", []):
+            key = page.get("pageid") or page["title"]
+            known = pages.get(key)
+            if known is None:
+                pages[key] = page
+            else:
+                # Continuation rounds only carry the next batch of categories
+                known.setdefault("categories", []).extend(page.get("categories", []))
+        if not any(key in data.get("continue", {}) for key in PROP_CONTINUE_KEYS):
+            break
+        request_params = dict(params)
+        request_params.update(data["continue"])
+
+    return list(pages.values())
+
+
+# Fetch one random article (title, summary, sections, categories) in a single
+# round trip using the random generator.
+def fetch_random_article_combined(user_agent, language='en', timeout=None, base_url=None):
+    params = combined_query_params(generator="random", grnnamespace=0, grnlimit=1)
+    for page in run_combined_query(language, user_agent, params, timeout=timeout, base_url=base_url):
+        article = parse_query_page(page)
+        if article:
+            return article
+    return None
+
+
+# Fetch only the title, lead section and page info of a random article. The
+# response is small, so callers can show something before the full extract.
+def fetch_random_intro_combined(user_agent, language='en', timeout=None, base_url=None):
+    params = intro_query_params(generator="random", grnnamespace=0, grnlimit=1)
+    return run_intro_query(language, user_agent, params, timeout, base_url)
+
+
+# Same as fetch_random_intro_combined() for a title picked by the caller,
+# e.g. drawn from the local title index
+def fetch_intro_combined(title, user_agent, language='en', timeout=None, base_url=None):
+    return run_intro_query(language, user_agent, intro_query_params(titles=title, redirects=1), timeout, base_url)
+
+
+def intro_query_params(**selector):
+    params = {
+        "action": "query",
+        "prop": "extracts|info",
+        "exintro": 1,
+        "explaintext": 1,
+        "format": "json",
+        "formatversion": 2,
+    }
+    params.update(selector)
+    return params
+
+
+def run_intro_query(language, user_agent, params, timeout=None, base_url=None):
+    data = get_client(language, base_url).query(params, headers={"User-Agent": user_agent}, timeout=timeout)
+    for page in data.get("query", {}).get("pages", []):
+        if "extract" in page:
+            return {
+                "title": page["title"],
+                "summary": page["extract"].strip(),
+                "pageid": page.get("pageid"),
+                "lastrevid": page.get("lastrevid"),
+            }
+    return None
+
+
+# Fetch a known article by title in a single round trip
+def fetch_article_combined(title, user_agent, language='en', timeout=None, base_url=None):
+    params = combined_query_params(titles=title)
+    for page in run_combined_query(language, user_agent, params, timeout=timeout, base_url=base_url):
+        return parse_query_page(page)
+    return None
+
+
+# Current revision id of up to REVALIDATE_BATCH titles in one small prop=info
+# query, keyed by the requested titles (None for missing pages). Lets cached
+# articles be checked without downloading their extracts again.
+def fetch_revisions(titles, user_agent, language='en', timeout=None):
+    params = {
+        "action": "query",
+        "prop": "info",
+        "titles": "|".join(titles),
+        "redirects": 1,
+        "format": "json",
+        "formatversion": 2,
+    }
+    data = get_client(language).query(params, headers={"User-Agent": user_agent}, timeout=timeout)
+    query = data.get("query", {})
+    aliases = {item["from"]: item["to"] for key in ("normalized", "redirects") for item in query.get(key, [])}
+    current = {page["title"]: page.get("lastrevid") for page in query.get("pages", []) if not page.get("missing")}
+    revisions = {}
+    for title in titles:
+        # Normalisation first, then a redirect
+        resolved = aliases.get(title, title)
+        resolved = aliases.get(resolved, resolved)
+        revisions[title] = current.get(resolved)
+    return revisions
+
+
+# Titles of the same article in other editions, from one prop=langlinks
+# query: {language: title}. Empty when the page is missing or unlinked.
+def fetch_langlinks(title, user_agent, language='en', timeout=None):
+    params = {
+        "action": "query",
+        "prop": "langlinks",
+        "titles": title,
+        "lllimit": "max",
+        "redirects": 1,
+        "format": "json",
+        "formatversion": 2,
+    }
+    links = {}
+    for _ in range(MAX_CONTINUATIONS + 1):
+        data = get_client(language).query(params, headers={"User-Agent": user_agent}, timeout=timeout)
+        for page in data.get("query", {}).get("pages", []):
+            links.update((link["lang"], link["title"]) for link in page.get("langlinks", []))
+        if "llcontinue" not in data.get("continue", {}):
+            break
+        params = dict(params, **data["continue"])
+    return links
+
+
+# Conditional request for the latest revision of a title via the REST API.
+# With the ETag of an earlier answer the server replies 304 Not Modified and
+# no body while the page is unchanged. Returns (modified, revid, etag).
+def fetch_rest_revision(title, user_agent, language='en', etag=None, timeout=None):
+    headers = {"User-Agent": user_agent}
+    if etag:
+        headers["If-None-Match"] = etag
+    path = "/page/title/" + quote(title.replace(" ", "_"), safe="")
+    response = get_client(language).rest(path, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return False, None, etag
+    response.raise_for_status()
+    items = response.json().get("items") or [{}]
+    return True, items[0].get("rev"), response.headers.get("ETag")
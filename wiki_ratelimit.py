@@ -0,0 +1,181 @@
+import time
+import random
+import threading
+import statistics
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+# Starting point of every host limiter; both adapt from here
+INITIAL_RATE = 10.0         # requests per second
+INITIAL_CONCURRENCY = 4.0   # requests in flight
+# Bounds for the adaptive values
+MIN_RATE = 0.5
+MAX_RATE = 200.0
+MIN_CONCURRENCY = 1.0
+MAX_CONCURRENCY = 32.0
+# Additive increase per second of successful traffic (rate) / per window (concurrency)
+RATE_STEP = 5.0
+# Until the first throttling or congestion (slow start), every success
+# multiplies the rate by this factor and widens the window by one request
+SLOW_START_FACTOR = 1.2
+# Multiplicative decrease on HTTP 429/503 or maxlag, and on latency well above the baseline
+THROTTLE_FACTOR = 0.5
+CONGESTION_FACTOR = 0.85
+# A response slower than this multiple of the recent median counts as congestion
+LATENCY_TOLERANCE = 4.0
+# Recent successful responses whose median latency is the baseline, and the
+# number needed before latency is judged at all
+LATENCY_WINDOW = 64
+MIN_LATENCY_SAMPLES = 16
+# Seconds over which the observed throughput is measured
+THROUGHPUT_WINDOW = 10.0
+# Jittered exponential backoff between retries
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 30.0
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """Full-jitter exponential backoff for the given retry attempt (0 = first retry)"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def parse_retry_after(value):
+    """Seconds to wait according to a Retry-After header (delta seconds or HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Token bucket plus AIMD concurrency window for one host. acquire() blocks
+# until a token and a concurrency slot are free; release() feeds back the
+# outcome: fast successes raise rate and window (steeply during slow start,
+# then additively), throttling (429/503/maxlag) and congestion (latency far
+# above the recent median) lower them multiplicatively. A Retry-After
+# pauses the whole host.
+class HostLimiter:
+    def __init__(self, host, rate=INITIAL_RATE, concurrency=INITIAL_CONCURRENCY):
+        self.host = host
+        self.rate = float(rate)
+        self.concurrency = float(concurrency)
+        self.in_flight = 0
+        self.throttled = 0
+        self.congested = 0
+        self.blocked_until = 0.0
+        # A full bucket: the first second of requests is not held back
+        self._tokens = max(1.0, self.rate)
+        self._updated = time.monotonic()
+        self._slow_start = True
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._completed = deque()
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    timeout = self.blocked_until - now
+                elif self.in_flight >= max(1, int(self.concurrency)):
+                    timeout = None  # woken by release()
+                elif self._tokens < 1:
+                    timeout = (1 - self._tokens) / self.rate
+                else:
+                    self._tokens -= 1
+                    self.in_flight += 1
+                    return
+                self._cond.wait(timeout)
+
+    def release(self, latency=None, throttled=False, retry_after=None):
+        """Report the outcome of a request started with acquire()"""
+        with self._cond:
+            now = time.monotonic()
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self._decrease(THROTTLE_FACTOR)
+                if retry_after:
+                    self.blocked_until = max(self.blocked_until, now + retry_after)
+            elif latency is not None:
+                self._record_success(now, latency)
+            self._cond.notify_all()
+
+    def pause(self, seconds):
+        """Hold back every request to this host for the given time (e.g. maxlag)"""
+        with self._cond:
+            self.throttled += 1
+            self._decrease(THROTTLE_FACTOR)
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def stats(self):
+        with self._cond:
+            now = time.monotonic()
+            self._prune(now)
+            return {
+                "rate": round(self.rate, 2),
+                "concurrency": round(self.concurrency, 2),
+                "in_flight": self.in_flight,
+                "throughput": round(len(self._completed) / THROUGHPUT_WINDOW, 2),
+                "throttled": self.throttled,
+                "congested": self.congested,
+                "paused_for": round(max(0.0, self.blocked_until - now), 2),
+            }
+
+    def _refill(self, now):
+        # Allow bursts of up to one second worth of requests
+        self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _record_success(self, now, latency):
+        self._completed.append(now)
+        self._prune(now)
+        # Baseline: median of the recent responses, so ordinary jitter is not congestion
+        latencies = self._latencies
+        congested = (
+            len(latencies) >= MIN_LATENCY_SAMPLES and latency > LATENCY_TOLERANCE * statistics.median(latencies)
+        )
+        latencies.append(latency)
+        if congested:
+            self.congested += 1
+            self._decrease(CONGESTION_FACTOR)
+        elif self._slow_start:
+            self.rate = min(MAX_RATE, self.rate * SLOW_START_FACTOR)
+            self.concurrency = min(MAX_CONCURRENCY, self.concurrency + 1)
+        else:
+            self.rate = min(MAX_RATE, self.rate + RATE_STEP / self.rate)
+            self.concurrency = min(MAX_CONCURRENCY, self.concurrency + 1 / self.concurrency)
+
+    def _decrease(self, factor):
+        self._slow_start = False
+        self.rate = max(MIN_RATE, self.rate * factor)
+        self.concurrency = max(MIN_CONCURRENCY, self.concurrency * factor)
+
+    def _prune(self, now):
+        while self._completed and self._completed[0] < now - THROUGHPUT_WINDOW:
+            self._completed.popleft()
+
+
+# One HostLimiter per host, created on first use
+class RateLimiterRegistry:
+    def __init__(self):
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host):
+        with self._lock:
+            limiter = self._limiters.get(host)
+            if limiter is None:
+                limiter = self._limiters[host] = HostLimiter(host)
+            return limiter
+
+    def stats(self):
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.host: limiter.stats() for limiter in limiters}
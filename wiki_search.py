@@ -0,0 +1,221 @@
+import os
+import re
+import sys
+import queue
+import atexit
+import sqlite3
+import threading
+
+# Results returned by a search unless asked otherwise
+DEFAULT_LIMIT = 20
+# Most articles written per transaction by the indexing thread
+WRITE_BATCH = 256
+# bm25 weights of the title, summary, body and categories columns
+WEIGHTS = (50.0, 5.0, 1.0, 3.0)
+# The word being typed is matched as a prefix once it has this many characters
+MIN_PREFIX = 2
+# Queries matching more articles than this (short prefixes while typing) list
+# the newest matches, titles first, instead of ranking all of them
+RANKED_MATCHES = 2000
+# Words around the match shown in a snippet
+SNIPPET_TOKENS = 12
+# Default snippet highlight marks; callers turn them into markup of their own
+MARKS = ("\x02", "\x03")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    language TEXT NOT NULL,
+    title TEXT NOT NULL,
+    revid INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (language, title)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS fts USING fts5(
+    title, summary, body, categories,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+"""
+RE_WORD = re.compile(r"\w+")
+
+
+def default_search_path():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "wiki_reflection_tool", "search.sqlite3")
+
+
+def section_text(sections):
+    parts = []
+    for section in sections:
+        parts.append(section.title)
+        parts.append(section.text)
+        parts.append(section_text(section.sections))
+    return "\n".join(part for part in parts if part)
+
+
+def match_query(text):
+    """FTS5 query for what a user typed: every word must occur, the last one as a prefix
+    while it is still being typed. None if there is nothing to search for."""
+    words = RE_WORD.findall(text.lower())
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    if not text[-1:].isspace() and len(words[-1]) >= MIN_PREFIX:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+# On-disk SQLite FTS5 index of every article fetched, in every language:
+# titles, summaries, section text and categories. Articles are queued and
+# written by a background thread in batched transactions, so indexing never
+# delays a fetch; an article already indexed at the same revision is skipped.
+# Searches read through their own connection (WAL), so they do not wait for
+# writes either.
+class SearchIndex:
+    def __init__(self, path=None):
+        self.path = path or default_search_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._writer = self._connect()
+        self._writer.executescript(SCHEMA)
+        self._reader = self._connect() if self.path != ":memory:" else self._writer
+        self._read_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def add(self, language, article):
+        """Queue an article payload (see random_wiki_article.fetch_article) for indexing"""
+        self._queue.put((language, article))
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="search-index", daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Wait until every queued article is written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def search(self, text, language=None, limit=DEFAULT_LIMIT, marks=MARKS):
+        """Best matches for the typed text as {"language", "title", "snippet"} dicts"""
+        query = match_query(text)
+        if query is None:
+            return []
+        try:
+            with self._read_lock:
+                broad = self._reader.execute(
+                    "SELECT COUNT(*) FROM (SELECT rowid FROM fts WHERE fts MATCH ? LIMIT ?)",
+                    (query, RANKED_MATCHES + 1),
+                ).fetchone()[0] > RANKED_MATCHES
+                if not broad:
+                    order = f"bm25(fts, {', '.join(map(str, WEIGHTS))})"
+                    rows = self._select(query, language, order, limit, marks)
+                else:
+                    # Ranking every match would take too long; newest first is cheap
+                    rows = self._select(f"{{title}} : ({query})", language, "fts.rowid DESC", limit, marks)
+                    if len(rows) < limit:
+                        found = {row[0] for row in rows}
+                        more = self._select(query, language, "fts.rowid DESC", limit + len(rows), marks)
+                        rows += [row for row in more if row[0] not in found][:limit - len(rows)]
+        except sqlite3.OperationalError as e:
+            print(f"Error searching for {text!r}: {e}", file=sys.stderr)
+            return []
+        return [{"language": lang, "title": title, "snippet": snippet} for _, lang, title, snippet in rows]
+
+    def _select(self, query, language, order, limit, marks):
+        sql = (
+            "SELECT docs.id, docs.language, docs.title, snippet(fts, -1, ?, ?, '…', ?) "
+            "FROM fts JOIN docs ON docs.id = fts.rowid WHERE fts MATCH ?"
+        )
+        args = [marks[0], marks[1], SNIPPET_TOKENS, query]
+        if language:
+            sql += " AND docs.language = ?"
+            args.append(language)
+        sql += f" ORDER BY {order} LIMIT ?"
+        args.append(limit)
+        return self._reader.execute(sql, args).fetchall()
+
+    def stats(self):
+        with self._read_lock:
+            count = self._reader.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return {"articles": count, "bytes": size, "pending": self._queue.qsize()}
+
+    def close(self):
+        self.flush()
+        if self._reader is not self._writer:
+            self._reader.close()
+        self._writer.close()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                # Anything uncaught would end the thread, and flush() would then wait forever
+                print(f"Error indexing articles for search: {e}", file=sys.stderr)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        db = self._writer
+        db.execute("BEGIN")
+        try:
+            for language, article in batch:
+                title = article["title"]
+                revid = article.get("lastrevid") or 0
+                row = db.execute("SELECT id, revid FROM docs WHERE language = ? AND title = ?", (language, title)).fetchone()
+                if row is not None and revid and row[1] == revid:
+                    continue  # already indexed at this revision
+                if row is not None:
+                    doc_id = row[0]
+                    db.execute("DELETE FROM fts WHERE rowid = ?", (doc_id,))
+                    db.execute("UPDATE docs SET revid = ? WHERE id = ?", (revid, doc_id))
+                else:
+                    doc_id = db.execute(
+                        "INSERT INTO docs (language, title, revid) VALUES (?, ?, ?)", (language, title, revid)
+                    ).lastrowid
+                categories = "\n".join(c.split(":", 1)[-1] for c in article["categories"])
+                db.execute(
+                    "INSERT INTO fts (rowid, title, summary, body, categories) VALUES (?, ?, ?, ?, ?)",
+                    (doc_id, title, article["summary"], section_text(article["sections"]), categories),
+                )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index():
+    """Return the process-wide search index, opening it on first use"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex()
+        return _index
+
+
+@atexit.register
+def flush_search_index():
+    with _index_lock:
+        index = _index
+    if index is not None:
+        index.flush()
@@ -0,0 +1,114 @@
+from PyQt6.QtCore import Qt, QAbstractItemModel, QModelIndex
+from PyQt6.QtGui import QFont
+
+# Characters of section text shown on the one-line body row of the outline
+BODY_PREVIEW_CHARS = 160
+
+# Role returning the SectionSnapshot behind an index (also for body rows)
+SectionRole = Qt.ItemDataRole.UserRole + 1
+
+
+# Tree node wrapping one section (or the body text row of a section). Child
+# nodes are only created when Qt first asks for them, i.e. when a section is
+# expanded, so huge articles cost nothing until they are browsed.
+class _Node:
+    __slots__ = ("section", "parent", "row", "is_body", "_children")
+
+    def __init__(self, section, parent, row, is_body=False):
+        self.section = section
+        self.parent = parent
+        self.row = row
+        self.is_body = is_body
+        self._children = None
+
+    def child_count(self):
+        if self.is_body:
+            return 0
+        return (1 if self.section.text else 0) + len(self.section.sections)
+
+    def children(self):
+        if self._children is None:
+            children = []
+            if self.section.text:
+                children.append(_Node(self.section, self, 0, is_body=True))
+            offset = len(children)
+            children.extend(
+                _Node(s, self, offset + i) for i, s in enumerate(self.section.sections)
+            )
+            self._children = children
+        return self._children
+
+
+# Outline model over an article's SectionSnapshot tree, for a QTreeView.
+# Each section shows its title; its first child row (when it has text) is a
+# short preview of the body, followed by the subsections. Only rows that are
+# on screen are ever asked for their data.
+class SectionTreeModel(QAbstractItemModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._roots = []
+        self._title_font = None
+
+    def set_sections(self, sections):
+        self.beginResetModel()
+        self._roots = [_Node(s, None, i) for i, s in enumerate(sections)]
+        self.endResetModel()
+
+    def append_sections(self, sections):
+        """Add top-level sections at the end, e.g. while an article is streamed in"""
+        if not sections:
+            return
+        first = len(self._roots)
+        self.beginInsertRows(QModelIndex(), first, first + len(sections) - 1)
+        self._roots.extend(_Node(s, None, first + i) for i, s in enumerate(sections))
+        self.endInsertRows()
+
+    def clear(self):
+        self.set_sections(())
+
+    def section_at(self, index):
+        return index.internalPointer().section if index.isValid() else None
+
+    def index(self, row, column, parent=QModelIndex()):
+        if column != 0:
+            return QModelIndex()
+        siblings = parent.internalPointer().children() if parent.isValid() else self._roots
+        if not 0 <= row < len(siblings):
+            return QModelIndex()
+        return self.createIndex(row, 0, siblings[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        node = index.internalPointer().parent
+        if node is None:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        if not parent.isValid():
+            return len(self._roots)
+        return parent.internalPointer().child_count()
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if node.is_body:
+                preview = " ".join(node.section.text[:BODY_PREVIEW_CHARS].split())
+                return preview + ("..." if len(node.section.text) > BODY_PREVIEW_CHARS else "")
+            return node.section.title
+        if role == Qt.ItemDataRole.FontRole and not node.is_body:
+            if self._title_font is None:
+                self._title_font = QFont()
+                self._title_font.setBold(True)
+            return self._title_font
+        if role == SectionRole:
+            return node.section
+        return None
@@ -0,0 +1,200 @@
+import os
+import sys
+import math
+import atexit
+import struct
+import hashlib
+import threading
+
+# First filter of a scalable Bloom filter: titles it holds before a new one is added
+INITIAL_CAPACITY = 10000
+# Target false positive rate of the first filter
+ERROR_RATE = 0.001
+# Each new filter holds GROWTH times more titles at TIGHTENING times the error
+# rate, so the compound rate stays below ERROR_RATE / (1 - TIGHTENING)
+GROWTH = 2
+TIGHTENING = 0.5
+# Titles added between saves to disk (and on exit)
+SAVE_EVERY = 256
+
+MAGIC = b"WSEEN001"
+FILE_HEADER = struct.Struct("<8sI")        # magic, number of filters
+FILTER_HEADER = struct.Struct("<QdQQI")   # capacity, error rate, count, bits, hashes
+
+
+def default_seen_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "wiki_reflection_tool", "seen")
+
+
+def _hashes(key):
+    # Two independent 64-bit hashes; the k probe positions are h1 + i * h2
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    return struct.unpack("<QQ", digest)
+
+
+# Fixed-size Bloom filter sized for `capacity` keys at `error_rate`
+class BloomFilter:
+    def __init__(self, capacity, error_rate, bits=None, count=0, size=None, hashes=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = size or max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = hashes or max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def _positions(self, key):
+        h1, h2 = _hashes(key)
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key):
+        for p in self._positions(key):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def false_positive_rate(self):
+        """Estimated probability that an unseen key is reported as seen"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+# Bloom filter that grows by adding ever larger, stricter filters, so it
+# never has to be sized up front and its false positive rate stays bounded
+class ScalableBloomFilter:
+    def __init__(self, filters=None):
+        self.filters = filters or [BloomFilter(INITIAL_CAPACITY, ERROR_RATE)]
+
+    def __contains__(self, key):
+        return any(key in f for f in self.filters)
+
+    def add(self, key):
+        """Add a key; returns False if it was (probably) there already"""
+        if key in self:
+            return False
+        last = self.filters[-1]
+        if last.count >= last.capacity:
+            last = BloomFilter(last.capacity * GROWTH, last.error_rate * TIGHTENING)
+            self.filters.append(last)
+        last.add(key)
+        return True
+
+    @property
+    def count(self):
+        return sum(f.count for f in self.filters)
+
+    @property
+    def nbytes(self):
+        return sum(len(f.bits) for f in self.filters)
+
+    def false_positive_rate(self):
+        rate = 1.0
+        for f in self.filters:
+            rate *= 1 - f.false_positive_rate()
+        return 1 - rate
+
+    def save(self, path):
+        partial = path + ".part"
+        with open(partial, "wb") as out:
+            out.write(FILE_HEADER.pack(MAGIC, len(self.filters)))
+            for f in self.filters:
+                out.write(FILTER_HEADER.pack(f.capacity, f.error_rate, f.count, f.size, f.hashes))
+                out.write(f.bits)
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            magic, count = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a seen-titles file")
+            filters = []
+            for _ in range(count):
+                capacity, error_rate, keys, size, hashes = FILTER_HEADER.unpack(f.read(FILTER_HEADER.size))
+                bits = bytearray(f.read((size + 7) // 8))
+                filters.append(BloomFilter(capacity, error_rate, bits, keys, size, hashes))
+        return cls(filters)
+
+
+# Persistent set of the titles of one language already shown or written out. Backed by
+# a scalable Bloom filter: about 1.8 bytes per title at a 0.1% false positive
+# rate, where a false positive only means an unseen article is skipped.
+class SeenTitles:
+    def __init__(self, language, path=None):
+        self.language = language
+        self.path = path or os.path.join(default_seen_dir(), f"{language}.bloom")
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._filter = None
+        if os.path.exists(self.path):
+            try:
+                self._filter = ScalableBloomFilter.load(self.path)
+            except (OSError, ValueError, struct.error) as e:
+                print(f"Error loading seen titles {self.path}, starting over: {e}", file=sys.stderr)
+        if self._filter is None:
+            self._filter = ScalableBloomFilter()
+
+    def __contains__(self, title):
+        with self._lock:
+            return title in self._filter
+
+    def add(self, title):
+        """Mark a title as seen; returns False if it was seen before"""
+        with self._lock:
+            added = self._filter.add(title)
+            if added:
+                self._unsaved += 1
+                if self._unsaved >= SAVE_EVERY:
+                    self._save()
+            return added
+
+    def save(self):
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+    def stats(self):
+        """Titles held, memory footprint and estimated false positive rate"""
+        with self._lock:
+            return {
+                "titles": self._filter.count,
+                "bytes": self._filter.nbytes,
+                "filters": len(self._filter.filters),
+                "false_positive_rate": self._filter.false_positive_rate(),
+            }
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._filter.save(self.path)
+            self._unsaved = 0
+        except OSError as e:
+            print(f"Error saving seen titles {self.path}: {e}", file=sys.stderr)
+
+
+_seen = {}
+_seen_lock = threading.Lock()
+
+
+def get_seen(language):
+    """The process-wide seen-titles set of a language, loaded on first use"""
+    with _seen_lock:
+        seen = _seen.get(language)
+        if seen is None:
+            seen = _seen[language] = SeenTitles(language)
+        return seen
+
+
+def seen_stats():
+    with _seen_lock:
+        sets = dict(_seen)
+    return {language: seen.stats() for language, seen in sets.items()}
+
+
+@atexit.register
+def save_seen():
+    with _seen_lock:
+        sets = list(_seen.values())
+    for seen in sets:
+        seen.save()
@@ -0,0 +1,276 @@
+import os
+import re
+import sys
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+from random_wiki_article import (
+    fetch_article, fetch_random_article, article_to_json, coalesced_fetches, mark_seen,
+)
+from wiki_http import get_transport, DEFAULT_USER_AGENT
+from wiki_cache import get_cache
+from wiki_backends import get_selector
+from wiki_prefetch import ArticlePrefetcher
+from wiki_seen import seen_stats
+from wiki_metrics import get_metrics
+from wiki_search import get_search_index
+from wiki_snapshot import sections_to_data
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Ready articles kept per language; larger than the GUI's since many clients share it
+DEFAULT_PREFETCH_DEPTH = 8
+DEFAULT_PREFETCH_CONCURRENCY = 4
+# Most articles one /batch request may ask for
+MAX_BATCH = 100
+# Random articles of one /batch request fetched in parallel
+BATCH_CONCURRENCY = 8
+# Editions served unless --languages says otherwise (those of the GUI). The
+# code becomes part of an upstream host name and of local file names, and
+# every edition gets its own client, limiter and prefetch queue, so clients
+# cannot pick one freely.
+DEFAULT_LANGUAGES = ("en", "uk", "de", "fr", "es", "it", "pl", "ru", "ja", "zh", "rm")
+RE_LANGUAGE = re.compile(r"^[a-z][a-z0-9-]{1,15}$")
+
+
+def check_language(language, languages):
+    """Return the language code, or raise ValueError unless it is a well-formed code in languages"""
+    if not RE_LANGUAGE.match(language) or language not in languages:
+        raise ValueError(f"Unknown language {language!r}.")
+    return language
+
+
+def snapshot_to_json(snapshot):
+    return {
+        "language": snapshot.language,
+        "title": snapshot.title,
+        "pageid": snapshot.pageid,
+        "lastrevid": snapshot.lastrevid,
+        "url": snapshot.url,
+        "summary": snapshot.summary,
+        "sections": sections_to_data(snapshot.sections),
+        "categories": list(snapshot.categories),
+    }
+
+
+def wiki_extract(summary, sections):
+    """Rebuild an exsectionformat=wiki plain-text extract from a summary and JSON sections"""
+    parts = [summary]
+
+    def add(sections):
+        for section in sections:
+            marks = "=" * (section["level"] + 1)
+            parts.append(f"\n\n{marks} {section['title']} {marks}\n{section['text']}")
+            add(section["sections"])
+    add(sections)
+    return "".join(parts)
+
+
+def action_api_page(article, intro_only=False):
+    """A JSON article as a formatversion=2 page of a combined extracts|categories|info query"""
+    page = {
+        "pageid": article.get("pageid"),
+        "ns": 0,
+        "title": article["title"],
+        "lastrevid": article.get("lastrevid"),
+    }
+    if intro_only:
+        page["extract"] = article["summary"]
+    else:
+        page["extract"] = wiki_extract(article["summary"], article["sections"])
+        page["categories"] = [{"ns": 14, "title": title} for title in article["categories"]]
+    return page
+
+
+# Headless service sharing one warm fetcher between many local clients: the
+# process-wide article cache, connection pool and rate limiter, plus a
+# prefetch pool of ready random articles per language. Concurrent requests
+# for the same title are coalesced by fetch_article().
+#
+#   GET /random?language=en                  one random article
+#   GET /article?language=en&title=Foo       one article by title
+#   GET /batch?language=en,de&count=20       several random articles
+#   GET /search?q=foo&language=en            full-text search over the articles fetched so far
+#   GET /stats                               cache, connection and backend statistics
+#   GET /metrics                             per-phase latency histograms (Prometheus text format)
+#   GET /<language>/w/api.php?...            action API subset, so another instance can use
+#                                            this one as its "local" backend with
+#                                            WIKI_LOCAL_URL=http://127.0.0.1:8765/{language}
+class WikiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, user_agent=DEFAULT_USER_AGENT,
+                 prefetch_depth=DEFAULT_PREFETCH_DEPTH, prefetch_concurrency=DEFAULT_PREFETCH_CONCURRENCY,
+                 languages=DEFAULT_LANGUAGES):
+        super().__init__(address, WikiRequestHandler)
+        self.user_agent = user_agent
+        self.languages = frozenset(languages)
+        self.prefetcher = ArticlePrefetcher(user_agent, depth=prefetch_depth, concurrency=prefetch_concurrency)
+
+    def random_article(self, language):
+        snapshot = self.prefetcher.pop(language)
+        if snapshot is not None:
+            mark_seen(language, snapshot.title)
+            return snapshot_to_json(snapshot)
+        with get_metrics().trace(language):
+            article = fetch_random_article(self.user_agent, language)
+        if not article:
+            return None
+        mark_seen(language, article["title"])
+        return article_to_json(language, article, 0)
+
+    def article(self, language, title):
+        with get_metrics().trace(language):
+            article = fetch_article(title, self.user_agent, language)
+        return article_to_json(language, article, 0) if article else None
+
+    def stats(self):
+        return {
+            "cache": get_cache().stats(),
+            "connections": get_transport().connection_stats(),
+            "rates": get_transport().rate_stats(),
+            "languages": get_transport().language_stats(),
+            "backends": get_selector().stats(),
+            "coalesced": coalesced_fetches(),
+            "seen": seen_stats(),
+            "search": get_search_index().stats(),
+            "phases": get_metrics().to_json(),
+        }
+
+    def server_close(self):
+        self.prefetcher.shutdown()
+        super().server_close()
+
+
+class WikiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle on, the body
+    # waits for the client's delayed ACK (about 40 ms on Linux)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if url.path == "/random":
+                language = self.language(params.get("language", "en"))
+                self.send_article(self.server.random_article(language), "Could not retrieve a random article.")
+            elif url.path == "/article":
+                language = self.language(params.get("language", "en"))
+                if not params.get("title"):
+                    return self.send_json(400, {"error": "Missing 'title' parameter."})
+                self.send_article(self.server.article(language, params["title"]), f"Article '{params['title']}' not found.")
+            elif url.path == "/batch":
+                self.send_batch(params)
+            elif url.path == "/search":
+                language = params.get("language")
+                if language:
+                    self.language(language)
+                results = get_search_index().search(params.get("q", ""), language, marks=("[", "]"))
+                self.send_json(200, {"query": params.get("q", ""), "results": results})
+            elif url.path == "/stats":
+                self.send_json(200, self.server.stats())
+            elif url.path == "/metrics":
+                self.send_text(200, get_metrics().prometheus_text(), "text/plain; version=0.0.4; charset=utf-8")
+            elif url.path.endswith("/w/api.php") and url.path.count("/") == 3:
+                self.send_action_api(params, self.language(url.path.split("/")[1]))
+            else:
+                self.send_json(404, {"error": f"Unknown path {url.path}"})
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            self.send_json(502, {"error": f"Error fetching article content: {e}"})
+
+    def language(self, language):
+        return check_language(language, self.server.languages)
+
+    def send_article(self, article, missing_message):
+        if article is None:
+            self.send_json(404, {"error": missing_message})
+        else:
+            self.send_json(200, article)
+
+    def send_batch(self, params):
+        count = int(params.get("count", 10))
+        if not 1 <= count <= MAX_BATCH:
+            raise ValueError(f"'count' must be between 1 and {MAX_BATCH}.")
+        languages = [self.language(code.strip()) for code in params.get("language", "en").split(",") if code.strip()]
+        if not languages:
+            raise ValueError("'language' must name at least one language.")
+        with ThreadPoolExecutor(max_workers=min(count, BATCH_CONCURRENCY)) as executor:
+            results = executor.map(self.server.random_article, (languages[i % len(languages)] for i in range(count)))
+            articles = [article for article in results if article]
+        self.send_json(200, {"requested": count, "articles": articles})
+
+    def send_action_api(self, params, language):
+        # Enough of the action API for wiki_backends.ActionApiBackend: combined
+        # and intro queries by title or generator=random
+        intro_only = bool(params.get("exintro"))
+        if params.get("generator") == "random":
+            article = self.server.random_article(language)
+            articles = [article] if article else []
+        elif params.get("titles"):
+            articles = [self.server.article(language, title) for title in params["titles"].split("|")]
+            articles = [a for a in articles if a]
+        else:
+            return self.send_json(200, {"error": {"code": "badparams", "info": "Only titles= and generator=random are supported."}})
+        pages = [action_api_page(article, intro_only) for article in articles]
+        self.send_json(200, {"batchcomplete": True, "query": {"pages": pages}})
+
+    def send_json(self, status, data):
+        self.send_text(status, json.dumps(data, ensure_ascii=False), "application/json; charset=utf-8")
+
+    def send_text(self, status, text, content_type):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f"{self.address_string()} {format % args}", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve random Wikipedia articles over a local HTTP/JSON API.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT})")
+    parser.add_argument("--prefetch-depth", type=int, default=DEFAULT_PREFETCH_DEPTH,
+                        help=f"ready random articles kept per language (default: {DEFAULT_PREFETCH_DEPTH})")
+    parser.add_argument("-l", "--language", default="en",
+                        help="comma-separated languages to prefetch at startup (default: en)")
+    parser.add_argument("--languages", default=",".join(DEFAULT_LANGUAGES),
+                        help=f"comma-separated languages clients may ask for (default: {','.join(DEFAULT_LANGUAGES)})")
+    parser.add_argument("--metrics-log", default=os.environ.get("WIKI_METRICS_LOG"), metavar="PATH",
+                        help="append the phase timings of every fetch to PATH as JSON lines")
+    args = parser.parse_args(argv)
+    args.languages = [code.strip() for code in args.languages.split(",") if code.strip()]
+    args.language = [code.strip() for code in args.language.split(",") if code.strip()]
+    for code in args.languages + args.language:
+        if not RE_LANGUAGE.match(code):
+            parser.error(f"invalid language code {code!r}")
+    unknown = set(args.language) - set(args.languages)
+    if unknown:
+        parser.error(f"--language {','.join(sorted(unknown))} is not in --languages")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    user_agent = 'RandomWikiReflectionTool (YourProjectName <your_email@example.com>)'
+    server = WikiServer((args.host, args.port), user_agent, prefetch_depth=args.prefetch_depth,
+                        languages=args.languages)
+    get_metrics().set_log(args.metrics_log)
+    for code in args.language:
+        server.prefetcher.warm(code)
+    print(f"Serving on http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,156 @@
+from html import escape
+
+
+# Immutable copy of one section. Built from WikiSection or wikipediaapi
+# section objects, so no reference to a live page object is kept.
+class SectionSnapshot:
+    __slots__ = ("title", "level", "text", "sections")
+
+    def __init__(self, title, level, text, sections=()):
+        object.__setattr__(self, "title", title)
+        object.__setattr__(self, "level", level)
+        object.__setattr__(self, "text", text)
+        object.__setattr__(self, "sections", tuple(sections))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("SectionSnapshot is immutable")
+
+    @classmethod
+    def from_section(cls, section):
+        return cls(
+            section.title, section.level, section.text,
+            [cls.from_section(s) for s in section.sections]
+        )
+
+    def __repr__(self):
+        return f"SectionSnapshot({self.title!r}, level={self.level}, subsections={len(self.sections)})"
+
+
+# Sections as JSON-friendly nested dicts, as written by the CLI, the HTTP
+# server, the article cache and the saved last article. Accepts WikiSection,
+# SectionSnapshot and wikipediaapi section objects.
+def sections_to_data(sections):
+    return [
+        {"title": s.title, "level": s.level, "text": s.text, "sections": sections_to_data(s.sections)}
+        for s in sections
+    ]
+
+
+def sections_from_data(items, make_section=SectionSnapshot):
+    """Rebuild sections_to_data() output with make_section(title, level, text, children)"""
+    sections = []
+    for item in items:
+        if isinstance(item, list):
+            # Article caches written before kept [title, level, text, children] lists
+            title, level, text, children = item
+        else:
+            title, level, text, children = item["title"], item["level"], item["text"], item["sections"]
+        sections.append(make_section(title, level, text, sections_from_data(children, make_section)))
+    return sections
+
+
+def article_url(language, title):
+    return f"https://{language}.wikipedia.org/wiki/{title.replace(' ', '_')}"
+
+
+def count_sections(sections):
+    return sum(1 + count_sections(s.sections) for s in sections)
+
+
+def render_summary_html(summary):
+    return "".join(f"<p>{escape(line)}</p>" for line in summary.split("\n") if line.strip())
+
+
+def render_section_html(section):
+    """Render the full text of one section, on demand when it is opened in the outline"""
+    heading = min(section.level + 1, 6)
+    paragraphs = "".join(f"<p>{escape(line)}</p>" for line in section.text.split("\n") if line.strip())
+    return f"<h{heading}>{escape(section.title)}</h{heading}>{paragraphs}"
+
+
+def iter_section_chunks(sections, chunk_size):
+    """Yield tuples of top-level sections holding about chunk_size sections each (subsections included)"""
+    group = []
+    group_size = 0
+    for section in sections:
+        group.append(section)
+        group_size += 1 + count_sections(section.sections)
+        if group_size >= chunk_size:
+            yield tuple(group)
+            group = []
+            group_size = 0
+    if group:
+        yield tuple(group)
+
+
+def render_categories_html(categories):
+    return "<br>".join(f"- {escape(title)}" for title in categories)
+
+
+# Compact, immutable snapshot of a fetched article. Worker threads build it,
+# including the final summary and category HTML, so the GUI thread only has to
+# call setHtml() and no live wikipediaapi objects cross the thread boundary.
+# Sections are shown by the lazy outline model and rendered only when opened.
+class ArticleSnapshot:
+    __slots__ = (
+        "language", "title", "summary", "sections", "categories", "pageid", "lastrevid",
+        "url", "summary_html", "categories_html", "section_count",
+    )
+
+    def __init__(self, language, title, summary, sections, categories, pageid=None, lastrevid=None):
+        sections = tuple(sections)
+        categories = tuple(categories)
+        values = {
+            "language": language,
+            "title": title,
+            "summary": summary,
+            "sections": sections,
+            "categories": categories,
+            "pageid": pageid,
+            "lastrevid": lastrevid,
+            "url": article_url(language, title),
+            "summary_html": render_summary_html(summary),
+            "categories_html": render_categories_html(categories),
+            "section_count": count_sections(sections),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ArticleSnapshot is immutable")
+
+    @classmethod
+    def from_article(cls, language, article):
+        """Build a snapshot from a fetch payload (see random_wiki_article.fetch_article)"""
+        return cls(
+            language,
+            article["title"],
+            article["summary"],
+            [SectionSnapshot.from_section(s) for s in article["sections"]],
+            sorted(article["categories"].keys()),
+            article.get("pageid"),
+            article.get("lastrevid"),
+        )
+
+    def to_article(self):
+        """The snapshot as a fetch payload again, e.g. to store it in the article cache"""
+        return {
+            "title": self.title,
+            "summary": self.summary,
+            "sections": self.sections,
+            "categories": {title: {"ns": 14, "title": title} for title in self.categories},
+            "pageid": self.pageid,
+            "lastrevid": self.lastrevid,
+        }
+
+    def nbytes(self):
+        """Approximate memory held by the snapshot's text"""
+        def sections_size(sections):
+            return sum(len(s.title) + len(s.text) + sections_size(s.sections) for s in sections)
+        return (
+            len(self.summary) + len(self.summary_html) + len(self.categories_html)
+            + sum(len(c) for c in self.categories) + sections_size(self.sections)
+        )
+
+    def __repr__(self):
+        return f"ArticleSnapshot({self.language!r}, {self.title!r}, sections={self.section_count})"
@@ -0,0 +1,198 @@
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+from wiki_fake_server import start_fake_server, synthetic_corpus, load_corpus
+
+# Fetches before the baseline is taken: caches, pools, the history ring and
+# the prefetch queues fill up first
+DEFAULT_WARMUP = 300
+# Allowed growth between the first and the last samples after the warmup
+DEFAULT_MAX_TRACED_MB = 2.0
+DEFAULT_MAX_RSS_MB = 16.0
+# Samples averaged at each end, to smooth out allocator noise
+EDGE_SAMPLES = 3
+# Longest wait for one fetch to be shown
+FETCH_TIMEOUT = 30
+# Objects counted at each sample; their number must level off too
+COUNTED_TYPES = ("ArticleFetcher", "FetcherSignals", "ArticleSnapshot", "SectionSnapshot", "FetchTrace")
+USER_AGENT = 'RandomWikiReflectionToolSoak (YourProjectName <your_email@example.com>)'
+
+
+def rss_bytes():
+    """Resident set size of this process (peak size where the current one is not available)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def live_objects():
+    counts = dict.fromkeys(COUNTED_TYPES, 0)
+    for obj in gc.get_objects():
+        name = type(obj).__name__
+        if name in counts:
+            counts[name] += 1
+    return counts
+
+
+def sample(fetches):
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    return {
+        "fetches": fetches,
+        "traced_mb": round(traced / 2**20, 3),
+        "rss_mb": round(rss_bytes() / 2**20, 3),
+        "objects": live_objects(),
+    }
+
+
+def growth(samples, key):
+    if len(samples) < 2:
+        raise ValueError(f"memory growth needs at least 2 samples, got {len(samples)}")
+    edge = min(EDGE_SAMPLES, len(samples) // 2) or 1
+    first = sum(s[key] for s in samples[:edge]) / edge
+    last = sum(s[key] for s in samples[-edge:]) / edge
+    return round(last - first, 3)
+
+
+# Drive a real window through thousands of fetches, with superseded fetches,
+# back/forward steps and searches in between, and sample traced and resident memory as it goes
+def run_soak(options):
+    os.environ["XDG_CACHE_HOME"] = tempfile.mkdtemp(prefix="wiki-soak-")
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    pages = load_corpus(options.corpus) if options.corpus else synthetic_corpus(options.pages, options.seed)
+    server = start_fake_server(pages=pages, latency=options.latency, jitter=options.latency / 2, seed=options.seed)
+
+    from PyQt6.QtCore import QEventLoop
+    from PyQt6.QtWidgets import QApplication
+    from wiki_http import configure_transport
+    from wiki_backends import get_selector, ALL_LANGUAGES
+    from random_wiki_article import set_seen_filter
+    from wiki_gui_tool import WikiReflectionTool
+    configure_transport(user_agent=USER_AGENT, base_url=server.base_url)
+    get_selector().set_override(ALL_LANGUAGES, options.backend)
+    # The corpus is small; seen titles would soon make every pick a miss
+    set_seen_filter(False)
+
+    app = QApplication.instance() or QApplication([])
+    window = WikiReflectionTool()
+    window.show()
+
+    def settle():
+        app.processEvents()
+        deadline = time.monotonic() + FETCH_TIMEOUT
+        while not window.fetch_button.isEnabled() or window.fetch_trace is not None:
+            if time.monotonic() > deadline:
+                raise TimeoutError("fetch did not finish")
+            app.processEvents(QEventLoop.ProcessEventsFlag.AllEvents, 50)
+
+    settle()
+    tracemalloc.start(options.frames)
+    samples = []
+    baseline = None
+    if options.warmup == 0:
+        samples.append(sample(0))
+        baseline = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+    total = options.warmup + options.fetches
+    for i in range(1, total + 1):
+        if i % 20 == 0:
+            # A fetch superseded while in flight, as with impatient clicks
+            window.fetch_random_article()
+        window.fetch_random_article()
+        settle()
+        if i % 10 == 0:
+            window.go_back()
+            window.go_forward()
+        if i % 25 == 0:
+            window.search_articles(window.title_label.text()[:4])
+            window.search_articles("")
+        if i == options.warmup:
+            samples.append(sample(i))
+            baseline = tracemalloc.take_snapshot()
+        elif i > options.warmup and (i - options.warmup) % options.sample_every == 0:
+            samples.append(sample(i))
+            print(f"{i}/{total} fetches: {samples[-1]['traced_mb']} MB traced, "
+                  f"{samples[-1]['rss_mb']} MB resident", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+    if samples[-1]["fetches"] != total:
+        # The run ended between two samples; its end is always measured
+        samples.append(sample(total))
+
+    gc.collect()
+    top = tracemalloc.take_snapshot().compare_to(baseline, "traceback" if options.frames > 1 else "lineno")
+    tracemalloc.stop()
+    window.close()
+    app.processEvents()
+    server.shutdown()
+    server.server_close()
+
+    report = {
+        "fetches": options.fetches,
+        "warmup": options.warmup,
+        "seconds": round(elapsed, 1),
+        "traced_growth_mb": growth(samples, "traced_mb"),
+        "rss_growth_mb": growth(samples, "rss_mb"),
+        "limits": {"traced_mb": options.max_traced_mb, "rss_mb": options.max_rss_mb},
+        "samples": samples,
+        "top_growth": [
+            {"where": stat.traceback.format()[-options.frames * 2:], "kb": round(stat.size_diff / 1024, 1), "count": stat.count_diff}
+            for stat in top[:options.top]
+        ],
+        "history": window.history.stats(),
+        "ui_blocks": window.ui_block_report(),
+        "fetch_latency": window.fetch_latency_summary(),
+    }
+    report["passed"] = (
+        report["traced_growth_mb"] <= options.max_traced_mb and report["rss_growth_mb"] <= options.max_rss_mb
+    )
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the GUI through thousands of fetches against a local fake wiki and fail if memory grows.")
+    parser.add_argument("-n", "--fetches", type=int, default=3000, help="fetches measured after the warmup (default: 3000)")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help=f"fetches before the baseline (default: {DEFAULT_WARMUP})")
+    parser.add_argument("--sample-every", type=int, default=250, help="fetches between memory samples (default: 250)")
+    parser.add_argument("--max-traced-mb", type=float, default=DEFAULT_MAX_TRACED_MB,
+                        help=f"allowed growth of Python allocations (default: {DEFAULT_MAX_TRACED_MB})")
+    parser.add_argument("--max-rss-mb", type=float, default=DEFAULT_MAX_RSS_MB,
+                        help=f"allowed growth of the resident set (default: {DEFAULT_MAX_RSS_MB})")
+    parser.add_argument("--pages", type=int, default=5000, help="articles in the synthetic corpus (default: 5000)")
+    parser.add_argument("--corpus", metavar="PATH", help="recorded pages to serve instead (see wiki_fake_server.py --record)")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake server response time in seconds (default: 0)")
+    parser.add_argument("--backend", default="action", help="backend to pin: action, rest or auto (default: action)")
+    parser.add_argument("--frames", type=int, default=1, help="stack frames kept per allocation (default: 1)")
+    parser.add_argument("--top", type=int, default=10, help="allocation sites listed by growth (default: 10)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the corpus and delays (default: 0)")
+    parser.add_argument("-o", "--output", default="-", help="JSON report file (default: stdout)")
+    args = parser.parse_args(argv)
+    if args.fetches < 1:
+        parser.error("--fetches must be at least 1: memory growth is measured after the warmup")
+    if args.warmup < 0 or args.sample_every < 1:
+        parser.error("--warmup must be at least 0 and --sample-every at least 1")
+    return args
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = run_soak(args)
+    text = json.dumps(result, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if not result["passed"]:
+        print(f"Memory grew by {result['traced_growth_mb']} MB traced, {result['rss_growth_mb']} MB resident",
+              file=sys.stderr)
+    sys.exit(0 if result["passed"] else 1)
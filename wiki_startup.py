@@ -0,0 +1,115 @@
+import os
+import sys
+import json
+import time
+
+from PyQt6.QtCore import QObject, QEvent, pyqtSignal
+
+from wiki_snapshot import ArticleSnapshot, sections_to_data, sections_from_data
+
+# Startup milestones, in the order they are reached
+IMPORT = "import"
+CONSTRUCT = "construct"
+FIRST_PAINT = "first_paint"
+FIRST_FRESH = "first_fresh_article"
+MILESTONES = (IMPORT, CONSTRUCT, FIRST_PAINT, FIRST_FRESH)
+
+
+def default_last_article_path():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "wiki_reflection_tool", "last_article.json")
+
+
+def save_last_article(snapshot, path=None):
+    """Keep the article shown last, so the next start can paint it before any fetch"""
+    path = path or default_last_article_path()
+    data = {
+        "language": snapshot.language,
+        "title": snapshot.title,
+        "summary": snapshot.summary,
+        "sections": sections_to_data(snapshot.sections),
+        "categories": list(snapshot.categories),
+        "pageid": snapshot.pageid,
+        "lastrevid": snapshot.lastrevid,
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = path + ".part"
+        with open(partial, "w", encoding="utf-8") as out:
+            json.dump(data, out, ensure_ascii=False)
+        os.replace(partial, path)
+    except OSError as e:
+        print(f"Error saving the last article: {e}", file=sys.stderr)
+
+
+def load_last_article(path=None):
+    """The ArticleSnapshot saved by save_last_article(), or None"""
+    path = path or default_last_article_path()
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return ArticleSnapshot(
+            data["language"], data["title"], data["summary"], sections_from_data(data["sections"]),
+            data["categories"], data.get("pageid"), data.get("lastrevid"),
+        )
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Error loading the last article: {e}", file=sys.stderr)
+        return None
+
+
+# Milestones of one GUI start, in milliseconds since `started` (taken before
+# the heavy imports). The first paint is taken from the first Paint event of a
+# watched widget; `finished` is emitted once the first fresh article is shown
+# or the fetch for it failed.
+class StartupTimer(QObject):
+    finished = pyqtSignal()
+
+    def __init__(self, started):
+        super().__init__()
+        self.started = started
+        self.marks = {}
+        self.warm = False
+        self.error = None
+        self._watched = None
+
+    def mark(self, name):
+        """Record a milestone the first time it is reached"""
+        if name not in self.marks:
+            self.marks[name] = (time.perf_counter() - self.started) * 1000
+            if name == FIRST_FRESH:
+                self.finished.emit()
+
+    def fail(self, message):
+        if self.error is None and FIRST_FRESH not in self.marks:
+            self.error = message
+            self.finished.emit()
+
+    def watch_paint(self, widget):
+        self._watched = widget
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if obj is self._watched and event.type() == QEvent.Type.Paint:
+            self.mark(FIRST_PAINT)
+            obj.removeEventFilter(self)
+            self._watched = None
+        return False
+
+    def report(self):
+        """Time spent in each startup step, and the time since start at which each one ended"""
+        steps = {}
+        previous = 0.0
+        for name in MILESTONES:
+            if name in self.marks:
+                steps[f"{name}_ms"] = round(self.marks[name] - previous, 1)
+                previous = self.marks[name]
+        report = {
+            "steps": steps,
+            "since_start_ms": {name: round(ms, 1) for name, ms in self.marks.items()},
+            "warm_paint": self.warm,
+        }
+        if self.error:
+            report["error"] = self.error
+        return report
@@ -0,0 +1,114 @@
+import time
+import random
+import threading
+from collections import deque
+
+# Samples kept per reservoir; percentiles stay accurate while memory is fixed
+DEFAULT_CAPACITY = 4096
+# Most recent samples kept by a sliding window, and the age in seconds at which they drop out
+DEFAULT_WINDOW = 256
+DEFAULT_WINDOW_AGE = 300.0
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# Latency recorder with bounded memory: keeps a uniform random sample of at
+# most `capacity` values (reservoir sampling) plus exact count, sum and max,
+# so runs of any length can report percentiles.
+class LatencyReservoir:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = []
+        self._random = random.Random()
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+            if len(self._samples) < self.capacity:
+                self._samples.append(value)
+            else:
+                slot = self._random.randrange(self.count)
+                if slot < self.capacity:
+                    self._samples[slot] = value
+
+    def percentile(self, fraction):
+        with self._lock:
+            return percentile(sorted(self._samples), fraction)
+
+    def summary(self):
+        """Count, mean, p50/p90/p99 and max of the recorded values"""
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total, maximum = self.count, self.total, self.max
+        return {
+            "count": count,
+            "mean": total / count if count else 0.0,
+            "p50": percentile(samples, 0.50),
+            "p90": percentile(samples, 0.90),
+            "p99": percentile(samples, 0.99),
+            "max": maximum,
+        }
+
+
+# Latency recorder over recent values only: at most `capacity` values, none
+# older than `max_age` seconds, so its percentiles follow current conditions
+# (e.g. a language's hedge delay) instead of the whole run. Count, mean and
+# max still cover every recorded value.
+class SlidingLatencyWindow:
+    def __init__(self, capacity=DEFAULT_WINDOW, max_age=DEFAULT_WINDOW_AGE):
+        self.capacity = capacity
+        self.max_age = max_age
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._samples = deque(maxlen=capacity)  # (monotonic time, value), oldest first
+        self._lock = threading.Lock()
+
+    def add(self, value):
+        with self._lock:
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+            self._samples.append((time.monotonic(), value))
+
+    def recent(self):
+        """Number of values currently in the window"""
+        with self._lock:
+            self._prune()
+            return len(self._samples)
+
+    def percentile(self, fraction):
+        with self._lock:
+            self._prune()
+            return percentile(sorted(value for _, value in self._samples), fraction)
+
+    def summary(self):
+        """Count, mean and max of every value; p50/p90/p99 of the recent ones"""
+        with self._lock:
+            self._prune()
+            samples = sorted(value for _, value in self._samples)
+            count, total, maximum = self.count, self.total, self.max
+        return {
+            "count": count,
+            "mean": total / count if count else 0.0,
+            "p50": percentile(samples, 0.50),
+            "p90": percentile(samples, 0.90),
+            "p99": percentile(samples, 0.99),
+            "max": maximum,
+        }
+
+    def _prune(self):
+        horizon = time.monotonic() - self.max_age
+        while self._samples and self._samples[0][0] < horizon:
+            self._samples.popleft()
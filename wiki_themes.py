@@ -0,0 +1,397 @@
+import re
+from PyQt6.QtWidgets import QApplication, QWidget
+from PyQt6.QtGui import QPalette, QColor
+
+# Dynamic property on the main window that selects the active theme
+THEME_PROPERTY = "theme"
+
+CLASSIC_STYLESHEET = """
+    QMainWindow {
+        background-color: #f0f0f0;
+    }
+    QLabel {
+        color: #333333;
+    }
+    QPushButton {
+        background-color: #4a90e2;
+        color: white;
+        border: none;
+        padding: 8px 16px;
+        border-radius: 4px;
+        font-size: 14px;
+    }
+    QPushButton:hover {
+        background-color: #357abd;
+    }
+    QPushButton:disabled {
+        background-color: #cccccc;
+    }
+    QComboBox {
+        padding: 5px;
+        border: 1px solid #cccccc;
+        border-radius: 4px;
+        background-color: white;
+    }
+    QTextBrowser {
+        border: 1px solid #cccccc;
+        border-radius: 4px;
+        background-color: white;
+        padding: 10px;
+    }
+"""
+
+DARK_STYLESHEET = """
+    /* --- General Styles --- */
+    QMainWindow {
+        background-color: #121212; /* Deep dark background */
+        color: #e0e0e0; /* Light gray text for general elements */
+    }
+
+    QLabel {
+        color: #e0e0e0; /* Consistent light gray for labels */
+    }
+
+    QPushButton {
+        background-color: #0d6efd; /* Vibrant blue */
+        color: #ffffff; /* White text on buttons */
+        border: none;
+        padding: 12px 24px; /* Increased padding for larger buttons */
+        border-radius: 6px;
+        font-size: 15px; /* Slightly larger font */
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: #0b5ed7; /* Darker blue on hover */
+    }
+    QPushButton:pressed {
+        background-color: #0a58ca; /* Even darker blue when pressed */
+    }
+    QPushButton:disabled {
+        background-color: #2d2d2d; /* Dark gray for disabled */
+        color: #808080; /* Lighter gray text for disabled */
+    }
+
+    /* --- ComboBox Styles --- */
+    QComboBox {
+        min-width: 150px;
+        padding: 8px; /* Padding inside the combobox */
+        border: 1px solid #3d3d3d; /* Subtle dark border */
+        border-radius: 4px; /* Slightly smaller radius */
+        background-color: #1e1e1e; /* Dark background */
+        color: #e0e0e0; /* Light gray text */
+    }
+    QComboBox:hover {
+        border-color: #0d6efd; /* Highlight border on hover */
+    }
+    QComboBox::drop-down {
+        border: none; /* No border for dropdown arrow area */
+    }
+    QComboBox::down-arrow {
+        image: none; /* Hide default arrow */
+        border: none;
+    }
+
+    QComboBox QAbstractItemView {
+        background-color: #1e1e1e; /* Dark background for dropdown list */
+        color: #e0e0e0; /* Light gray text for list items */
+        selection-background-color: #0d6efd; /* Blue selection background */
+        selection-color: #ffffff; /* White text on selection */
+        border: 1px solid #3d3d3d; /* Subtle border for the list */
+        font-size: 14px;
+    }
+
+    /* --- Article Content Area Styles (Frame and Text Browsers) --- */
+    QFrame {
+        background-color: #1a1a1a; /* Slightly lighter dark background for content frame */
+        border-radius: 8px; /* Rounded corners for content frame */
+        border: 1px solid #3d3d3d; /* Subtle border for the frame */
+    }
+
+    QTextBrowser {
+        background-color: #1a1a1a; /* Match frame background */
+        color: #e0e0e0; /* Light gray text */
+        border: none; /* No border for text browsers within the frame */
+        padding: 10px; /* Internal padding */
+    }
+
+    QTreeView {
+        background-color: #1a1a1a; /* Match frame background */
+        color: #e0e0e0; /* Light gray text */
+        border: none;
+        selection-background-color: #0d6efd;
+        selection-color: #ffffff;
+    }
+
+    /* --- Scrollbar Styles --- */
+    QScrollBar:vertical {
+        border: none;
+        background: #2d2d2d; /* Darker background for scrollbar area */
+        width: 12px;
+        margin: 0px;
+    }
+    QScrollBar::handle:vertical {
+        background: #555555; /* Medium gray handle */
+        border-radius: 6px;
+        min-height: 30px;
+    }
+    QScrollBar::handle:vertical:hover {
+        background: #0d6efd; /* Blue handle on hover */
+    }
+    QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+        height: 0px;
+    }
+    QScrollBar:horizontal {
+        border: none;
+        background: #2d2d2d; /* Darker background for scrollbar area */
+        height: 12px;
+        margin: 0px;
+    }
+    QScrollBar::handle:horizontal {
+        background: #555555; /* Medium gray handle */
+        border-radius: 6px;
+        min-width: 30px;
+    }
+    QScrollBar::handle:horizontal:hover {
+        background: #0d6efd; /* Blue handle on hover */
+    }
+    QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
+        width: 0px;
+    }
+"""
+
+LIGHT_STYLESHEET = """
+    QMainWindow {
+        background-color: #f8f9fa;
+    }
+    QLabel {
+        color: #212529;
+    }
+    QPushButton {
+        background-color: #0d6efd;
+        color: #ffffff;
+        border: none;
+        padding: 10px 20px;
+        border-radius: 6px;
+        font-size: 14px;
+        font-weight: bold;
+    }
+    QPushButton:hover {
+        background-color: #0b5ed7;
+    }
+    QPushButton:pressed {
+        background-color: #0a58ca;
+    }
+    QPushButton:disabled {
+        background-color: #e9ecef;
+        color: #6c757d;
+    }
+    /* Styling for QComboBox in light theme */
+    QComboBox {
+        padding: 8px;
+        border: 2px solid #ced4da;
+        border-radius: 6px;
+        background-color: #ffffff;
+        color: #212529;
+        min-width: 150px;
+    }
+    QComboBox:hover {
+        border-color: #0d6efd;
+    }
+    QComboBox::drop-down {
+        border: none;
+    }
+    QComboBox::down-arrow {
+        image: none;
+        border: none;
+    }
+    QComboBox QAbstractItemView {
+        background-color: #ffffff;
+        color: #212529;
+        selection-background-color: #0d6efd;
+        selection-color: #ffffff;
+        border: 1px solid #ced4da;
+        font-size: 14px;
+    }
+    QTextBrowser {
+        border: 2px solid #ced4da;
+        border-radius: 8px;
+        background-color: #ffffff;
+        color: #212529;
+        padding: 15px;
+        font-size: 14px;
+        line-height: 1.6;
+    }
+    QTextBrowser:hover {
+        border-color: #0d6efd;
+    }
+    QTreeView {
+        border: 2px solid #ced4da;
+        border-radius: 8px;
+        background-color: #ffffff;
+        color: #212529;
+        selection-background-color: #0d6efd;
+        selection-color: #ffffff;
+    }
+    QFrame {
+        background-color: #ffffff;
+        border-radius: 12px;
+        border: 2px solid #ced4da;
+    }
+    QFrame:hover {
+        border-color: #0d6efd;
+    }
+    QScrollBar:vertical {
+        border: none;
+        background-color: #f8f9fa;
+        width: 12px;
+        margin: 0px;
+    }
+    QScrollBar::handle:vertical {
+        background-color: #ced4da;
+        border-radius: 6px;
+        min-height: 30px;
+    }
+    QScrollBar::handle:vertical:hover {
+        background-color: #0d6efd;
+    }
+    QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical {
+        height: 0px;
+    }
+    QScrollBar:horizontal {
+        border: none;
+        background-color: #f8f9fa;
+        height: 12px;
+        margin: 0px;
+    }
+    QScrollBar::handle:horizontal {
+        background-color: #ced4da;
+        border-radius: 6px;
+        min-width: 30px;
+    }
+    QScrollBar::handle:horizontal:hover {
+        background-color: #0d6efd;
+    }
+    QScrollBar::add-line:horizontal, QScrollBar::sub-line:horizontal {
+        width: 0px;
+    }
+"""
+
+# Palette for the dark theme, so widgets without a stylesheet rule (check
+# boxes, tree branches, tooltips) do not keep light-theme colours
+DARK_PALETTE = {
+    "Window": "#121212",
+    "WindowText": "#e0e0e0",
+    "Base": "#1a1a1a",
+    "AlternateBase": "#1e1e1e",
+    "Text": "#e0e0e0",
+    "Button": "#2d2d2d",
+    "ButtonText": "#e0e0e0",
+    "Highlight": "#0d6efd",
+    "HighlightedText": "#ffffff",
+    "ToolTipBase": "#1e1e1e",
+    "ToolTipText": "#e0e0e0",
+}
+
+RE_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+RE_RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+
+
+def scope_stylesheet(stylesheet, name):
+    """Prefix every selector so the rules only apply while the window's theme property is name"""
+    scope = f'QMainWindow[{THEME_PROPERTY}="{name}"]'
+    rules = []
+    for selectors, body in RE_RULE.findall(RE_COMMENT.sub("", stylesheet)):
+        scoped = []
+        for selector in selectors.split(","):
+            selector = selector.strip()
+            if selector.startswith("QMainWindow"):
+                scoped.append(scope + selector[len("QMainWindow"):])
+            else:
+                scoped.append(f"{scope} {selector}")
+        declarations = " ".join(line.strip() for line in body.strip().splitlines())
+        rules.append(f"{', '.join(scoped)} {{ {declarations} }}")
+    return "\n".join(rules)
+
+
+# A named theme: a stylesheet, a palette, or both. Palette-only themes switch
+# without any stylesheet re-polish at all.
+class Theme:
+    def __init__(self, name, stylesheet="", palette=None, dark=False):
+        self.name = name
+        self.stylesheet = stylesheet
+        self.palette_colors = palette or {}
+        self.dark = dark
+        self._palette = None
+
+    def palette(self, base):
+        """Return the theme's QPalette, built from base once and then cached"""
+        if self._palette is None:
+            palette = QPalette(base)
+            for role, color in self.palette_colors.items():
+                palette.setColor(getattr(QPalette.ColorRole, role), QColor(color))
+            self._palette = palette
+        return self._palette
+
+
+# Registered themes by name; register_theme() adds more beyond the built-in ones
+THEMES = {}
+
+
+def register_theme(theme):
+    THEMES[theme.name] = theme
+    return theme
+
+
+register_theme(Theme("classic", CLASSIC_STYLESHEET))
+register_theme(Theme("light", LIGHT_STYLESHEET))
+register_theme(Theme("dark", DARK_STYLESHEET, palette=DARK_PALETTE, dark=True))
+
+
+# Applies themes to a main window. The stylesheets of all themes are scoped
+# with a property selector and compiled into one stylesheet that Qt parses
+# once; switching only flips the window property and re-polishes, instead
+# of handing Qt a new stylesheet string on every toggle.
+class ThemeManager:
+    def __init__(self, window, themes=None):
+        self.window = window
+        self.themes = dict(themes or THEMES)
+        self.current = None
+        self._default_palette = QPalette(QApplication.instance().palette())
+        self.stylesheet = "\n".join(
+            scope_stylesheet(theme.stylesheet, name)
+            for name, theme in self.themes.items() if theme.stylesheet
+        )
+        window.setStyleSheet(self.stylesheet)
+
+    def add_theme(self, theme):
+        """Register a theme after construction (recompiles the stylesheet once)"""
+        self.themes[theme.name] = theme
+        if theme.stylesheet:
+            self.stylesheet += "\n" + scope_stylesheet(theme.stylesheet, theme.name)
+            self.window.setStyleSheet(self.stylesheet)
+
+    def apply(self, name):
+        theme = self.themes[name]
+        previous = self.themes.get(self.current)
+        if previous is theme:
+            return theme
+        self.current = name
+        self.window.setProperty(THEME_PROPERTY, name)
+
+        if theme.palette_colors or (previous is not None and previous.palette_colors):
+            self.window.setPalette(theme.palette(self._default_palette) if theme.palette_colors
+                                   else self._default_palette)
+
+        # Property selectors are only re-evaluated on polish. Palette-only
+        # switches (no rules before or after) skip this entirely.
+        if theme.stylesheet or (previous is not None and previous.stylesheet):
+            self.repolish()
+        return theme
+
+    def repolish(self):
+        style = self.window.style()
+        widgets = [self.window] + self.window.findChildren(QWidget)
+        for widget in widgets:
+            style.unpolish(widget)
+            style.polish(widget)
+        self.window.update()
@@ -0,0 +1,314 @@
+import os
+import sys
+import json
+import mmap
+import time
+import random
+import struct
+import threading
+from array import array
+
+from wiki_http import get_client
+
+# File layout: header, then offsets (Q, count + 1), page lengths (I), namespaces
+# (H) and the UTF-8 titles packed into one blob. Title i is
+# blob[offsets[i]:offsets[i + 1]].
+MAGIC = b"WTIDX001"
+HEADER = struct.Struct("<8sQQ")  # magic, count, blob size
+# Random entries tried before a filtered draw gives up
+MAX_DRAWS = 256
+# Pages per generator=allpages request (the API maximum for prop=info)
+BATCH_SIZE = 500
+# Requests between checkpoints of an interrupted-safe build
+CHECKPOINT_EVERY = 50
+
+
+# Raised instead of drawing an unfiltered title when no title of an index
+# matches the length and namespace filters
+class NoMatchingTitleError(LookupError):
+    pass
+
+
+def default_index_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "wiki_reflection_tool", "titles")
+
+
+def index_path(language):
+    return os.path.join(default_index_dir(), f"{language}.idx")
+
+
+def write_index(path, offsets, lengths, namespaces, blob):
+    partial = path + ".part"
+    with open(partial, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(lengths), len(blob)))
+        offsets.tofile(f)
+        lengths.tofile(f)
+        namespaces.tofile(f)
+        f.write(blob)
+    os.replace(partial, path)
+
+
+def read_index_arrays(path):
+    """Load an index file into growable arrays (used to extend it)"""
+    with open(path, "rb") as f:
+        magic, count, blob_size = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a title index")
+        offsets, lengths, namespaces = array("Q"), array("I"), array("H")
+        offsets.fromfile(f, count + 1)
+        lengths.fromfile(f, count)
+        namespaces.fromfile(f, count)
+        blob = bytearray(f.read(blob_size))
+    return offsets, lengths, namespaces, blob
+
+
+# Read-only, memory-mapped title index of one language. Titles live in a
+# single packed blob addressed by an offsets table, so millions of titles
+# take their UTF-8 size plus 14 bytes each and are shared through the page
+# cache instead of being Python strings. Random titles are drawn locally, so
+# picking one costs no API round trip.
+class TitleIndex:
+    def __init__(self, path):
+        self.path = path
+        self.mtime = os.path.getmtime(path)
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count, blob_size = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a title index")
+        view = memoryview(self._map)
+        start = HEADER.size
+        self._offsets = view[start:start + 8 * (self.count + 1)].cast("Q")
+        start += 8 * (self.count + 1)
+        self._lengths = view[start:start + 4 * self.count].cast("I")
+        start += 4 * self.count
+        self._namespaces = view[start:start + 2 * self.count].cast("H")
+        start += 2 * self.count
+        self._blob_start = start
+        self.nbytes = len(self._map)
+        self._random = random.Random()
+        view.release()
+
+    def close(self):
+        for view in (self._offsets, self._lengths, self._namespaces):
+            view.release()
+        self._map.close()
+
+    def title(self, i):
+        start = self._blob_start + self._offsets[i]
+        end = self._blob_start + self._offsets[i + 1]
+        return self._map[start:end].decode("utf-8")
+
+    def random_title(self, min_length=0, namespaces=(0,)):
+        """A uniformly drawn title matching the filters, or None"""
+        if not self.count:
+            return None
+        for _ in range(MAX_DRAWS):
+            i = self._random.randrange(self.count)
+            if self._lengths[i] >= min_length and self._namespaces[i] in namespaces:
+                return self.title(i)
+        return None
+
+    def random_titles(self, limit=1, min_length=0, namespaces=(0,)):
+        titles = []
+        for _ in range(limit):
+            title = self.random_title(min_length, namespaces)
+            if title is None:
+                break
+            titles.append(title)
+        return titles
+
+
+def read_state(path):
+    """Build state of an index file ({} if there is none); "built_at" is set once it is complete"""
+    try:
+        with open(path + ".json", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+# Build (or resume building) the title index of a language from
+# generator=allpages, skipping redirects. Progress is checkpointed to a
+# separate partial file, so an interrupted build continues where it stopped
+# and the index itself only appears once it holds every title (allpages is
+# alphabetical; a partial index would only draw from the first letters).
+# A complete index is refreshed incrementally from the recent changes since
+# it was built: new pages are added, and deleted or moved pages are dropped
+# (a move adds its target). Undeleted pages, and pages moved in
+# from an unindexed namespace, only come back with a rebuild.
+def build_title_index(language, path=None, namespaces=(0,), progress=None):
+    path = path or index_path(language)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    state_path = path + ".json"
+    partial_path = path + ".partial"
+    state = read_state(path)
+    if state.get("built_at"):
+        source = path
+    else:
+        # An index left by an interrupted build of an older version is resumed too
+        source = partial_path if os.path.exists(partial_path) else path
+    if state and os.path.exists(source):
+        offsets, lengths, namespace_ids, blob = read_index_arrays(source)
+    else:
+        offsets, lengths, namespace_ids, blob = array("Q", [0]), array("I"), array("H"), bytearray()
+        state = {"namespaces": list(namespaces), "pending": list(namespaces), "continue": None}
+
+    def add(title, length, ns):
+        blob.extend(title.encode("utf-8"))
+        offsets.append(len(blob))
+        lengths.append(min(length, 0xFFFFFFFF))
+        namespace_ids.append(ns)
+
+    def checkpoint():
+        # The state is written second: a crash in between leaves it behind the file
+        write_index(path if state.get("built_at") else partial_path, offsets, lengths, namespace_ids, blob)
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+
+    client = get_client(language)
+    if state.get("built_at"):
+        refreshed_at = time.time()
+        changes = _page_changes(client, state)
+        offsets, lengths, namespace_ids, blob = _apply_changes(offsets, lengths, namespace_ids, blob, changes)
+        state["built_at"] = refreshed_at
+        if progress:
+            progress(len(lengths))
+        checkpoint()
+        return path
+
+    state.setdefault("started_at", time.time())
+    requests_done = 0
+    while state["pending"]:
+        params = {
+            "action": "query",
+            "generator": "allpages",
+            "gapnamespace": state["pending"][0],
+            "gapfilterredir": "nonredirects",
+            "gaplimit": BATCH_SIZE,
+            "prop": "info",
+            "format": "json",
+            "formatversion": 2,
+        }
+        params.update(state["continue"] or {})
+        data = client.query(params)
+        for page in data.get("query", {}).get("pages", []):
+            add(page["title"], page.get("length", 0), page.get("ns", 0))
+        if "continue" in data:
+            state["continue"] = data["continue"]
+        else:
+            state["pending"].pop(0)
+            state["continue"] = None
+        requests_done += 1
+        if progress:
+            progress(len(lengths))
+        if requests_done % CHECKPOINT_EVERY == 0:
+            checkpoint()
+
+    # Pages created while the build ran are picked up by the next refresh,
+    # which replaces any copy allpages already listed
+    state["built_at"] = state.pop("started_at")
+    checkpoint()
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+    return path
+
+
+def _page_changes(client, state):
+    """Pages created, deleted and moved since the last build or refresh, in order:
+    {title: (length, namespace), None if it left the index, or ("moved", source)}"""
+    # Recent changes reach back about 30 days; older indexes should be rebuilt.
+    # Log entries have no page row, so redirects are skipped here rather than
+    # with rcshow=!redirect (which would drop the deletions too).
+    params = {
+        "action": "query",
+        "list": "recentchanges",
+        "rctype": "new|log",
+        "rcnamespace": "|".join(str(ns) for ns in state["namespaces"]),
+        "rcprop": "title|sizes|redirect|loginfo",
+        "rcdir": "newer",
+        "rcstart": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(state["built_at"])),
+        "rclimit": "max",
+        "format": "json",
+        "formatversion": 2,
+    }
+    changes = {}
+    request_params = dict(params)
+    while True:
+        data = client.query(request_params)
+        for change in data.get("query", {}).get("recentchanges", []):
+            title = change["title"]
+            if change.get("type") == "new":
+                if not change.get("redirect"):
+                    changes[title] = (change.get("newlen", 0), change.get("ns", 0))
+            elif change.get("logtype") == "delete" and change.get("logaction") == "delete":
+                changes[title] = None
+            elif change.get("logtype") == "move":
+                # A redirect left behind is not indexed either; the target keeps
+                # the length of the page, which the log entry does not give
+                target = change.get("logparams", {})
+                moved = changes.get(title, ("moved", title))
+                changes[title] = None
+                if moved and target.get("target_ns") in state["namespaces"]:
+                    changes[target["target_title"]] = moved
+        if "continue" not in data:
+            break
+        request_params = dict(params)
+        request_params.update(data["continue"])
+    return changes
+
+
+def _apply_changes(offsets, lengths, namespace_ids, blob, changes):
+    """Copies of the index arrays without the changed titles, with their new entries appended"""
+    changed = {title.encode("utf-8"): title for title in changes}
+    previous = {}  # changed title -> (length, namespace) in the index
+    new_offsets, new_lengths, new_namespace_ids, new_blob = array("Q", [0]), array("I"), array("H"), bytearray()
+    for i in range(len(lengths)):
+        title = bytes(blob[offsets[i]:offsets[i + 1]])
+        if title in changed:
+            # Also drops the copy of a page created while the build ran
+            previous[changed[title]] = (lengths[i], namespace_ids[i])
+            continue
+        new_blob.extend(title)
+        new_offsets.append(len(new_blob))
+        new_lengths.append(lengths[i])
+        new_namespace_ids.append(namespace_ids[i])
+    for title, page in changes.items():
+        if page and page[0] == "moved":
+            page = previous.get(page[1])
+        if page is None:
+            continue
+        new_blob.extend(title.encode("utf-8"))
+        new_offsets.append(len(new_blob))
+        new_lengths.append(min(page[0], 0xFFFFFFFF))
+        new_namespace_ids.append(page[1])
+    return new_offsets, new_lengths, new_namespace_ids, new_blob
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_title_index(language):
+    """The title index of a language if one was completely built, reopened after a rebuild; else None"""
+    path = index_path(language)
+    with _indexes_lock:
+        index = _indexes.get(language)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        if index is None or index.mtime != mtime:
+            try:
+                if not read_state(path).get("built_at"):
+                    # Left by an interrupted build of an older version
+                    return None
+                index = TitleIndex(path)
+            except (OSError, ValueError) as e:
+                print(f"Error opening title index {path}: {e}", file=sys.stderr)
+                return None
+            # The old map is left to the garbage collector; readers may still hold it
+            _indexes[language] = index
+        return index
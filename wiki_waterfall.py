@@ -0,0 +1,84 @@
+from PyQt6.QtWidgets import QWidget
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QPainter, QColor
+
+# Bar colour of each phase (see wiki_metrics); other phases use DEFAULT_COLOR
+PHASE_COLORS = {
+    "title": QColor("#9b59b6"),
+    "cache": QColor("#95a5a6"),
+    "revalidate": QColor("#1abc9c"),
+    "intro": QColor("#3498db"),
+    "article": QColor("#2980b9"),
+    "extract": QColor("#e67e22"),
+    "categories": QColor("#f1c40f"),
+    "render": QColor("#2ecc71"),
+    "display": QColor("#e74c3c"),
+}
+DEFAULT_COLOR = QColor("#bdc3c7")
+BACKGROUND = QColor(20, 24, 28, 215)
+TEXT_COLOR = QColor("#ecf0f1")
+PANEL_WIDTH = 500
+LABEL_WIDTH = 250
+ROW_HEIGHT = 18
+MARGIN = 8
+
+
+# Translucent panel drawn over the window with the waterfall of the last
+# fetch: one row per phase, its bar placed at the phase's start and scaled to
+# the whole fetch, and a last row with the time to first content and total
+# fetch time over the recent fetches. Mouse events pass through to the
+# article underneath.
+class WaterfallOverlay(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.trace = None
+        self.latency = None
+        self.set_trace(None)
+        self.hide()
+
+    def set_trace(self, trace, latency=None):
+        """Show a trace as returned by wiki_metrics.FetchTrace.to_json(), or None, and
+        the latency percentiles of recent fetches (see WikiReflectionTool.fetch_latency_summary)"""
+        self.trace = trace
+        self.latency = latency if latency and latency["count"] else None
+        rows = len(trace["phases"]) if trace else 0
+        if self.latency:
+            rows += 1
+        self.resize(PANEL_WIDTH, 2 * MARGIN + (rows + 1) * ROW_HEIGHT)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), BACKGROUND)
+        painter.setPen(TEXT_COLOR)
+        left = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+        right = Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter
+        header = QRectF(MARGIN, MARGIN, self.width() - 2 * MARGIN, ROW_HEIGHT)
+        if not self.trace:
+            painter.drawText(header, left, "No fetch timed yet")
+            return
+        total = max(self.trace["total_ms"], 0.001)
+        painter.drawText(header, left, f"Last fetch ({self.trace['language']})")
+        painter.drawText(header, right, f"{self.trace['total_ms']:.0f} ms")
+
+        bar_left = MARGIN + LABEL_WIDTH
+        bar_width = self.width() - bar_left - MARGIN
+        for row, span in enumerate(self.trace["phases"], start=1):
+            top = MARGIN + row * ROW_HEIGHT
+            label = span["phase"] + (f" · {span['detail']}" if span["detail"] else "")
+            painter.drawText(QRectF(MARGIN, top, LABEL_WIDTH - 60, ROW_HEIGHT), left, label)
+            painter.drawText(QRectF(MARGIN, top, LABEL_WIDTH - 6, ROW_HEIGHT), right, f"{span['duration_ms']:.0f} ms")
+            x = bar_left + bar_width * max(0.0, span["start_ms"]) / total
+            width = max(1.0, bar_width * span["duration_ms"] / total)
+            color = PHASE_COLORS.get(span["phase"], DEFAULT_COLOR)
+            painter.fillRect(QRectF(x, top + 3, min(width, bar_left + bar_width - x), ROW_HEIGHT - 6), color)
+        if self.latency:
+            first, total = self.latency["first_content"], self.latency["total"]
+            top = MARGIN + (len(self.trace["phases"]) + 1) * ROW_HEIGHT
+            painter.drawText(
+                QRectF(MARGIN, top, self.width() - 2 * MARGIN, ROW_HEIGHT), left,
+                f"Last {self.latency['count']}: first content {first['p50_ms']:.0f}/{first['p95_ms']:.0f} ms, "
+                f"complete {total['p50_ms']:.0f}/{total['p95_ms']:.0f} ms (p50/p95)"
+            )
+        painter.end()